@@ -0,0 +1,114 @@
+# -------------------------------------------------------------------------------
+# Name:        GlblEcsseBatch.py
+# Purpose:     run a study without the GUI, for instance on a compute node with no X server
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   takes a configuration file, as written by write_config_file, and generates either sets of ECOSSE simulation
+#   files or weather only outputs using the same high level functions as the GUI
+# -------------------------------------------------------------------------------
+
+__prog__ = 'GlblEcsseBatch.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import sys
+from argparse import ArgumentParser
+from os.path import isfile, normpath
+from time import time
+
+from common_defns import HILDA_LANDUSES, RESOLUTIONS, set_land_use_types
+from glbl_ecss_cmmn_cmpntsGUI import calculate_grid_cell
+from glbl_ecsse_high_level_fns import generate_banded_sims
+from glbl_ecsse_wthr_only_fns import generate_weather_only
+from initialise_funcs import read_config_file
+from initialise_common_funcs import initiation
+from form_proxy_fns import HeadlessForm
+
+ERROR_STR = '*** Error *** '
+RUN_MODES = ['sims', 'wthr']
+
+def _common_section(form):
+    """
+    set those attributes which commonSection and grid_resolutions set in the GUI
+    """
+    set_land_use_types(form)
+
+    form.combo10w.addItems(form.weather_resources_generic)
+    form.combo16.addItems(list(RESOLUTIONS.values()))
+    form.w_equimode.setText('9.5')
+
+    return
+
+def make_headless_form(config_file):
+    """
+    create and populate a form from the configuration file, returns None if the file is unreadable or incomplete
+    """
+    form = HeadlessForm(HILDA_LANDUSES)
+    form.version = 'HWSD_grid'
+    initiation(form)
+    _common_section(form)
+
+    form.config_file = normpath(config_file)
+    if not read_config_file(form):
+        return None
+
+    granularity = 120
+    calculate_grid_cell(form, granularity)
+    form.config_read()
+
+    return form
+
+def run_study(config_file, run_mode, resume_flag = False):
+    """
+    equivalent of the Create sim files and Wthr only buttons
+    resume_flag overrides the resume setting of the configuration file
+    """
+    if not isfile(config_file):
+        print(ERROR_STR + 'configuration file ' + config_file + ' does not exist')
+        return False
+
+    form = make_headless_form(config_file)
+    if form is None:
+        print(ERROR_STR + 'could not read configuration file ' + config_file)
+        return False
+
+    study = form.w_study.text()
+    if study == '' or study.find(' ') >= 0:
+        print(ERROR_STR + 'study must be present and must not have spaces in configuration file ' + config_file)
+        return False
+
+    form.study = study
+    if resume_flag:
+        form.sttngs['resume_flag'] = True
+
+    start_time = time()
+    if run_mode == 'sims':
+        generate_banded_sims(form)
+    else:
+        generate_weather_only(form)
+
+    print('Study {} completed in {} seconds'.format(study, round(time() - start_time)))
+
+    return True
+
+def main():
+    """
+    parse command line and run study
+    """
+    parser = ArgumentParser(description = 'Generate limited data ECOSSE simulation files without the GUI')
+    parser.add_argument('config_file', help = 'configuration file written by the GUI')
+    parser.add_argument('-m', '--mode', choices = RUN_MODES, default = RUN_MODES[0],
+                        help = 'sims: create simulation files (default), wthr: weather only outputs')
+    parser.add_argument('-r', '--resume', action = 'store_true',
+                        help = 'skip bands and cells completed by a previous run of the study')
+    args = parser.parse_args()
+
+    if run_study(args.config_file, args.mode, args.resume):
+        sys.exit(0)
+    else:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        band_height_fns.py
+# Purpose:     choose height of the latitude bands into which a study is divided
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   each band incurs a setup cost, HWSD read, limited data object, NetCDF opens and weather read, so narrow
+#   regions are better processed in fewer, taller bands whereas for wide regions the weather of a band may not fit
+#   in memory
+#   the number of AOI cells per degree of latitude is estimated from the HWSD CSV file of the study, or from the
+#   area of the bounding box where absent, and the tallest candidate band which meets the target number of cells
+#   and memory limit is chosen - candidates are multiples or halvings of the weather resolution
+#   bands are stepped down from the top of the study bounding box so their edges need not coincide with rows of
+#   weather cells, hence the weather of a band is estimated for one row more than its height spans
+#   the automatic choice is made only where the lat_step setting is 0, by default bands are 0.5 degrees high as before
+#   since band numbers depend on the band height a run may not start at a given band, start_at_band, with the
+#   height chosen automatically
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'band_height_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from math import ceil
+
+from band_wthr_fns import WTHR_RESOL, wthr_cell_bytes
+
+GRANULARITY = 120           # HWSD cells per degree
+AOI_REC_BYTES = 600         # estimated memory occupied by each AOI record and its site data
+LAT_STEP_DFLT = 0.5
+MAX_MULTIPLE = 20           # tallest candidate band is 10 degrees
+MAX_HALVINGS = 3            # shortest candidate band is 1/16 degree
+WARN_STR = '*** Warning *** '
+
+def _candidate_steps():
+    """
+    band heights in ascending order
+    """
+    steps = [WTHR_RESOL/2**nhalvings for nhalvings in range(MAX_HALVINGS, 0, -1)]
+    steps += [WTHR_RESOL*multiple for multiple in range(1, MAX_MULTIPLE + 1)]
+
+    return steps
+
+def _cells_per_degree(form, lon_ll, lat_ll, lon_ur, lat_ur):
+    """
+    estimate of AOI cells in a band one degree high
+    """
+    hwsd_mu_globals = form.hwsd_mu_globals
+    data_frame = getattr(hwsd_mu_globals, 'data_frame', None)
+    lat_extent = min(lat_ur, hwsd_mu_globals.lat_ur_aoi) - max(lat_ll, hwsd_mu_globals.lat_ll_aoi)
+
+    if data_frame is not None and len(data_frame) > 0 and lat_extent > 0:
+        return len(data_frame)/lat_extent
+
+    cells_per_deg = GRANULARITY/max(1, form.sttngs['req_resol_upscale'])
+
+    return (lon_ur - lon_ll)*cells_per_deg**2
+
+def _band_mb(lat_step, width, ncells, cell_bytes, wthr_tiled):
+    """
+    estimate memory of a band - weather of the band, unless fetched in tiles, and AOI records
+    """
+    nbytes = ncells*AOI_REC_BYTES
+    if not wthr_tiled:
+        nrows = int(ceil(lat_step/WTHR_RESOL)) + 1      # band may straddle a row of weather cells
+        ncols = int(ceil(width/WTHR_RESOL)) + 1
+        nbytes += nrows*ncols*cell_bytes
+
+    return nbytes/(1024*1024)
+
+def choose_lat_step(form, climgen, lon_ll, lat_ll, lon_ur, lat_ur):
+    """
+    returns band height in degrees and message describing how it was chosen
+    raises ValueError if the height is to be chosen automatically and the study starts at a band other than the first
+    """
+    sttngs = form.sttngs
+    if sttngs['lat_step'] > 0:
+        return sttngs['lat_step'], 'Band height of {} degrees taken from settings'.format(sttngs['lat_step'])
+
+    # band numbers follow from the band height so may not refer to the bands of an earlier run
+    # ========================================================================================
+    if sttngs['start_at_band'] > 1:
+        raise ValueError('cannot start at band {} with band height chosen automatically - set lat_step to the band'
+                                    ' height of the run being continued'.format(sttngs['start_at_band']))
+
+    cells_per_deg = _cells_per_degree(form, lon_ll, lat_ll, lon_ur, lat_ur)
+    cell_bytes = wthr_cell_bytes(climgen)
+    wthr_tiled = sttngs['wthr_tile_max_mb'] > 0
+    width = lon_ur - lon_ll
+    lat_extent = max(lat_ur - lat_ll, 0.0)
+
+    steps = _candidate_steps()
+    lat_step = steps[0]
+    for step in steps:
+        ncells = cells_per_deg*step
+        if ncells > sttngs['band_target_cells'] or \
+                            _band_mb(step, width, ncells, cell_bytes, wthr_tiled) > sttngs['band_max_mb']:
+            break
+        lat_step = step
+        if step >= lat_extent:
+            break   # a single band covers the study
+
+    mess = 'Chose band height of {} degrees for an estimated {} AOI cells per band, target: {} cells within {} MB'\
+        .format(lat_step, int(cells_per_deg*lat_step), sttngs['band_target_cells'], sttngs['band_max_mb'])
+
+    return lat_step, mess
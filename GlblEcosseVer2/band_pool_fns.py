@@ -0,0 +1,133 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        band_pool_fns.py
+# Purpose:     run latitude bands in a pool of processes
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   bands are independent apart from the study files, form.fstudy, which are shared by all bands
+#   each worker process receives a snapshot of the form, opens its own NetCDF datasets and writes
+#   study file lines to memory - these are appended to the study files in band order
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'band_pool_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from io import StringIO
+
+from form_proxy_fns import snapshot_form, detach_nc_dsets, reattach_nc_dsets
+
+_wrkr = {}      # state of the worker process, set once by _init_worker
+
+def _study_files_open(form):
+    """
+    study files are opened when the first simulation is written
+    """
+    if form.fstudy == '' or len(form.fstudy) == 0:
+        return False
+    else:
+        return True
+
+def _init_worker(form_proxy, band_func, band_kwargs, nchans, lgr_queue, lgr_level):
+    """
+    called once for each process in the pool
+    """
+    for key in band_kwargs:
+        reattach_nc_dsets(band_kwargs[key])
+
+    # forward log records to the handlers of the main process
+    # =======================================================
+    if hasattr(form_proxy, 'lgr'):
+        lgr = logging.getLogger(form_proxy.lgr.name)
+        lgr.handlers = [QueueHandler(lgr_queue)]
+        lgr.setLevel(lgr_level)
+        lgr.propagate = False
+        form_proxy.lgr = lgr
+
+    _wrkr['form'] = form_proxy
+    _wrkr['band_func'] = band_func
+    _wrkr['band_kwargs'] = band_kwargs
+    _wrkr['nchans'] = nchans
+
+    return
+
+def _run_band(band):
+    """
+    generate simulation files for one band, returns text destined for each study file and result of band_func
+    """
+    num_band, bbox = band
+
+    form = copy(_wrkr['form'])
+    form.sttngs = copy(form.sttngs)
+    form.sttngs['bbox'] = bbox
+    form.fstudy = [StringIO() for ichan in range(_wrkr['nchans'])]
+
+    lon_ll, lat_ll, lon_ur, lat_ur = bbox
+    print('\nProcessing band {} with latitude extent of min: {}\tmax: {}'
+                                                            .format(num_band, round(lat_ll, 6), round(lat_ur, 6)))
+    result = _wrkr['band_func'](form, num_band = num_band, **_wrkr['band_kwargs'])
+
+    return [fobj.getvalue() for fobj in form.fstudy], result
+
+def run_bands_in_pool(form, bands, band_func, band_kwargs, num_procs, band_done = None):
+    """
+    bands is a list of band numbers and bounding boxes ordered from north to south
+    band_func is called with the form, the band number and band_kwargs, e.g. _generate_ecosse_files
+    band_done, if supplied, is called in this process with the band number and result of band_func as each band
+    finishes e.g. to update the run manifest
+
+    the first bands are run in this process until the study files have been opened so that the number of study
+    files is known - remaining bands are farmed out to the pool and their study file lines written in band order
+    """
+    bands = list(bands)
+    while len(bands) > 0 and not _study_files_open(form):
+        num_band, bbox = bands.pop(0)
+        form.sttngs['bbox'] = bbox
+        print('\nProcessing band {} in main process with latitude extent of min: {}\tmax: {}'
+                                                            .format(num_band, round(bbox[1], 6), round(bbox[3], 6)))
+        result = band_func(form, num_band = num_band, **band_kwargs)
+        if band_done is not None:
+            band_done(num_band, result)
+
+    if len(bands) == 0:
+        return
+
+    print('Sending {} bands to a pool of {} processes'.format(len(bands), num_procs))
+    form_proxy = snapshot_form(form)
+    wrkr_kwargs = {key: detach_nc_dsets(band_kwargs[key]) for key in band_kwargs}
+    ctx = get_context('spawn')
+    lgr_queue = ctx.Queue()
+    if hasattr(form, 'lgr'):
+        lgr_level = form.lgr.level
+        listener = QueueListener(lgr_queue, *form.lgr.handlers, respect_handler_level = True)
+    else:
+        lgr_level = logging.INFO
+        listener = QueueListener(lgr_queue)
+    listener.start()
+
+    nchans = len(form.fstudy)
+    try:
+        with ProcessPoolExecutor(max_workers = num_procs, mp_context = ctx, initializer = _init_worker,
+                        initargs = (form_proxy, band_func, wrkr_kwargs, nchans, lgr_queue, lgr_level)) as executor:
+
+            # map returns results in the order of submission i.e. band order
+            # ==============================================================
+            for band, (study_lines, result) in zip(bands, executor.map(_run_band, bands)):
+                for ichan, lines in enumerate(study_lines):
+                    form.fstudy[ichan].write(lines)
+                print('Merged study file lines from band {}'.format(band[0]))
+                if band_done is not None:
+                    band_done(band[0], result)
+    finally:
+        listener.stop()
+
+    return
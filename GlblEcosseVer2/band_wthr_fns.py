@@ -0,0 +1,198 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        band_wthr_fns.py
+# Purpose:     fetch weather for a band in longitude tiles so that memory use is bounded
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the future and historic weather of a band is held in memory while its sites are processed - for wide
+#   bounding boxes and long future periods this may exceed the memory available
+#   where a memory budget is set, wthr_tile_max_mb, the band is split into longitude tiles whose edges are aligned
+#   to the weather grid, and the weather of each tile is fetched only when its sites are reached and released before
+#   the next tile is fetched - each site is associated with the same weather cell as when the band is fetched whole
+#   sites are visited tile by tile so study file lines are held and written in the original site order at the end
+#   of the band - see SiteWriterPool.hold_study_lines
+#   CHESS weather is fetched for the whole band and associated with each site by associate_climate
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'band_wthr_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from math import floor, ceil
+import numpy as np
+
+from gui_events_fns import process_events
+from getClimGenFns import associate_climate
+from wthr_grid_index import WthrGridIndex, METRICS
+
+WTHR_RESOL = 0.5            # resolution of the CRU derived datasets in degrees
+BYTES_PER_VAL = 32          # Python float plus a list reference
+NYEARS_DFLT = 200           # historic plus future years where the climate object does not specify them
+WARN_STR = '*** Warning *** '
+
+def wthr_cell_bytes(climgen):
+    """
+    estimate memory occupied by the historic and future weather of one weather cell
+    """
+    try:
+        nyears = climgen.sim_end_year - climgen.hist_start_year + 1
+    except (AttributeError, TypeError):
+        nyears = NYEARS_DFLT
+
+    return len(METRICS)*12*max(nyears, 1)*BYTES_PER_VAL
+
+def band_lon_tiles(bbox, max_mb, cell_bytes, resol = WTHR_RESOL):
+    """
+    split the longitude extent of a band into tiles whose edges are multiples of resol such that the weather of
+    each tile, one row of weather cells for each resol of latitude, fits within max_mb
+    returns list of tile bounding boxes, a single tile if max_mb is not positive
+    """
+    lon_ll, lat_ll, lon_ur, lat_ur = bbox
+    if max_mb <= 0:
+        return list([list(bbox)])
+
+    nrows = max(1, int(ceil((lat_ur - lat_ll)/resol - 1.0e-9)) + 1)    # band may straddle a row boundary
+    ncols_tile = max(1, int(max_mb*1024*1024 // (cell_bytes*nrows)))
+
+    col_strt = int(floor(lon_ll/resol))
+    col_end = int(ceil(lon_ur/resol))
+    tiles = []
+    for col in range(col_strt, col_end, ncols_tile):
+        tile_ll = max(lon_ll, col*resol)
+        tile_ur = min(lon_ur, (col + ncols_tile)*resol)
+        tiles.append(list([tile_ll, lat_ll, tile_ur, lat_ur]))
+
+    return tiles
+
+class BandWeather(object):
+    """
+    weather for the sites of a band, fetched for the whole band or tile by tile
+    """
+    def __init__(self, form, climgen, wthr_cache, hwsd, bbox, chess_extent, num_band, timer):
+
+        self.form = form
+        self.climgen = climgen
+        self.wthr_cache = wthr_cache
+        self.hwsd = hwsd
+        self.chess_extent = chess_extent
+        self.num_band = num_band
+        self.timer = timer
+        self.nno_wthr = 0
+
+        if climgen.wthr_rsrc == 'CHESS':
+            self.tiles = list([list(bbox)])
+        else:
+            self.tiles = band_lon_tiles(bbox, form.sttngs['wthr_tile_max_mb'], wthr_cell_bytes(climgen))
+
+        self.pettmp_hist = None
+        self.pettmp_fut = None
+        self.wthr_indx = None
+        self.cell_indices = {}
+
+    @property
+    def ntiles(self):
+        return len(self.tiles)
+
+    def _fetch(self, tile_bbox, snglPntFlag = False):
+        """
+        fetch future and historic weather enclosing tile
+        """
+        climgen = self.climgen
+        wthr_cache = self.wthr_cache
+        num_band = self.num_band
+        wthr_rsrc = climgen.wthr_rsrc
+
+        print('Getting future ' + wthr_rsrc + ' data for band {}'.format(num_band))
+        process_events()
+        mess = 'Getting historic ' + wthr_rsrc + 'data for band {}'.format(num_band)
+
+        start_time = self.timer.start()
+        if wthr_rsrc == 'CHESS':
+            aoi_indices = self.chess_extent[:4]
+            self.pettmp_fut = wthr_cache.fetch(climgen, 'fetch_chess_NC_data', aoi_indices, num_band)
+            print(mess)
+            self.pettmp_hist = wthr_cache.fetch(climgen, 'fetch_chess_NC_data', aoi_indices, num_band,
+                                                                                                future_flag = False)
+        else:
+            aoi_indices_fut, aoi_indices_hist = climgen.genLocalGrid(tile_bbox, self.hwsd, snglPntFlag, num_band)
+            self.pettmp_fut = wthr_cache.fetch(climgen, 'fetch_cru_future_NC_data', aoi_indices_fut, num_band)
+            print(mess)
+            self.pettmp_hist = wthr_cache.fetch(climgen, 'fetch_cru_historic_NC_data', aoi_indices_hist, num_band)
+        self.timer.stop('climate_fetch', start_time)
+
+    def _associate_tile(self, aoi_res, site_indices):
+        """
+        map AOI cells of the tile to weather cells in a single step, those the lookup cannot resolve and CHESS cells
+        are associated per site by associate_climate
+        """
+        if self.climgen.wthr_rsrc == 'CHESS':
+            self.wthr_indx = None
+            return
+
+        start_time = self.timer.start()
+        self.wthr_indx = WthrGridIndex(self.pettmp_hist, self.pettmp_fut)
+        cell_indices = self.wthr_indx.associate([aoi_res[indx] for indx in site_indices], self.climgen)
+        self.cell_indices = dict(zip(site_indices, cell_indices.tolist()))
+        self.nno_wthr += int((cell_indices < 0).sum())
+        self.timer.stop('associate_climate', start_time)
+
+    def _tile_site_indices(self, aoi_res):
+        """
+        indices of AOI cells in each tile, tiles are ordered so that the first AOI cell is visited first
+        """
+        lons = np.array([site_rec[3] for site_rec in aoi_res], dtype = float)
+        tile_edges = np.array([tile[0] for tile in self.tiles[1:]], dtype = float)
+        tile_nums = np.searchsorted(tile_edges, lons, side = 'right')
+
+        site_indices = [np.flatnonzero(tile_nums == num_tile).tolist() for num_tile in range(self.ntiles)]
+        tile_order = list(range(self.ntiles))
+        if len(aoi_res) > 0:
+            first_tile = int(tile_nums[0])
+            tile_order.remove(first_tile)
+            tile_order.insert(0, first_tile)
+
+        return [(num_tile, site_indices[num_tile]) for num_tile in tile_order]
+
+    def site_order(self, aoi_res):
+        """
+        generate indices of AOI cells, the weather of each tile is fetched before its first cell is generated
+        """
+        for num_tile, site_indices in self._tile_site_indices(aoi_res):
+            if len(site_indices) == 0:
+                continue
+
+            if self.ntiles > 1:
+                lon_ll, dummy, lon_ur, dummy = self.tiles[num_tile]
+                print('Band {} tile {} of {}: {} cells with longitude extent {} to {}'
+                      .format(self.num_band, num_tile + 1, self.ntiles, len(site_indices), lon_ll, lon_ur))
+
+            self._fetch(self.tiles[num_tile])
+            self._associate_tile(aoi_res, site_indices)
+            for site_indx in site_indices:
+                yield site_indx
+
+            self.pettmp_hist, self.pettmp_fut, self.wthr_indx, self.cell_indices = None, None, None, {}
+
+    def grid_cell(self, site_indx, site_rec):
+        """
+        weather for an AOI cell of the current tile in the form returned by associate_climate, None if absent
+        """
+        if self.wthr_indx is None:
+            start_time = self.timer.start()
+            pettmp_grid_cell = associate_climate(site_rec, self.climgen, self.pettmp_hist, self.pettmp_fut)
+            self.timer.stop('associate_climate', start_time)
+            if len(pettmp_grid_cell) == 0:
+                print('*** Warning *** no wthr data for site with lat: {}\tlon: {}'
+                                                        .format(round(site_rec[2],3), round(site_rec[3],3)))
+                return None
+            return pettmp_grid_cell
+
+        cell_indx = self.cell_indices[site_indx]
+        if cell_indx < 0:
+            return None     # reported in summary at end of band
+
+        return self.wthr_indx.grid_cell(cell_indx)
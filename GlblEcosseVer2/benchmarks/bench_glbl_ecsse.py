@@ -0,0 +1,390 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        bench_glbl_ecsse.py
+# Purpose:     reproducible benchmarks of the hot paths of Global Ecosse using synthetic inputs
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   each benchmark is timed over a number of repeats, the fastest being recorded, followed by a further run under
+#   tracemalloc to record peak memory - results are written as JSON, labelled by commit, so that runs on different
+#   commits can be compared e.g.
+#       python bench_glbl_ecsse.py --size medium
+#       python bench_glbl_ecsse.py --compare results/bench_medium_abc1234.json results/bench_medium_def5678.json
+#   modules outside this tree which cannot be imported are replaced by the stand-ins of stand_in_modules.py, as
+#   recorded in the results, so that every hot path is timed
+#   the end to end functions _generate_ecosse_files and generate_weather_only require HWSD and the weather
+#   datasets so their in-tree cores are timed instead: mapping AOI cells to weather cells and bulk writing
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'bench_glbl_ecsse.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import sys
+import json
+import platform
+import tracemalloc
+from argparse import ArgumentParser
+from subprocess import run, PIPE
+from tempfile import TemporaryDirectory
+from time import perf_counter, strftime
+from types import SimpleNamespace
+from logging import getLogger
+from os import makedirs
+from os.path import join, dirname, abspath, isdir
+import numpy as np
+
+BENCH_DIR = dirname(abspath(__file__))
+sys.path.insert(0, dirname(BENCH_DIR))
+
+import synthetic_fixtures as fixtures
+from stand_in_modules import install_stand_ins
+
+SEED = 1
+REGRESSION_PCNT = 10.0
+SUMMARY_FMT = '{:<28}{:>12}{:>12}{:>16}{:>12}'
+
+def _git_commit():
+    """
+    short hash of the commit being benchmarked, an uncommitted tree is flagged
+    """
+    try:
+        commit = run(['git', 'rev-parse', '--short', 'HEAD'], stdout = PIPE, stderr = PIPE, cwd = BENCH_DIR,
+                                                                        universal_newlines = True).stdout.strip()
+        dirty = run(['git', 'status', '--porcelain', '--untracked-files=no'], stdout = PIPE, stderr = PIPE,
+                                                        cwd = BENCH_DIR, universal_newlines = True).stdout.strip()
+    except OSError:
+        return 'unknown'
+
+    if commit == '':
+        return 'unknown'
+    elif dirty != '':
+        return commit + '-dirty'
+    else:
+        return commit
+
+# benchmarks: each is passed the fixture parameters and a scratch directory and returns a function to be timed,
+# which returns the number of cells processed
+# ============================================================================================================
+def bench_soil_rec_store(params, scratch_dir):
+
+    from soil_rec_store import SoilRecStore
+
+    store = SoilRecStore.from_soil_recs(fixtures.make_soil_recs(params['nmu_globals'], SEED))
+
+    def _run():
+        store.simplify(True)
+        return len(store)
+
+    return _run
+
+def bench_simplify_soil_recs(params, scratch_dir):
+
+    from glbl_ecsse_high_level_fns import simplify_soil_recs
+
+    soil_recs = fixtures.make_soil_recs(params['nmu_globals'], SEED)
+
+    def _run():
+        simplify_soil_recs(soil_recs, True)
+        return len(soil_recs)
+
+    return _run
+
+def bench_simplify_aoi(params, scratch_dir):
+
+    from glbl_ecsse_high_level_fns import _simplify_aoi
+
+    aoi_res = fixtures.make_aoi_res(params['ncells'], params['nmu_globals'], SEED)
+    lggr = getLogger(__prog__)
+
+    def _run():
+        _simplify_aoi(lggr, 0, aoi_res)
+        return len(aoi_res)
+
+    return _run
+
+def bench_ecosse_wthr_association(params, scratch_dir):
+    """
+    per band mapping of AOI cells to weather cells as carried out by _generate_ecosse_files, the band weather being
+    served from memory in place of the weather cache
+    """
+    from band_wthr_fns import BandWeather
+    from stage_timer_fns import StageTimer
+
+    aoi_res = fixtures.make_aoi_res(params['ncells'], params['nmu_globals'], SEED)
+    lats = np.array([site_rec[2] for site_rec in aoi_res])
+    lons = np.array([site_rec[3] for site_rec in aoi_res])
+    pettmp_hist, pettmp_fut = fixtures.make_pettmp(lats, lons, params['nyears'], SEED)
+    bbox = [float(lons.min()), float(lats.min()), float(lons.max()), float(lats.max())]
+
+    form = SimpleNamespace(sttngs = {'wthr_tile_max_mb': 0})
+    climgen = SimpleNamespace(wthr_rsrc = 'CRU', hist_start_year = 1961, sim_end_year = 1960 + params['nyears'],
+                              genLocalGrid = lambda bbox, hwsd, snglPntFlag, num_band: (None, None))
+    wthr_cache = SimpleNamespace(fetch = lambda climgen, func_name, aoi_indices, num_band:
+                                                        pettmp_fut if func_name.find('future') >= 0 else pettmp_hist)
+
+    def _run():
+        band_wthr = BandWeather(form, climgen, wthr_cache, None, bbox, None, 0, StageTimer(False))
+        for site_indx in band_wthr.site_order(aoi_res):
+            band_wthr.grid_cell(site_indx, aoi_res[site_indx])
+        return len(aoi_res)
+
+    return _run
+
+def bench_wthr_only_bulk(params, scratch_dir):
+    """
+    weather only output as carried out by generate_weather_only once weather has been fetched
+    """
+    from glbl_ecsse_wthr_only_fns import _write_weather_bulk, WthrCsvOutputs
+
+    csv_fname, data_frame = fixtures.make_hwsd_csv(scratch_dir, params['ncells'], params['nmu_globals'], SEED)
+    lats = data_frame['latitude'].values
+    lons = data_frame['longitude'].values
+    nyears = params['nyears']
+    pettmp_hist, pettmp_fut = fixtures.make_pettmp(lats, lons, nyears, SEED)
+
+    fut_start_year = 2001
+    form = SimpleNamespace(hwsd_mu_globals = SimpleNamespace(data_frame = data_frame), lgr = getLogger(__prog__),
+                           weather_sets = {'ClimGen_A1B': {'year_start': fut_start_year}}, sims_dir = scratch_dir,
+                           w_study = SimpleNamespace(text = lambda: 'bench'))
+    climgen = SimpleNamespace(sim_start_year = fut_start_year, sim_end_year = fut_start_year + nyears - 1)
+
+    def _run():
+        wthr_csv = WthrCsvOutputs(form, climgen)
+        ncmplt, nskipped, nno_wthr = _write_weather_bulk(form, climgen, wthr_csv, pettmp_hist, pettmp_fut)
+        wthr_csv.close()
+        return len(data_frame)
+
+    return _run
+
+def _chess_run(params, scratch_dir, func):
+    """
+    met files are written to a fresh simulations directory for each repeat since existing met files are reused
+    """
+    from getClimGenOsbgFns import open_chess_dsets, close_chess_dsets
+
+    climgen, grid_cells = fixtures.make_chess_climgen(scratch_dir, params['chess_side'], params['nyears'], SEED)
+    nrepeat = [0]
+
+    def _run():
+        nrepeat[0] += 1
+        climgen.sims_dir = join(scratch_dir, 'sims{}'.format(nrepeat[0]))
+        open_chess_dsets(climgen)
+        try:
+            func(climgen, {grid_ref: SimpleNamespace(**vars(grid_cells[grid_ref])) for grid_ref in grid_cells})
+        finally:
+            close_chess_dsets(climgen)
+        return len(grid_cells)
+
+    return _run
+
+def bench_add_data_to_grid_cells(params, scratch_dir):
+
+    from getClimGenOsbgFns import add_data_to_grid_cells
+
+    return _chess_run(params, scratch_dir, add_data_to_grid_cells)
+
+def bench_make_met_files_osgb(params, scratch_dir):
+
+    from getClimGenOsbgFns import _make_met_files_osgb
+
+    nyears = params['nyears']
+    ncells = params['chess_side']**2
+    rng = np.random.default_rng(SEED)
+    precip = rng.gamma(2.0, 1.5e-5, (ncells, nyears*fixtures.MNTHS_YR)).tolist()
+    tas = fixtures.chess_tas(rng, (nyears*fixtures.MNTHS_YR, ncells)).T.tolist()
+    climgen = SimpleNamespace(mnthly_flag = True, max_num_years = nyears, hist_start_year = 1961)
+    nrepeat = [0]
+
+    def _run():
+        nrepeat[0] += 1
+        sims_dir = join(scratch_dir, 'met{}'.format(nrepeat[0]))
+        for icell in range(ncells):
+            clim_dir = join(sims_dir, '{:0=5d}'.format(icell))
+            _make_met_files_osgb(clim_dir, 52.0, climgen, {'precip': precip[icell], 'tas': tas[icell]})
+        return ncells
+
+    return _run
+
+def bench_plant_input_cells(params, scratch_dir):
+    """
+    association of plant inputs with the AOI cells of a band as carried out by _generate_ecosse_files with the
+    nc_slab_flag set - the stand-in for associate_yield_nc reads one point of the plant input dataset per cell
+    """
+    from nc_slab_fns import open_band_dataset
+    from plant_input_grid_fns import PlantInputCells, pi_grid_coords
+
+    nc_fname = fixtures.make_plant_input_nc(scratch_dir, params['nyears'], SEED)
+    aoi_res = fixtures.make_aoi_res(params['ncells'], params['nmu_globals'], SEED)
+    lats = [site_rec[2] for site_rec in aoi_res]
+    lons = [site_rec[3] for site_rec in aoi_res]
+    bbox = [min(lons), min(lats), max(lons), max(lats)]
+
+    def _associate_point(lat, lon, ltd_data, yield_dset, pi_lats, pi_lons):
+        ilat = int(np.abs(pi_lats - lat).argmin())
+        ilon = int(np.abs(pi_lons - lon).argmin())
+        ltd_data.pi_tonnes = yield_dset.variables[fixtures.PI_VAR][:, ilat, ilon].tolist()
+
+    def _run():
+        yield_dset = open_band_dataset(nc_fname, bbox, True)
+        try:
+            pi_lats, pi_lons = pi_grid_coords(yield_dset = yield_dset)
+            pi_cells = PlantInputCells(aoi_res, pi_lats, pi_lons)
+            ltd_data = SimpleNamespace(pi_tonnes = None)
+            for site_indx, site_rec in enumerate(aoi_res):
+                pi_cells.associate(site_indx, ltd_data, _associate_point, site_rec[2], site_rec[3], ltd_data,
+                                                                                        yield_dset, pi_lats, pi_lons)
+        finally:
+            yield_dset.close()
+        return len(aoi_res)
+
+    return _run
+
+def bench_thornthwaite_batch(params, scratch_dir):
+    """
+    PET of a group of CHESS cells as calculated by add_data_to_grid_cells, one list of monthly values per cell
+    """
+    from pet_batch_fns import thornthwaite_batch
+
+    nyears = params['nyears']
+    ncells = params['chess_side']**2
+    rng = np.random.default_rng(SEED)
+    temps = 8.0 + 6.0*rng.standard_normal((ncells, nyears*fixtures.MNTHS_YR))
+    lats = rng.uniform(50.0, 58.0, ncells).tolist()
+
+    def _run():
+        pets = thornthwaite_batch(temps, lats, 1961)
+        return len(pets)
+
+    return _run
+
+BENCHMARKS = {'soil_rec_store': bench_soil_rec_store,
+              'simplify_soil_recs': bench_simplify_soil_recs,
+              'simplify_aoi': bench_simplify_aoi,
+              'ecosse_wthr_association': bench_ecosse_wthr_association,
+              'wthr_only_bulk': bench_wthr_only_bulk,
+              'add_data_to_grid_cells': bench_add_data_to_grid_cells,
+              'make_met_files_osgb': bench_make_met_files_osgb,
+              'plant_input_cells': bench_plant_input_cells,
+              'thornthwaite_batch': bench_thornthwaite_batch}
+
+def _time_benchmark(name, params, nrepeats):
+    """
+    returns dictionary of results or of reason for skipping
+    """
+    with TemporaryDirectory(prefix = 'bench_' + name + '_') as scratch_dir:
+        try:
+            func = BENCHMARKS[name](params, scratch_dir)
+        except ImportError as err:
+            return {'skipped': str(err)}
+
+        times = []
+        for irepeat in range(nrepeats):
+            strt_time = perf_counter()
+            ncells = func()
+            times.append(perf_counter() - strt_time)
+
+        tracemalloc.start()
+        func()
+        dummy, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    secs = min(times)
+    return {'secs': round(secs, 6), 'ncells': ncells, 'cells_per_sec': round(ncells/max(secs, 1.0e-9), 1),
+                                                                            'peak_mb': round(peak/(1024*1024), 3)}
+
+def run_benchmarks(size, nrepeats, out_dir, label = None, names = None):
+    """
+    run benchmarks and write results to JSON file whose name is returned
+    """
+    params = fixtures.SIZES[size]
+    stand_ins = install_stand_ins()
+    commit = _git_commit()
+    if label is None:
+        label = commit
+    if names is None:
+        names = list(BENCHMARKS.keys())
+
+    results = {'label': label, 'commit': commit, 'created': strftime('%Y-%m-%d %H:%M:%S'), 'size': size,
+               'params': params, 'seed': SEED, 'nrepeats': nrepeats, 'python': platform.python_version(),
+               'numpy': np.__version__, 'platform': platform.platform(), 'stand_ins': stand_ins,
+               'benchmarks': {}}
+
+    if len(stand_ins) > 0:
+        print('Stand-ins used for modules: ' + ', '.join(stand_ins))
+
+    print(SUMMARY_FMT.format('benchmark', 'secs', 'cells', 'cells/sec', 'peak MB'))
+    for name in names:
+        rslt = _time_benchmark(name, params, nrepeats)
+        results['benchmarks'][name] = rslt
+        if 'skipped' in rslt:
+            print('{:<28}skipped - {}'.format(name, rslt['skipped']))
+        else:
+            print(SUMMARY_FMT.format(name, rslt['secs'], rslt['ncells'], rslt['cells_per_sec'], rslt['peak_mb']))
+
+    if not isdir(out_dir):
+        makedirs(out_dir)
+    out_fn = join(out_dir, 'bench_{}_{}.json'.format(size, label))
+    with open(out_fn, 'w') as fout:
+        json.dump(results, fout, indent=2)
+
+    print('Wrote results to ' + out_fn)
+
+    return out_fn
+
+def compare_results(base_fn, new_fn, threshold = REGRESSION_PCNT):
+    """
+    report change in time of each benchmark present in both files, returns number of regressions
+    """
+    with open(base_fn, 'r') as fbase:
+        base = json.load(fbase)
+    with open(new_fn, 'r') as fnew:
+        new = json.load(fnew)
+
+    if base['params'] != new['params']:
+        print('*** Warning *** results were generated with different fixture sizes')
+    if base.get('stand_ins', []) != new.get('stand_ins', []):
+        print('*** Warning *** results were generated with different stand-in modules')
+
+    print('{:<28}{:>12}{:>12}{:>10}'.format('benchmark', base['label'], new['label'], 'change'))
+    nregress = 0
+    for name in base['benchmarks']:
+        base_rslt = base['benchmarks'][name]
+        new_rslt = new['benchmarks'].get(name, {'skipped': 'absent'})
+        if 'skipped' in base_rslt or 'skipped' in new_rslt:
+            continue
+
+        pcnt = 100.0*(new_rslt['secs'] - base_rslt['secs'])/max(base_rslt['secs'], 1.0e-9)
+        flag = ''
+        if pcnt > threshold:
+            flag = '  REGRESSION'
+            nregress += 1
+        print('{:<28}{:>12}{:>12}{:>9.1f}%{}'.format(name, base_rslt['secs'], new_rslt['secs'], pcnt, flag))
+
+    return nregress
+
+def main():
+    """
+    entry point
+    """
+    parser = ArgumentParser(description = 'benchmarks of Global Ecosse using synthetic inputs')
+    parser.add_argument('-s', '--size', choices = list(fixtures.SIZES.keys()), default = 'small')
+    parser.add_argument('-n', '--repeat', type = int, default = 3, help = 'number of timed repeats')
+    parser.add_argument('-o', '--out', default = join(BENCH_DIR, 'results'), help = 'directory for results')
+    parser.add_argument('-l', '--label', default = None, help = 'label for results, defaults to commit hash')
+    parser.add_argument('-b', '--bench', action = 'append', choices = list(BENCHMARKS.keys()),
+                                                                    help = 'run this benchmark only, may be repeated')
+    parser.add_argument('-c', '--compare', nargs = 2, metavar = ('BASE', 'NEW'), help = 'compare two results files')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        nregress = compare_results(args.compare[0], args.compare[1])
+        sys.exit(1 if nregress > 0 else 0)
+
+    run_benchmarks(args.size, max(1, args.repeat), args.out, args.label, args.bench)
+
+if __name__ == '__main__':
+    main()
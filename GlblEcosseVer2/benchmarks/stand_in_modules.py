@@ -0,0 +1,132 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        stand_in_modules.py
+# Purpose:     small stand-ins for the modules outside this tree so that the hot paths can be benchmarked without them
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the in-tree modules import HWSD, weather, plant input and management functions which are not part of this
+#   repository - where one of these cannot be imported a stand-in module is registered in its place, installed
+#   modules are always preferred
+#   the benchmarked hot paths call only two external functions: thornthwaite, for cell years with a month at or
+#   below freezing, and associate_climate, for AOI cells which the weather grid lookup cannot resolve - the stand-ins
+#   implement the Thornthwaite equation and report no weather respectively, every other stand-in raises if called
+#   the stand-ins in use are recorded with the results so that timings are only compared like for like
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'stand_in_modules.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import sys
+from importlib import import_module
+from types import ModuleType
+from calendar import isleap
+from math import sin, tan, acos, pi, radians
+
+MONTH_DAYS = list([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+LEAP_MONTH_DAYS = list([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+STAND_IN_DOC = 'benchmark stand-in for '
+
+CLASS = 'class'     # stand-in is a class, which may be subclassed on import, that raises if instantiated
+
+def _not_available(module_name, attrib, class_flag = False):
+    """
+    function or class which raises if a hot path reaches an external function with no working stand-in
+    """
+    def _raise(*args, **kwargs):
+        raise RuntimeError('{}.{} is not available to the benchmarks'.format(module_name, attrib))
+
+    if class_flag:
+        return type(attrib, (object,), {'__init__': _raise})
+
+    _raise.__name__ = attrib
+    return _raise
+
+def _monthly_mean_daylight_hours(lat, year = None):
+    """
+    mean daylight hours for each month of the year at latitude lat in degrees
+    """
+    month_days = LEAP_MONTH_DAYS if year is not None and isleap(year) else MONTH_DAYS
+    tan_lat = tan(radians(lat))
+    mean_dlh = []
+    doy = 1         # day of the year
+    for mdays in month_days:
+        dlh = 0.0
+        for daynum in range(mdays):
+            sol_dec = 0.409 * sin(((2.0 * pi / 365.0) * doy - 1.39))
+            sha = acos(min(max(-tan_lat * tan(sol_dec), -1.0), 1.0))     # sunset hour angle
+            dlh += (24.0 / pi) * sha
+            doy += 1
+        mean_dlh.append(dlh / mdays)
+
+    return mean_dlh
+
+def _thornthwaite(monthly_t, lat, year = None):
+    """
+    monthly potential evapotranspiration [mm/month] using the Thornthwaite (1948) method
+    """
+    mean_dlh = _monthly_mean_daylight_hours(lat, year)
+    month_days = LEAP_MONTH_DAYS if year is not None and isleap(year) else MONTH_DAYS
+
+    heat_indx = 0.0
+    for temp in monthly_t:
+        if temp > 0.0:
+            heat_indx += (temp / 5.0) ** 1.514
+
+    alpha = (6.75e-07 * heat_indx ** 3) - (7.71e-05 * heat_indx ** 2) + (1.792e-02 * heat_indx) + 0.49239
+
+    return [1.6 * (dlh / 12.0) * (mdays / 30.0) * ((10.0 * temp / heat_indx) ** alpha) * 10.0
+                                                for temp, dlh, mdays in zip(monthly_t, mean_dlh, month_days)]
+
+def _associate_climate(site_rec, climgen, pettmp_hist, pettmp_fut):
+    """
+    AOI cells which the weather grid lookup cannot resolve are given no weather
+    """
+    return {}
+
+# module name -> attributes imported by the in-tree modules, None or CLASS where the stand-in raises if called
+# ============================================================================================================
+STAND_INS = {
+    'thornthwaite': {'thornthwaite': _thornthwaite, 'monthly_mean_daylight_hours': _monthly_mean_daylight_hours},
+    'getClimGenFns': {'associate_climate': _associate_climate, 'check_clim_nc_limits': None},
+    'getClimGenNC': {'ClimGenNC': CLASS},
+    'cvrtcoord': {'WGS84toOSGB36': None},
+    'hwsd_bil': {'HWSD_bil': CLASS},
+    'hwsd_mu_globals_fns': {'gen_grid_cells_for_band': None},
+    'make_ltd_data_files': {'MakeLtdDataFiles': CLASS},
+    'plant_input_fns': {'fetch_yields': None, 'associate_yield': None, 'associate_yield_nc': None},
+    'plant_input_csv_fns': {'associate_plant_inputs': None, 'cnvrt_joe_plant_inputs_to_df': None},
+    'prepare_ecosse_files': {'update_progress': None, 'make_ecosse_file': None},
+    'mngmnt_fns_and_class': {'ManagementSet': CLASS, 'check_mask_location': None}
+}
+
+def install_stand_ins():
+    """
+    register a stand-in for each external module which cannot be imported
+    returns sorted list of names of modules stood in
+    """
+    stood_in = []
+    for module_name, attribs in STAND_INS.items():
+        if module_name in sys.modules:
+            if sys.modules[module_name].__doc__ == STAND_IN_DOC + module_name:
+                stood_in.append(module_name)
+            continue
+        try:
+            import_module(module_name)
+            continue
+        except ImportError:
+            pass
+
+        module = ModuleType(module_name, STAND_IN_DOC + module_name)
+        for attrib, func in attribs.items():
+            if func is None or func == CLASS:
+                func = _not_available(module_name, attrib, func == CLASS)
+            setattr(module, attrib, func)
+        sys.modules[module_name] = module
+        stood_in.append(module_name)
+
+    return sorted(stood_in)
@@ -0,0 +1,202 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        synthetic_fixtures.py
+# Purpose:     generate synthetic HWSD, CRU style, CHESS style and plant input data of configurable size for benchmarks
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   all fixtures are generated from a seeded random number generator so that runs on different commits are
+#   given identical inputs - NetCDF and CSV files are written to a scratch directory supplied by the caller
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'synthetic_fixtures.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from types import SimpleNamespace
+from os.path import join
+import numpy as np
+from netCDF4 import Dataset
+
+GRANULARITY = 120
+MNTHS_YR = 12
+NSOIL_METRICS = 12      # topsoil and subsoil: carbon, bulk density, pH, clay, silt, sand
+PI_VAR = 'PlantInput05'
+
+SIZES = {
+    'small':  {'ncells': 2000,   'nmu_globals': 1000,  'nyears': 30, 'chess_side': 20},
+    'medium': {'ncells': 20000,  'nmu_globals': 10000, 'nyears': 60, 'chess_side': 50},
+    'large':  {'ncells': 200000, 'nmu_globals': 30000, 'nyears': 90, 'chess_side': 120}
+}
+
+def make_soil_recs(nmu_globals, seed = 1):
+    """
+    mu_global -> list of soils, each a list of metrics followed by share, with some duplicate soils
+    """
+    rng = np.random.default_rng(seed)
+    soil_recs = {}
+    for mu_global in (10000 + np.arange(nmu_globals)).tolist():
+        nsoils = int(rng.integers(1, 11))
+        pool = np.round(rng.uniform(0.0, 100.0, (max(1, nsoils // 2), NSOIL_METRICS)), 2)
+        picks = rng.integers(0, len(pool), nsoils)
+        shares = rng.integers(1, 100, nsoils).astype(float)
+        soil_recs[mu_global] = [pool[pick].tolist() + [share] for pick, share in zip(picks.tolist(), shares.tolist())]
+
+    return soil_recs
+
+def _gran_coords(lats, lons):
+
+    gran_lats = np.round((90.0 - lats)*GRANULARITY).astype(int)
+    gran_lons = np.round((180.0 + lons)*GRANULARITY).astype(int)
+
+    return gran_lats, gran_lons
+
+def make_aoi_cells(ncells, seed = 1, lat_ur = 52.0, lon_ll = -2.0):
+    """
+    latitudes and longitudes of distinct AOI cells in a band half a degree high, the band is widened to hold them
+    """
+    rng = np.random.default_rng(seed)
+    resol = 1.0/GRANULARITY
+    nrows = GRANULARITY // 2
+    ncols = max(8*nrows, -(-2*ncells // nrows))
+    flat = rng.choice(nrows*ncols, ncells, replace = False)
+    lats = lat_ur - (flat // ncols + 0.5)*resol
+    lons = lon_ll + (flat % ncols + 0.5)*resol
+
+    return lats, lons
+
+def make_aoi_res(ncells, nmu_globals, seed = 1):
+    """
+    AOI records as returned by gen_grid_cells_for_band: gran_lat, gran_lon, lat, lon, area, {mu_global: proportion}
+    """
+    rng = np.random.default_rng(seed)
+    lats, lons = make_aoi_cells(ncells, seed)
+    gran_lats, gran_lons = _gran_coords(lats, lons)
+    aoi_res = []
+    for gran_lat, gran_lon, lat, lon in zip(gran_lats.tolist(), gran_lons.tolist(), lats.tolist(), lons.tolist()):
+        npairs = int(rng.choice([0, 1, 1, 2, 3, 5], p = [0.02, 0.38, 0.2, 0.2, 0.1, 0.1]))
+        mu_globals = (10000 + rng.integers(0, nmu_globals, npairs)).tolist()
+        content = {mu_global: int(rng.integers(1, 20)) for mu_global in mu_globals}
+        aoi_res.append((gran_lat, gran_lon, lat, lon, 0.7, content))
+
+    return aoi_res
+
+def make_pettmp(lats, lons, nyears, seed = 1, resol = 0.5):
+    """
+    historic and future weather, as returned by the climgen fetch functions, for the half degree cells enclosing
+    the given cells - keys are granular lat/lon of the weather cell centres
+    """
+    rng = np.random.default_rng(seed)
+    wthr_lats = np.unique((np.floor(lats/resol) + 0.5)*resol)
+    wthr_lons = np.unique((np.floor(lons/resol) + 0.5)*resol)
+    nmnths = nyears*MNTHS_YR
+
+    pettmp_hist = {'precipitation': {}, 'temperature': {}}
+    pettmp_fut = {'precipitation': {}, 'temperature': {}}
+    for wthr_lat in wthr_lats.tolist():
+        for wthr_lon in wthr_lons.tolist():
+            gran_lat, gran_lon = _gran_coords(np.array([wthr_lat]), np.array([wthr_lon]))
+            key = '{:0=5d}_{:0=5d}'.format(int(gran_lat[0]), int(gran_lon[0]))
+            for pettmp in pettmp_hist, pettmp_fut:
+                pettmp['precipitation'][key] = np.round(rng.gamma(2.0, 30.0, nmnths), 1).tolist()
+                pettmp['temperature'][key] = np.round(8.0 + 6.0*rng.standard_normal(nmnths), 1).tolist()
+
+    return pettmp_hist, pettmp_fut
+
+def make_hwsd_csv(out_dir, ncells, nmu_globals, seed = 1):
+    """
+    write HWSD CSV file, as generated by the GUI, and return its name and data frame
+    """
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    lats, lons = make_aoi_cells(ncells, seed)
+    gran_lats, gran_lons = _gran_coords(lats, lons)
+    data_frame = pd.DataFrame({'gran_lat': gran_lats, 'gran_lon': gran_lons, 'mu_global':
+                        10000 + rng.integers(0, nmu_globals, len(lats)), 'latitude': np.round(lats, 5),
+                        'longitude': np.round(lons, 5)})
+    csv_fname = join(out_dir, 'hwsd_synthetic.csv')
+    data_frame.to_csv(csv_fname, index = False)
+
+    return csv_fname, data_frame
+
+def make_plant_input_nc(out_dir, nyears, seed = 1, resol = 0.5, lat_ll = 49.0, lat_ur = 59.0, lon_ll = -8.0,
+                                                                                                    lon_ur = 2.0):
+    """
+    plant input grid of annual values on a regular lat/lon grid
+    """
+    rng = np.random.default_rng(seed)
+    lats = np.arange(lat_ll + resol/2, lat_ur, resol)
+    lons = np.arange(lon_ll + resol/2, lon_ur, resol)
+    nc_fname = join(out_dir, 'plant_inputs_synthetic.nc')
+    with Dataset(nc_fname, 'w') as nc_dset:
+        nc_dset.createDimension('time', nyears)
+        nc_dset.createDimension('lat', len(lats))
+        nc_dset.createDimension('lon', len(lons))
+        nc_dset.createVariable('lat', 'f4', ('lat',))[:] = lats
+        nc_dset.createVariable('lon', 'f4', ('lon',))[:] = lons
+        nc_dset.createVariable('time', 'i4', ('time',))[:] = np.arange(nyears)
+        pi_var = nc_dset.createVariable(PI_VAR, 'f4', ('time', 'lat', 'lon'), fill_value = -999.0)
+        pi_var[:] = rng.uniform(100.0, 800.0, (nyears, len(lats), len(lons)))
+
+    return nc_fname
+
+def chess_tas(rng, shape, mean_tas = 282.5):
+    """
+    monthly near-surface air temperatures in Kelvin starting in January, first axis is time - a seasonal cycle with
+    noise which, as for monthly means over Great Britain, stays above freezing
+    """
+    seasonal = mean_tas - 6.0*np.cos(2.0*np.pi*np.arange(shape[0])/MNTHS_YR)
+    tas = seasonal.reshape((-1,) + (1,)*(len(shape) - 1)) + 1.5*rng.standard_normal(shape)
+
+    return np.maximum(tas, 273.65)
+
+def _chess_nc(nc_fname, varname, vals):
+
+    with Dataset(nc_fname, 'w') as nc_dset:
+        nc_dset.createDimension('time', vals.shape[0])
+        nc_dset.createDimension('y', vals.shape[1])
+        nc_dset.createDimension('x', vals.shape[2])
+        nc_var = nc_dset.createVariable(varname, 'f4', ('time', 'y', 'x'), chunksizes = (vals.shape[0], 1, 1))
+        nc_var[:] = vals
+
+def make_chess_climgen(out_dir, side, nyears, seed = 1):
+    """
+    CHESS style NetCDF files on a 1 km grid of side by side cells and a climgen like object which refers to them
+    returns climgen and grid cells as used by add_data_to_grid_cells
+    """
+    rng = np.random.default_rng(seed)
+    nmnths_hist = (nyears // 2)*MNTHS_YR + 1     # historic dataset has an extra month
+    nmnths_fut = (nyears - nyears // 2)*MNTHS_YR
+    shape_hist = (nmnths_hist, side, side)
+    shape_fut = (nmnths_fut, side, side)
+
+    climgen = SimpleNamespace(wthr_rsrc_key = 'CHESS', wthr_rsrc = 'CHESS', sims_dir = out_dir, mnthly_flag = True,
+                              hist_start_year = 1961, max_num_years = nyears, fut_strt_indx = 0)
+    fnames = {'hist_precip_fname': ('precip', rng.gamma(2.0, 1.5e-5, shape_hist)),
+              'hist_tas_fname': ('tas', chess_tas(rng, shape_hist)),
+              'fut_precip_fname': ('pr', rng.gamma(2.0, 1.5e-5, shape_fut)),
+              'fut_tas_fname': ('tas', chess_tas(rng, shape_fut, 283.5))}
+    for attr, (varname, vals) in fnames.items():
+        nc_fname = join(out_dir, 'chess_' + attr.replace('_fname', '.nc'))
+        _chess_nc(nc_fname, varname, vals)
+        setattr(climgen, attr, nc_fname)
+
+    climgen.lta_nc_fname = join(out_dir, 'chess_lta.nc')
+    with Dataset(climgen.lta_nc_fname, 'w') as nc_dset:
+        nc_dset.createDimension('time', MNTHS_YR)
+        nc_dset.createDimension('y', side)
+        nc_dset.createDimension('x', side)
+        for metric in ['precip', 'tas', 'pet']:
+            nc_dset.createVariable(metric, 'f4', ('time', 'y', 'x'))[:] = rng.uniform(0.0, 50.0, (MNTHS_YR, side, side))
+
+    grid_cells = {}
+    for indx_nrth in range(side):
+        for indx_east in range(side):
+            grid_ref = '{:0=3d}_{:0=3d}'.format(indx_nrth, indx_east)
+            grid_cells[grid_ref] = SimpleNamespace(indx_nrth = indx_nrth, indx_east = indx_east, lta = {},
+                                                                        lat = 50.0 + indx_nrth/111.0)
+    return climgen, grid_cells
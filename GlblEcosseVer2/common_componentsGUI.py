@@ -22,18 +22,12 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (QLabel, QLineEdit, QComboBox, QPushButton, QCheckBox, QRadioButton, QButtonGroup)
 
 from initialise_funcs import write_study_definition_file, read_config_file, write_config_file
+from common_defns import RESOLUTIONS, LU_DEFNS, HILDA_LANDUSES, set_land_use_types
 
 WDGT_SIZE_60 = 60
 WDGT_SIZE_100 = 100
 WDGT_SIZE_40 = 40
 
-RESOLUTIONS = {120:'30"', 30:'2\'', 20:'3\'', 10:'6\'', 8:'7\' 30"', 6:'10\'', 4:'15\'', 3:'20\'', 2:'30\''}
-LU_DEFNS = {'lu_type' : ['Arable','Forestry','Miscanthus','Grassland','Semi-natural', 'SRC', 'Rapeseed', 'Sugar cane'],
-                   'abbrev': ['ara',   'for',      'mis',      'gra',      'nat',     'src', 'rps',      'sgc'],
-                        'ilu':[1,        3,          5,          2,          4,          6,     7,          7]}
-
-HILDA_LANDUSES = ['cropland', 'pasture', 'other', 'forest', 'grassland', 'all']
-
 # run modes
 # =========
 SPATIAL = 1
@@ -69,15 +63,7 @@ def commonSection(form, grid, irow):
     # =================
     # hist_syears, hist_eyears, fut_syears, fut_eyears, scenarios = get_weather_parms(form, 'CRU')
     equimodeDflt = '9.5'
-    form.depths = list([30,100]) # soil depths
-
-    luTypes = {}; lu_type_abbrevs = {}
-    for lu_type, abbrev, ilu in zip(LU_DEFNS['lu_type'], LU_DEFNS['abbrev'], LU_DEFNS['ilu']):
-        luTypes[lu_type] = ilu
-        lu_type_abbrevs[lu_type] = abbrev
-
-    form.land_use_types = luTypes
-    form.lu_type_abbrevs = lu_type_abbrevs
+    set_land_use_types(form)
 
     # resources
     # =========
@@ -0,0 +1,37 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        common_defns.py
+# Purpose:     definitions shared by the GUI and the batch runner which have no dependence on PyQt5
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'common_defns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+RESOLUTIONS = {120:'30"', 30:'2\'', 20:'3\'', 10:'6\'', 8:'7\' 30"', 6:'10\'', 4:'15\'', 3:'20\'', 2:'30\''}
+LU_DEFNS = {'lu_type' : ['Arable','Forestry','Miscanthus','Grassland','Semi-natural', 'SRC', 'Rapeseed', 'Sugar cane'],
+                   'abbrev': ['ara',   'for',      'mis',      'gra',      'nat',     'src', 'rps',      'sgc'],
+                        'ilu':[1,        3,          5,          2,          4,          6,     7,          7]}
+
+HILDA_LANDUSES = ['cropland', 'pasture', 'other', 'forest', 'grassland', 'all']
+
+def set_land_use_types(form):
+    """
+    soil depths and land use types and abbreviations, as set by commonSection of the GUI
+    """
+    form.depths = list([30,100]) # soil depths
+
+    luTypes = {}; lu_type_abbrevs = {}
+    for lu_type, abbrev, ilu in zip(LU_DEFNS['lu_type'], LU_DEFNS['abbrev'], LU_DEFNS['ilu']):
+        luTypes[lu_type] = ilu
+        lu_type_abbrevs[lu_type] = abbrev
+
+    form.land_use_types = luTypes
+    form.lu_type_abbrevs = lu_type_abbrevs
+
+    return
@@ -0,0 +1,323 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        form_proxy_fns.py
+# Purpose:     widget-free stand-ins for the main GUI form
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the high level functions read settings directly from widgets of the form e.g. form.w_use_dom_soil.isChecked()
+#   so a snapshot of the form, in which each widget is replaced by a WdgtProxy recording its state, can be passed
+#   to processes which have no access to the GUI
+#   HeadlessForm enables studies to be run without a GUI - see GlblEcsseBatch.py
+#   similarly threads writing simulation files are given a widget-free copy of the form - see site_writer_fns.py
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'form_proxy_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import pickle
+from copy import copy
+from netCDF4 import Dataset
+try:
+    from PyQt5.QtWidgets import QWidget, QCheckBox, QComboBox, QLineEdit, QLabel
+except ImportError:
+    QWidget = None      # batch runs without PyQt5, forms then hold no Qt widgets
+
+WDGT_PREFIXES = ('w_', 'combo', 'lbl')     # names of widget attributes of the form start with these
+WARN_STR = '*** Warning *** '
+
+def _no_op(*args, **kwargs):
+    """
+    used for widget methods which have no bearing on the simulation files e.g. setToolTip
+    """
+    return None
+
+class WdgtProxy(object):
+    """
+    records the state of a check box, line edit, label or combo box and responds to the same methods
+    """
+    def __init__(self, text = '', checked = False, items = None, indx = -1):
+
+        self._text = text
+        self._checked = checked
+        if items is None:
+            self._items = []
+        else:
+            self._items = list(items)
+        self._indx = indx
+        self._enabled = True
+
+    def __getattr__(self, name):
+        """
+        methods not implemented below are treated as no-ops e.g. setToolTip, setFixedWidth
+        """
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _no_op
+
+    # line edits and labels
+    # =====================
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        self._text = str(text)
+
+    # check boxes
+    # ===========
+    def isChecked(self):
+        return self._checked
+
+    def setChecked(self, flag):
+        self._checked = bool(flag)
+
+    def checkState(self):
+        if self._checked:
+            return 2
+        else:
+            return 0
+
+    def setCheckState(self, state):
+        self._checked = state > 0
+
+    # combo boxes
+    # ===========
+    def currentText(self):
+        if 0 <= self._indx < len(self._items):
+            return self._items[self._indx]
+        else:
+            return ''
+
+    def currentIndex(self):
+        return self._indx
+
+    def setCurrentIndex(self, indx):
+        if 0 <= indx < len(self._items):
+            self._indx = indx
+
+    def setCurrentText(self, text):
+        """
+        unlike a QComboBox, an unknown item is added so that settings from the config file are never lost
+        """
+        if text not in self._items:
+            self._items.append(text)
+        self._indx = self._items.index(text)
+
+    def addItem(self, item):
+        self._items.append(item)
+        if self._indx < 0:
+            self._indx = 0
+
+    def addItems(self, items):
+        for item in items:
+            self.addItem(item)
+
+    def clear(self):
+        self._items = []
+        self._indx = -1
+
+    def count(self):
+        return len(self._items)
+
+    def itemText(self, indx):
+        return self._items[indx]
+
+    def findText(self, text):
+        if text in self._items:
+            return self._items.index(text)
+        else:
+            return -1
+
+    # all widgets
+    # ===========
+    def isEnabled(self):
+        return self._enabled
+
+    def setEnabled(self, flag):
+        self._enabled = bool(flag)
+
+class FormProxy(object):
+    """
+    plain object which takes the place of the GUI form
+    """
+    pass
+
+class HeadlessForm(FormProxy):
+    """
+    form for batch runs - widgets are created on first reference so that functions written for the GUI,
+    such as read_config_file, can populate them
+    once config_read is called, a widget first referenced thereafter was not set from the configuration file and
+    its state, e.g. unchecked, may differ from that of the GUI - this is reported
+    """
+    _config_read = False
+
+    def __init__(self, land_uses):
+
+        self.w_hilda_lus = {lu: WdgtProxy() for lu in land_uses}
+
+    def __getattr__(self, name):
+
+        if name.startswith(WDGT_PREFIXES):
+            if self._config_read:
+                mess = WARN_STR + 'widget {} is not set from the configuration file - its state may differ ' \
+                                                                                    'from that of the GUI'.format(name)
+                print(mess)
+                if 'lgr' in vars(self):
+                    self.lgr.warning(mess)
+            wdgt = WdgtProxy()
+            setattr(self, name, wdgt)
+            return wdgt
+        else:
+            raise AttributeError(name)
+
+    def config_read(self):
+        """
+        called once the configuration file has been read
+        """
+        self._config_read = True
+
+    def adjustLuChckBoxes(self):
+        """
+        no check boxes to enable or disable
+        """
+        pass
+
+class NcDsetPath(object):
+    """
+    placeholder for an open NetCDF dataset which cannot be passed between processes
+    """
+    def __init__(self, nc_fname):
+
+        self.nc_fname = nc_fname
+
+def _is_widget(val):
+
+    return QWidget is not None and isinstance(val, QWidget)
+
+def _is_widget_dict(val):
+    """
+    e.g. w_hilda_lus
+    """
+    return isinstance(val, dict) and len(val) > 0 and all(_is_widget(wdgt) for wdgt in val.values())
+
+def _wdgt_to_proxy(wdgt):
+    """
+    record state of a Qt widget
+    """
+    if isinstance(wdgt, QCheckBox):
+        return WdgtProxy(text = wdgt.text(), checked = wdgt.isChecked())
+
+    elif isinstance(wdgt, QComboBox):
+        items = [wdgt.itemText(indx) for indx in range(wdgt.count())]
+        return WdgtProxy(items = items, indx = wdgt.currentIndex())
+
+    elif isinstance(wdgt, (QLineEdit, QLabel)):
+        return WdgtProxy(text = wdgt.text())
+
+    else:
+        return WdgtProxy()     # e.g. progress, report and push buttons
+
+def _is_picklable(val):
+    """
+    check that the value can be passed to another process
+    """
+    try:
+        pickle.dumps(val, protocol = pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return False
+
+    return True
+
+def _picklable_copy(obj):
+    """
+    return a shallow copy of obj stripped of those attributes which cannot be pickled e.g. a reference to the form
+    """
+    obj_copy = copy(obj)
+    for attr, val in vars(obj).items():
+        if not _is_picklable(val):
+            delattr(obj_copy, attr)
+
+    return obj_copy
+
+def _snapshot_value(val):
+    """
+    return a picklable equivalent of val or None if there is no equivalent
+    """
+    if _is_widget(val):
+        return _wdgt_to_proxy(val)
+
+    if _is_widget_dict(val):
+        return {key: _wdgt_to_proxy(val[key]) for key in val}
+
+    if _is_picklable(val):
+        return val
+
+    if hasattr(val, '__dict__'):
+        return _picklable_copy(val)     # e.g. hwsd_mu_globals
+
+    return None
+
+def snapshot_form(form):
+    """
+    create a picklable copy of the form in which widgets are replaced by proxies
+    open file handles, such as the study files, are not carried over
+    """
+    form_proxy = FormProxy()
+    for attr, val in vars(form).items():
+        val_proxy = _snapshot_value(val)
+        if val_proxy is not None:
+            setattr(form_proxy, attr, val_proxy)
+
+    return form_proxy
+
+def widget_free_copy(form):
+    """
+    shallow copy of the form in which widgets are replaced by proxies so that it can be read by threads other
+    than the GUI thread - unlike snapshot_form, other attributes are shared with the form
+    """
+    form_copy = copy(form)
+    for attr, val in vars(form).items():
+        if _is_widget(val):
+            setattr(form_copy, attr, _wdgt_to_proxy(val))
+
+        elif _is_widget_dict(val):
+            setattr(form_copy, attr, {key: _wdgt_to_proxy(val[key]) for key in val})
+
+    return form_copy
+
+def detach_nc_dsets(obj):
+    """
+    return a shallow copy of obj with any open NetCDF datasets replaced by their file names
+    """
+    if obj is None or not hasattr(obj, '__dict__'):
+        return obj
+
+    if not any(isinstance(val, Dataset) for val in vars(obj).values()):
+        return obj
+
+    obj_copy = copy(obj)
+    for attr, val in vars(obj).items():
+        if isinstance(val, Dataset):
+            if val.isopen():
+                setattr(obj_copy, attr, NcDsetPath(val.filepath()))
+            else:
+                setattr(obj_copy, attr, None)
+
+    return obj_copy
+
+def reattach_nc_dsets(obj):
+    """
+    reopen NetCDF datasets detached by detach_nc_dsets
+    """
+    if obj is None or not hasattr(obj, '__dict__'):
+        return
+
+    for attr, val in vars(obj).items():
+        if isinstance(val, NcDsetPath):
+            setattr(obj, attr, Dataset(val.nc_fname, mode='r'))
+
+    return
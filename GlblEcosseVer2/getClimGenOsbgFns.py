@@ -11,17 +11,18 @@
 __prog__ = 'getClimGenOsbgFns.py'
 __author__ = 's03mm5'
 
-from PyQt5.QtWidgets import QApplication
 from calendar import isleap, monthrange
 from math import floor, ceil
 from netCDF4 import Dataset
-from csv import writer as csv_writer
-from os.path import exists, normpath, split, join, lexists, basename
+from os.path import exists, normpath, split, join, lexists, basename, isfile
 from os import makedirs
 from glob import glob
 from copy import copy
+from hashlib import sha1
+import numpy as np
 
-from thornthwaite import thornthwaite
+from pet_batch_fns import thornthwaite_batch
+from gui_events_fns import process_events
 from cvrtcoord import WGS84toOSGB36
 
 ERROR_STR = '*** Error *** '
@@ -29,10 +30,30 @@ METRICS = ['precip', 'tas']
 METRICS_LTA = METRICS + ['pet']
 MNTHS_YR = 12
 numSecsDay = 3600*24
+SLAB_MAX_BYTES = 32*1024*1024   # maximum size of a hyperslab read from a variable, four are held at once
+MET_HASH_FNAME = 'met_inputs.sha1'     # records inputs from which the met files of a grid cell were generated
 
-def _make_met_files_osgb(clim_dir, lat, climgen, pettmp_grid_cell = None):
+def _met_inputs_hash(climgen, grid_cell):
+    """
+    hash of the datasets, grid indices, years and latitude from which the met files of a grid cell are generated
+    """
+    inputs = list([climgen.hist_precip_fname, climgen.hist_tas_fname, climgen.fut_precip_fname,
+                   climgen.fut_tas_fname, climgen.fut_strt_indx, climgen.hist_start_year, climgen.max_num_years,
+                   grid_cell.indx_nrth, grid_cell.indx_east, grid_cell.lat])
+
+    return sha1(repr(inputs).encode()).hexdigest()
+
+def _days_in_months(years):
+    """
+    number of days in each month of the given years
+    """
+    return np.array([monthrange(year, imnth)[1] for year in years for imnth in range(1, MNTHS_YR + 1)])
+
+def _make_met_files_osgb(clim_dir, lat, climgen, pettmp_grid_cell = None, inputs_hash = None):
     """
     feed annual temperatures to Thornthwaite equations to estimate Potential Evapotranspiration [mm/month]
+    PET is taken from pettmp_grid_cell when already calculated for a group of cells
+    existing met files are reused only if generated from the same inputs, where the inputs hash is supplied
     """
     func_name = __prog__ + '  _make_met_files_osgb'
 
@@ -45,9 +66,10 @@ def _make_met_files_osgb(clim_dir, lat, climgen, pettmp_grid_cell = None):
 
     # check if met files already exist
     # ================================
+    hash_fname = join(clim_dir, MET_HASH_FNAME)
     if lexists(clim_dir):
-        met_files = glob(clim_dir + '\\met*s.txt')
-        if len(met_files) >= nyears:
+        met_files = glob(join(clim_dir, 'met*s.txt'))
+        if len(met_files) >= nyears and _met_hash_matches(hash_fname, inputs_hash):
             for met_file in met_files:
                 dummy, short_name = split(met_file)
                 met_fnames.append(short_name)
@@ -56,65 +78,122 @@ def _make_met_files_osgb(clim_dir, lat, climgen, pettmp_grid_cell = None):
 
     if pettmp_grid_cell is None:        # check for met files only
         return met_fnames
+    met_fnames = []
 
-    pettmp_precip = pettmp_grid_cell['precip']
-    pettmp_tas = [val - 273.15 for val in pettmp_grid_cell['tas']]     # CHESS Near-Surface air temperature is in Kelvin
+    # convert whole time series in one step
+    # =====================================
+    pettmp_precip = np.asarray(pettmp_grid_cell['precip'], dtype = float)
+    pettmp_tas = np.asarray(pettmp_grid_cell['tas'], dtype = float) - 273.15    # CHESS Near-Surface air temperature is in Kelvin
 
-    # create met files
-    # ================
     strt_year = climgen.hist_start_year
     nmnths = len(pettmp_precip)
-    indx1 = 0
+    nyears_wthr = min(nyears, nmnths // MNTHS_YR)
+    if nyears_wthr < nyears:
+        print('indx2: {}\tnmnths: {}'.format(MNTHS_YR*(nyears_wthr + 1), nmnths))
+
+    years = list(range(strt_year, strt_year + nyears_wthr))
+    nmnths = MNTHS_YR*nyears_wthr
+    temp_mean = pettmp_tas[:nmnths]
+
+    # convert precipitation with units: kg m-2 s-1 to mm per month
+    # ============================================================
+    precip_mm = pettmp_precip[:nmnths] * numSecsDay * _days_in_months(years)
+
+    if 'pet' in pettmp_grid_cell:
+        pet = pettmp_grid_cell['pet'][:nmnths]
+    else:
+        pet = thornthwaite_batch(temp_mean, [lat], strt_year)[0]
+
+    # TODO: do something about occasional runtime warning...
+    # Python round as before vectorising, np.round differs for some values e.g. 293.835 K gives 20.68 not 20.69
+    pot_evapotrans = [round(p, 2) for p in pet]     # values from thornthwaite may not be floats
+    precip_out     = [round(p, 2) for p in precip_mm.tolist()]
+    tmean_out      = [round(t, 2) for t in temp_mean.tolist()]
 
-    for year in range(strt_year, strt_year + nyears):
+    # write each file from a preformatted buffer
+    # ==========================================
+    for iyr, year in enumerate(years):
         fname = 'met{}s.txt'.format(year)
         met_fnames.append(fname)
-        met_path = join(clim_dir, fname)
-        monthrange(year, 2)
-
-        indx2 = indx1 + MNTHS_YR
-        if indx2 > nmnths:
-            print('indx2: {}\tnmnths: {}'.format(indx2, nmnths))
-            break
-
-        # air temperature
-        # ===============
-        if indx2 == nmnths:
-            temp_mean     = pettmp_tas[indx1:]
-            precip_for_yr = pettmp_precip[indx1:]
-        else:
-            temp_mean     = pettmp_tas[indx1:indx2]
-            precip_for_yr = pettmp_precip[indx1:indx2]
-
-        pet = thornthwaite(temp_mean, lat, year)
-
-        # convert precipitation with units: kg m-2 s-1 to mm per month
-        # ============================================================
-        precips = []
-        for imnth, precip in enumerate(precip_for_yr):
-            ndays = monthrange(year, imnth + 1)[1]
-            precip_mm = precip * numSecsDay * ndays
-            precips.append(precip_mm)
-
-        # TODO: do something about occasional runtime warning...
-        pot_evapotrans = [round(p, 2) for p in pet]
-        precip_out     = [round(p, 2) for p in precips]
-        tmean_out      = [round(t, 2) for t in temp_mean]
-
-        # write file
-        # ==========
-        output = []
-        for tstep, mean_temp in enumerate(tmean_out):
-            output.append([tstep+1, precip_out[tstep], pot_evapotrans[tstep], mean_temp])
-
-        with open(met_path, 'w', newline='') as fpout:
-            writer = csv_writer(fpout, delimiter='\t')
-            writer.writerows(output)
-
-        indx1 += MNTHS_YR
+
+        indx1 = iyr*MNTHS_YR
+        lines = ['{}\t{}\t{}\t{}\r\n'.format(tstep + 1, precip_out[indx], pot_evapotrans[indx], tmean_out[indx])
+                                                    for tstep, indx in enumerate(range(indx1, indx1 + MNTHS_YR))]
+        with open(join(clim_dir, fname), 'w', newline='') as fpout:
+            fpout.write(''.join(lines))
+
+    if inputs_hash is not None:
+        with open(hash_fname, 'w') as fhash:
+            fhash.write(inputs_hash)
 
     return met_fnames
 
+def _met_hash_matches(hash_fname, inputs_hash):
+    """
+    met files written before inputs were recorded are accepted on the basis of their number alone
+    """
+    if inputs_hash is None or not isfile(hash_fname):
+        return True
+
+    with open(hash_fname, 'r') as fhash:
+        return fhash.read().strip() == inputs_hash
+
+def _chunk_grid_refs(grid_cells, grid_refs, ntsteps, itemsize):
+    """
+    split grid cells into groups, ordered by northing then easting, such that the hyperslab enclosing each group
+    does not exceed SLAB_MAX_BYTES for a variable with ntsteps time steps of itemsize bytes
+    """
+    max_vals = SLAB_MAX_BYTES//itemsize
+    chunks = []
+    chunk = []
+    for grid_ref in sorted(grid_refs, key = lambda ref: (grid_cells[ref].indx_nrth, grid_cells[ref].indx_east)):
+        indx_nrth = grid_cells[grid_ref].indx_nrth
+        indx_east = grid_cells[grid_ref].indx_east
+        if len(chunk) > 0:
+            nrth_min, nrth_max = min(nrth_min, indx_nrth), max(nrth_max, indx_nrth)
+            east_min, east_max = min(east_min, indx_east), max(east_max, indx_east)
+            if ntsteps*(nrth_max - nrth_min + 1)*(east_max - east_min + 1) <= max_vals:
+                chunk.append(grid_ref)
+                continue
+            chunks.append(chunk)
+
+        chunk = [grid_ref]
+        nrth_min, nrth_max, east_min, east_max = indx_nrth, indx_nrth, indx_east, indx_east
+
+    if len(chunk) > 0:
+        chunks.append(chunk)
+
+    return chunks
+
+def _wthr_tsteps(climgen):
+    """
+    number of monthly time steps of weather for each grid cell, the last month of historic data is discarded
+    """
+    return climgen.hist_precip_dset['precip'].shape[0] - 1 + climgen.fut_precip_dset['pr'].shape[0] - \
+                                                                                                climgen.fut_strt_indx
+
+def _read_slab(variable, time_slice, grid_cells, grid_refs):
+    """
+    read hyperslab of variable enclosing the grid cells in a single call
+    returns values in memory and northing and easting indices of its origin
+    """
+    indx_nrth_min = min(grid_cells[ref].indx_nrth for ref in grid_refs)
+    indx_nrth_max = max(grid_cells[ref].indx_nrth for ref in grid_refs)
+    indx_east_min = min(grid_cells[ref].indx_east for ref in grid_refs)
+    indx_east_max = max(grid_cells[ref].indx_east for ref in grid_refs)
+
+    slab = variable[time_slice, indx_nrth_min:indx_nrth_max + 1, indx_east_min:indx_east_max + 1]
+
+    return slab, indx_nrth_min, indx_east_min
+
+def _slab_vals(slab_defn, grid_cell):
+    """
+    values for a single grid cell from a hyperslab
+    """
+    slab, indx_nrth_min, indx_east_min = slab_defn
+
+    return [float(val) for val in slab[:, grid_cell.indx_nrth - indx_nrth_min, grid_cell.indx_east - indx_east_min]]
+
 def add_data_to_grid_cells(climgen, grid_cells):
     """
     units are taken care of when outputting met files in make_met_file
@@ -122,6 +201,8 @@ def add_data_to_grid_cells(climgen, grid_cells):
         tas in degrees Kelvin
 
     due to an anomoly in the historic dataset we must reduce number of time steps from by one month
+
+    rather than one read per grid cell, the hyperslab enclosing the grid cells is read once for each variable
     """
 
     wthr_rsrc = climgen.wthr_rsrc_key
@@ -131,44 +212,81 @@ def add_data_to_grid_cells(climgen, grid_cells):
     fut_tas_dset = climgen.fut_tas_dset
     fut_strt_indx = climgen.fut_strt_indx
 
+    # check if a complete set of met files for each grid cell already exists
+    # ======================================================================
+    wthr_refs = []
     for grid_ref in grid_cells.keys():
-        print('Adding CHESS data to cell '  + grid_ref)
-        QApplication.processEvents()
-
         grid_cell = copy(grid_cells[grid_ref])
-        indx_east = grid_cell.indx_east
-        indx_nrth = grid_cell.indx_nrth
 
-        # record LTAs
-        # ===========
-        for metric in METRICS_LTA:  # tas, pet, precip
-            grid_cell.lta[metric] = [float(val) for val in climgen.lta_nc_dset.variables[metric][:, indx_nrth, indx_east]]
-
-        # check if a complete set of met files for this grid cell already exists
-        # ======================================================================
-        lat = grid_cell.lat
         met_rel_path = '..\\..\\' + wthr_rsrc + '\\' + grid_ref + '\\'
         grid_cell.met_rel_path = met_rel_path
 
         clim_dir = normpath(join(climgen.sims_dir, wthr_rsrc, grid_ref))      #
-        met_fnames = _make_met_files_osgb(clim_dir, lat, climgen)     # check to see if met files are aleady present
+        # check to see if met files are aleady present and were generated from the same inputs
+        inputs_hash = _met_inputs_hash(climgen, grid_cell)
+        met_fnames = _make_met_files_osgb(clim_dir, grid_cell.lat, climgen, inputs_hash = inputs_hash)
         if len(met_fnames) == 0:
+            wthr_refs.append(grid_ref)
 
-            # discard last month of historic data
-            # ===================================
-            wthr = {}
-            hist_vals = [float(val) for val in hist_precip_dset['precip'][:-1, indx_nrth, indx_east]]
-            fut_vals  = [float(val) for val in fut_precip_dset['pr'][fut_strt_indx:, indx_nrth, indx_east]]
-            wthr['precip'] = hist_vals + fut_vals
+        grid_cells[grid_ref] = grid_cell
 
-            hist_vals = [float(val) for val in hist_tas_dset['tas'][:-1, indx_nrth, indx_east]]
-            fut_vals = [float(val) for val in fut_tas_dset['tas'][fut_strt_indx:, indx_nrth, indx_east]]
-            wthr['tas'] = hist_vals + fut_vals
+    # record LTAs
+    # ===========
+    lta_vars = climgen.lta_nc_dset.variables
+    itemsize = max(lta_vars[metric].dtype.itemsize for metric in METRICS_LTA)
+    for grid_refs in _chunk_grid_refs(grid_cells, list(grid_cells.keys()), lta_vars[METRICS_LTA[0]].shape[0],
+                                                                                                        itemsize):
+        for metric in METRICS_LTA:  # tas, pet, precip
+            slab_defn = _read_slab(lta_vars[metric], slice(None), grid_cells, grid_refs)
+            for grid_ref in grid_refs:
+                grid_cells[grid_ref].lta[metric] = _slab_vals(slab_defn, grid_cells[grid_ref])
 
-            met_fnames = _make_met_files_osgb(clim_dir, lat, climgen, wthr)
-            # grid_cell.wthr = wthr
+    if len(wthr_refs) == 0:
+        return
 
-        grid_cells[grid_ref] = grid_cell
+    # discard last month of historic data
+    # ===================================
+    hist_tslice = slice(None, -1)
+    fut_tslice = slice(fut_strt_indx, None)
+    ntsteps = _wthr_tsteps(climgen)
+    itemsize = max(hist_precip_dset['precip'].dtype.itemsize, fut_precip_dset['pr'].dtype.itemsize,
+                                                hist_tas_dset['tas'].dtype.itemsize, fut_tas_dset['tas'].dtype.itemsize)
+
+    for grid_refs in _chunk_grid_refs(grid_cells, wthr_refs, ntsteps, itemsize):
+        print('Reading CHESS data for {} cells'.format(len(grid_refs)))
+        process_events()
+
+        slabs = {'hist_precip': _read_slab(hist_precip_dset['precip'], hist_tslice, grid_cells, grid_refs),
+                 'fut_precip': _read_slab(fut_precip_dset['pr'], fut_tslice, grid_cells, grid_refs),
+                 'hist_tas': _read_slab(hist_tas_dset['tas'], hist_tslice, grid_cells, grid_refs),
+                 'fut_tas': _read_slab(fut_tas_dset['tas'], fut_tslice, grid_cells, grid_refs)}
+
+        wthr_cells = {}
+        for grid_ref in grid_refs:
+            grid_cell = grid_cells[grid_ref]
+            wthr = {}
+            wthr['precip'] = _slab_vals(slabs['hist_precip'], grid_cell) + _slab_vals(slabs['fut_precip'], grid_cell)
+            wthr['tas'] = _slab_vals(slabs['hist_tas'], grid_cell) + _slab_vals(slabs['fut_tas'], grid_cell)
+            wthr_cells[grid_ref] = wthr
+
+        # potential evapotranspiration for all cells and years of this group in one step
+        # ==============================================================================
+        nmnths = MNTHS_YR*climgen.max_num_years
+        temps = np.array([wthr_cells[grid_ref]['tas'][:nmnths] for grid_ref in grid_refs]) - 273.15
+        lats = [grid_cells[grid_ref].lat for grid_ref in grid_refs]
+        pets = thornthwaite_batch(temps, lats, climgen.hist_start_year)
+
+        for grid_ref, pet in zip(grid_refs, pets):
+            print('Adding CHESS data to cell '  + grid_ref)
+            process_events()
+
+            grid_cell = grid_cells[grid_ref]
+            wthr = wthr_cells[grid_ref]
+            wthr['pet'] = pet
+
+            clim_dir = normpath(join(climgen.sims_dir, wthr_rsrc, grid_ref))
+            inputs_hash = _met_inputs_hash(climgen, grid_cell)
+            met_fnames = _make_met_files_osgb(clim_dir, grid_cell.lat, climgen, wthr, inputs_hash)
 
     return
 
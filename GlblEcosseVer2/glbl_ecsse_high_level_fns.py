@@ -9,6 +9,16 @@
 #   comprises two functions:
 #       def _generate_ecosse_files(form, climgen, num_band)
 #       def generate_banded_sims(form)
+#   band height is chosen from the estimated number of cells per band - see band_height_fns.py
+#   bands are processed serially or, if num_procs setting exceeds 1, by a pool of processes - see band_pool_fns.py
+#   progress is recorded in a run manifest so that an interrupted study can be resumed - see run_manifest_fns.py
+#   the HWSD raster is optionally read once for the study - see hwsd_grid_fns.py
+#   AOI cells are mapped to weather cells for each band, or longitude tile of a band, in a single step
+#   - see band_wthr_fns.py and wthr_grid_index.py
+#   stages of each band are optionally timed - see stage_timer_fns.py
+#   simulation files are optionally written by a pool of threads - see site_writer_fns.py
+#   and optionally packed into one archive per band - see packed_output_fns.py
+#   or, optionally, identical met files are shared as each band finishes - see met_store_fns.py
 #-------------------------------------------------------------------------------
 #
 """
@@ -18,22 +28,35 @@ __version__ = '0.0.1'
 __author__ = 's03mm5'
 
 from time import time
-from operator import itemgetter
-from copy import copy
-from netCDF4 import Dataset
-from PyQt5.QtWidgets import QApplication
+from itertools import chain
+import numpy as np
 
 from make_ltd_data_files import MakeLtdDataFiles
 from getClimGenNC import ClimGenNC
 
-from getClimGenFns import check_clim_nc_limits, associate_climate
+from getClimGenFns import check_clim_nc_limits
 from getClimGenOsbgFns import fetch_chess_bbox_indices
 import hwsd_bil
 from hwsd_mu_globals_fns import gen_grid_cells_for_band
 from plant_input_fns import fetch_yields, associate_yield, associate_yield_nc
 from plant_input_csv_fns import associate_plant_inputs, cnvrt_joe_plant_inputs_to_df
+from plant_input_grid_fns import PlantInputCells, pi_grid_coords
+from nc_slab_fns import open_band_dataset
 from prepare_ecosse_files import update_progress, make_ecosse_file
 from mngmnt_fns_and_class import ManagementSet, check_mask_location
+from band_pool_fns import run_bands_in_pool
+from wthr_cache_fns import PettmpCache
+from run_manifest_fns import RunManifest, site_key
+from soil_rec_store import SoilRecStore
+from soil_rec_cache_fns import fetch_soil_recs
+from site_hash_fns import SiteHashIndex
+from band_wthr_fns import BandWeather
+from band_height_fns import choose_lat_step
+from hwsd_grid_fns import create_study_grid
+from stage_timer_fns import StageTimer, RunProfile
+from site_writer_fns import SiteWriterPool
+from packed_output_fns import BandPacker
+from met_store_fns import BandMetStore, release_met_files
 
 WARN_STR = '*** Warning *** '
 MASK_FLAG = False
@@ -44,119 +67,123 @@ def simplify_soil_recs(soil_recs, use_dom_soil_flag):
     simplify soil records if requested
     each mu_global points to a group of soils
     a soil group can have up to ten soils
+    soil_recs may be a dictionary or a SoilRecStore
+    returns a SoilRecStore which responds to the same lookups as the soil records dictionary
     """
     func_name =  __prog__ + ' _simplify_soil_recs'
 
-    num_raw = 0 # total number of sub-soils
-    num_compress = 0 # total number of sub-soils after compressions
-
-    new_soil_recs = {}
-    for mu_global in soil_recs:
-
-        # no processing necessary
-        # =======================
-        num_sub_soils = len(soil_recs[mu_global])
-        num_raw += num_sub_soils
-        if num_sub_soils == 1:
-            num_compress += 1
-            new_soil_recs[mu_global] = soil_recs[mu_global]
-            continue
-
-        # check each soil for duplicates
-        # ==============================
-        new_soil_group = []
-        soil_group = sorted(soil_recs[mu_global])
-
-        # skip empty groups
-        # =================
-        if len(soil_group) == 0:
-            continue
-
-        first_soil = soil_group[0]
-        metrics1 = first_soil[:-1]
-        share1   = first_soil[-1]
-        for soil in soil_group[1:]:
-            metrics2 = soil[:-1]
-            share2 =   soil[-1]
-            if metrics1 == metrics2:
-                share1 += share2
-            else:
-                new_soil_group.append(metrics1 + [share1])
-                metrics1 = metrics2
-                share1 = share2
-
-        new_soil_group.append(metrics1 + [share1])
-        num_sub_soils = len(new_soil_group)
-        num_compress += num_sub_soils
-        if num_sub_soils == 1:
-            new_soil_recs[mu_global] = new_soil_group
-            continue
-
-        if use_dom_soil_flag:
-            # assign 100% to the first entry of sorted list
-            # =============================================
-            dom_soil = copy(sorted(new_soil_group, reverse = True, key=itemgetter(-1))[0])
-            dom_soil[-1] = 100.0
-            new_soil_recs[mu_global] = list([dom_soil])
+    if isinstance(soil_recs, SoilRecStore):
+        soil_store = soil_recs
+    else:
+        soil_store = SoilRecStore.from_soil_recs(soil_recs)
+    new_soil_recs, num_raw, num_compress = soil_store.simplify(use_dom_soil_flag)
 
     mess = 'Leaving {}\trecords in: {} out: {}'.format(func_name, len(soil_recs),len(new_soil_recs))
     print(mess + '\tnum raw sub-soils: {}\tafter compression: {}'.format(num_raw, num_compress))
     return new_soil_recs
 
+def _aoi_flat_arrays(aoi_res):
+    """
+    flatten the mu_global content of AOI records into arrays of record index, mu_global and proportion
+    """
+    npairs = np.array([len(site_rec[-1]) for site_rec in aoi_res], dtype = np.int64)
+    rec_indices = np.repeat(np.arange(len(aoi_res)), npairs)
+    mu_globals = np.fromiter(chain.from_iterable(site_rec[-1].keys() for site_rec in aoi_res), dtype = np.int64,
+                                                                                            count = int(npairs.sum()))
+    props = np.array(list(chain.from_iterable(site_rec[-1].values() for site_rec in aoi_res)))
+
+    return npairs, rec_indices, mu_globals, props
+
 def _simplify_aoi(lggr, num_band, aoi_res):
     """
     simplify AOI records
+    each record with more than one mu_global is reduced to the most dominant mu_global, the first in the record
+    where proportions are equal, which is assigned the summed proportions
     """
-    aoi_res_new = []
-    nskipped = 0
-    for site_rec in aoi_res:
-        content = site_rec[-1]
-        npairs = len(content)
-        if npairs == 0:
-            lggr.info('No soil information for AOI cell {} - will skip'.format(site_rec))
-            nskipped += 1
-        elif npairs == 1:
-            aoi_res_new.append(site_rec)
-        else:
-            site_rec_list = list(site_rec)  # convert tuple to a list so we can edit last element
-            new_content = sorted(content.items(), reverse = True, key = itemgetter(1))  # sort content so we can pick up most dominant mu_global
-            total_proportion = sum(content.values())    # add up proportions
-            site_rec_list[-1] = {new_content[0][0]: total_proportion}       # create a new single mu global with summed proportions
-
-            aoi_res_new.append(tuple(site_rec_list)) # convert list to tuple
+    npairs, rec_indices, mu_globals, props = _aoi_flat_arrays(aoi_res)
+
+    nskipped = int(np.count_nonzero(npairs == 0))
+    for irec in np.flatnonzero(npairs == 0).tolist():
+        lggr.info('No soil information for AOI cell {} - will skip'.format(aoi_res[irec]))
+
+    aoi_res_new = list(aoi_res)
+    multi_indices = np.flatnonzero(npairs > 1)
+    if len(multi_indices) > 0:
+
+        # single group-by pass over the flat arrays: summed proportions and first maximum of each record
+        # ===============================================================================================
+        starts = np.concatenate([[0], np.cumsum(npairs)[:-1]])
+        totals = np.zeros(len(aoi_res), dtype = props.dtype)
+        for iadd in range(int(npairs.max())):
+            has_more = npairs > iadd
+            totals[has_more] = totals[has_more] + props[starts[has_more] + iadd]    # add in record order
+
+        rec_max = np.full(len(aoi_res), props.min(), dtype = props.dtype)
+        np.maximum.at(rec_max, rec_indices, props)
+        max_rows = np.flatnonzero(props == rec_max[rec_indices])
+        dummy, first_indices = np.unique(rec_indices[max_rows], return_index = True)
+        dom_rows = max_rows[first_indices]
+        dom_mu_globals = np.zeros(len(aoi_res), dtype = np.int64)
+        dom_mu_globals[rec_indices[dom_rows]] = mu_globals[dom_rows]
+
+        for irec, mu_global, total_proportion in zip(multi_indices.tolist(), dom_mu_globals[multi_indices].tolist(),
+                                                                                    totals[multi_indices].tolist()):
+            aoi_res_new[irec] = tuple(aoi_res_new[irec][:-1]) + ({mu_global: total_proportion},)
 
     if nskipped > 0:
+        aoi_res_new = [aoi_res_new[irec] for irec in np.flatnonzero(npairs > 0).tolist()]
         mess = 'No soil information for {} AOI cells for band {}'.format(nskipped, num_band)
         print(mess); lggr.info(mess)
 
     return aoi_res_new
 
-def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num_band, yield_defn, pi_var, pi_csv_tple):
+def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num_band, yield_defn, pi_var, pi_csv_tple,
+                                                                        wthr_cache, run_manifest, study_grid = None):
     """
     Main loop for generating ECOSSE outputs
+    returns band summary for the run manifest, or None if no simulation files could be created, and stage timings
     """
     func_name =  __prog__ + '\t_generate_ecosse_files'
 
+    timer = StageTimer(form.sttngs['profile_flag'])
+    band_start = timer.start()
+
     study = form.study
+
+    # bands completed by a previous run contribute their recorded study file lines only
+    # =================================================================================
+    band_summary = run_manifest.replay_band(num_band, form.fstudy)
+    if band_summary is not None:
+        mess = 'Band {}: replayed study file lines of {} cells completed by a previous run'\
+                                                                            .format(num_band, band_summary['ncells'])
+        print(mess); form.lgr.info(mess)
+        timer.stop('band_total', band_start)
+        return band_summary, timer.recs
+
     print('Gathering soil and climate data for study {}...\t\tin {}'.format(study,func_name))
-    snglPntFlag = False
 
-    # instantiate a soil grid and climate objects
-    hwsd = hwsd_bil.HWSD_bil(form.lgr, form.hwsd_dir)
+    # instantiate a soil grid and climate objects, the soil grid is a view of the HWSD window of the study if read
+    if study_grid is None:
+        hwsd = hwsd_bil.HWSD_bil(form.lgr, form.hwsd_dir)
+    else:
+        hwsd = study_grid.band_hwsd()
 
     # add requested grid resolution attributes to the form object
     bbox = form.sttngs['bbox']
 
     # create grid of mu_globals based on bounding box
     # ===============================================
+    start_time = timer.start()
     nvals_read = hwsd.read_bbox_hwsd_mu_globals(bbox, form.hwsd_mu_globals, form.sttngs['req_resol_upscale'])
 
     # retrieve dictionary consisting of mu_globals (keys) and number of occurences (values)
     # =====================================================================================
     mu_globals = hwsd.get_mu_globals_dict()
+    timer.stop('hwsd_read', start_time)
     if mu_globals is None:
         print('No soil records for AOI: {}\n'.format(bbox))
-        return
+        timer.stop('band_total', band_start)
+        return None, timer.recs
 
     mess = 'Retrieved {} values  of HWSD grid consisting of {} rows and {} columns: ' \
           '\n\tnumber of unique mu_globals: {}'.format(nvals_read, hwsd.nlats, hwsd.nlons, len(mu_globals))
@@ -165,9 +192,11 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
     # create soil records for each grid point
     # =======================================
     hwsd.bad_muglobals = form.hwsd_mu_globals.bad_mu_globals
+    start_time = timer.start()
     aoi_res, bbox = gen_grid_cells_for_band(hwsd, form.sttngs['req_resol_upscale'])
     if form.w_use_high_cover.isChecked():
         aoi_res =  _simplify_aoi(form.lgr, num_band, aoi_res)
+    timer.stop('gen_grid_cells', start_time)
 
     lon_ll_aoi, lat_ll_aoi, lon_ur_aoi, lat_ur_aoi = bbox
     num_meta_cells = len(aoi_res)
@@ -176,7 +205,8 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
     if num_meta_cells == 0:
         mess = 'No aoi_res recs therefore unable to create simulation files... \n'
         print(mess); form.lgr.info(mess)
-        return
+        timer.stop('band_total', band_start)
+        return None, timer.recs
 
     # 4.5 = estimated mean number of dominant soils per cell
     # ======================================================
@@ -188,26 +218,13 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
                                     .format(num_meta_cells, num_band, est_num_sims)
     form.lgr.info(mess); print(mess)
 
-    # generate weather dataset indices which enclose the AOI for this band
-    # ====================================================================
-    #indx_nrth_ll, indx_nrth_ur, indx_east_ll, indx_east_ur, nrthng_ll, nrthng_ur, eastng_ll, eastng_ur = chess_extent
-    # =============================
-    wthr_rsrc = climgen.wthr_rsrc
-
-    print('Getting future ' + wthr_rsrc + ' data for band {}'.format(num_band))
-    QApplication.processEvents()
-    mess = 'Getting historic ' + wthr_rsrc + 'data for band {}'.format(num_band)
-
-    if wthr_rsrc == 'CHESS':
-        aoi_indices = chess_extent[:4]
-        pettmp_fut = climgen.fetch_chess_NC_data(aoi_indices, num_band)
-        print(mess)
-        pettmp_hist = climgen.fetch_chess_NC_data(aoi_indices, num_band, future_flag = False)
-    else:
-        aoi_indices_fut, aoi_indices_hist = climgen.genLocalGrid(bbox, hwsd, snglPntFlag, num_band)
-        pettmp_fut = climgen.fetch_cru_future_NC_data(aoi_indices_fut, num_band)
-        print(mess)
-        pettmp_hist = climgen.fetch_cru_historic_NC_data(aoi_indices_hist, num_band)
+    # weather is fetched for the whole band or, where a memory budget is set, for each longitude tile in turn
+    # ========================================================================================================
+    band_wthr = BandWeather(form, climgen, wthr_cache, hwsd, bbox, chess_extent, num_band, timer)
+    if band_wthr.ntiles > 1:
+        mess = 'Band {} will be split into {} longitude tiles to limit weather held in memory to {} MB'\
+                                                .format(num_band, band_wthr.ntiles, form.sttngs['wthr_tile_max_mb'])
+        print(mess); form.lgr.info(mess)
 
     print('Creating simulation files for band {}...'.format(num_band))
     #      =========================================
@@ -216,17 +233,27 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
     # ===============================================================================================
     ltd_data = MakeLtdDataFiles(form, climgen, comments=True) # create limited data object
 
-    # open plant input NC dataset
-    # ===========================
+    # open plant input NC dataset, optionally reading the rows spanning the band once
+    # ================================================================================
+    slab_flag = form.sttngs['nc_slab_flag']
     if mask_defn is not None:
-        mask_defn.nc_dset = Dataset(mask_defn.nc_fname, mode='r')
+        mask_defn.nc_dset = open_band_dataset(mask_defn.nc_fname, bbox, slab_flag)
 
     if pi_var is not None:
-        yield_dset = Dataset(yield_defn.nc_fname, mode='r')
+        yield_dset = open_band_dataset(yield_defn.nc_fname, bbox, slab_flag)
+    else:
+        yield_dset = None
 
     if pi_csv_tple is not None:
         strt_year, nyears, pi_df = pi_csv_tple
 
+    # nearest cell of the yield grid for every AOI cell, plant inputs are associated once per cell
+    # ==============================================================================================
+    start_time = timer.start()
+    pi_lats, pi_lons = pi_grid_coords(yield_df, yield_dset)
+    pi_cells = PlantInputCells(aoi_res, pi_lats, pi_lons)
+    timer.stop('plant_inputs', start_time)
+
     last_time = time()
     completed = 0
     skipped = 0
@@ -236,19 +263,53 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
 
     land_use = 'forest'     # TODO
 
+    # cells completed before an interruption are skipped
+    # ==================================================
+    band_chckpnt = run_manifest.band_checkpoint(num_band)
+    nresumed = 0
+
+    # in incremental mode sites with unchanged inputs are not rewritten
+    # =================================================================
+    site_hashes = SiteHashIndex(form.sims_dir, study, num_band, form.sttngs['incremental_flag'])
+
+    # simulation files are written by a pool of threads while subsequent sites are prepared
+    # cells are checkpointed once their files are written
+    # =====================================================================================
+    def _site_written(key, study_lines, site_data):
+        site_hash, site_indx = site_data
+        site_hashes.record(key, site_hash, study_lines)
+        band_chckpnt.record(key, study_lines, site_hash, site_indx)
+
+    packer = BandPacker(form.sims_dir, study, num_band, form.sttngs['packed_flag'], form.sttngs['pack_staging_dir'],
+                                                                                            run_manifest.resume_flag)
+
+    # sites within the same weather cell share met files, files are staged so that duplicates need not be written
+    # ============================================================================================================
+    met_store = BandMetStore(form.sims_dir, study, num_band, form.sttngs['dedupe_met_flag'] and not packer.enabled,
+                                                        form.sttngs['pack_staging_dir'], run_manifest.resume_flag)
+    site_writer = SiteWriterPool(form, form.sttngs['num_writers'], form.sttngs['writer_queue_max'], _site_written,
+                                                                            packer if packer.enabled else met_store)
+
     # generate sets of Ecosse files for each site where each site has one or more soils
     # each soil can have one or more dominant soils
     # =======================================================================
-    for site_indx, site_rec in enumerate(aoi_res):
+    if band_wthr.ntiles > 1:
+        site_writer.hold_study_lines()
+
+    for site_indx in band_wthr.site_order(aoi_res):
+        site_rec = aoi_res[site_indx]
 
         # help with debug
         if site_indx == 9:
             print()
 
-        pettmp_grid_cell = associate_climate(site_rec, climgen, pettmp_hist, pettmp_fut)
-        if len(pettmp_grid_cell) == 0:
-            print('*** Warning *** no wthr data for site with lat: {}\tlon: {}'
-                                                        .format(round(site_rec[2],3), round(site_rec[3],3)))
+        key = site_key(site_rec)
+        if band_chckpnt.replay_site(site_writer, key):
+            nresumed += 1
+            continue
+
+        pettmp_grid_cell = band_wthr.grid_cell(site_indx, site_rec)
+        if pettmp_grid_cell is None:
             continue
 
         # land use mask
@@ -268,21 +329,74 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
             form.lgr.info(mess)
             skipped += 1
         else:
+            start_time = timer.start()
             if yield_df is not None:
-                associate_yield(form.lgr.info, latitude, longitude, ltd_data, yield_df)        # modify ltd_data object
+                pi_cells.associate(site_indx, ltd_data, associate_yield, form.lgr.info, latitude, longitude,
+                                                                                    ltd_data, yield_df)  # modify ltd_data
             elif pi_var is not None:
-                associate_yield_nc(form.lgr.info, latitude, longitude, ltd_data, yield_defn, yield_dset, pi_var)
+                pi_cells.associate(site_indx, ltd_data, associate_yield_nc, form.lgr.info, latitude, longitude,
+                                                                            ltd_data, yield_defn, yield_dset, pi_var)
             elif pi_csv_tple is not None:
-                associate_plant_inputs(form.lgr.info, strt_year, gran_lat, gran_lon, pi_df, ltd_data)
+                pi_cells.associate(site_indx, ltd_data, associate_plant_inputs, form.lgr.info, strt_year, gran_lat,
+                                                                                        gran_lon, pi_df, ltd_data)
+            timer.stop('plant_inputs', start_time)
+
+            start_time = timer.start()
+            if site_hashes.enabled:
+                site_hash = site_hashes.site_hash(site_rec, form.hwsd_mu_globals.soil_recs, pettmp_grid_cell,
+                                                        ltd_data, pi_cells.site_attribs, climgen, form, study)
+                study_lines = site_hashes.prev_study_lines(form, key, site_hash)
+            else:
+                site_hash, study_lines = None, None
 
-            make_ecosse_file(form, climgen, ltd_data, site_rec, study, pettmp_grid_cell)
+            if study_lines is None:
+                site_writer.submit(key, (site_hash, site_indx), make_ecosse_file, climgen,
+                                site_writer.site_copy(ltd_data, pi_cells.site_attribs, climgen), site_rec, study,
+                                                                                                    pettmp_grid_cell)
+            else:
+                site_writer.replay(key, (site_hash, site_indx), study_lines)
+            timer.stop('make_ecosse_file', start_time)
             completed += 1
             if completed >= form.sttngs['completed_max']:
                 print(WARN_STR + 'Exited after {} cells completed'.format(completed) )
+                band_chckpnt.exit_early = True
                 break
 
         last_time = update_progress(last_time, completed, num_meta_cells, skipped, warning_count, form.w_prgrss)
 
+    # wait for outstanding simulation files before closing datasets
+    # =============================================================
+    start_time = timer.start()
+    if band_wthr.ntiles > 1:
+        site_writer.release_study_lines([site_key(site_rec) for site_rec in aoi_res])
+    site_writer.close()
+    timer.stop('make_ecosse_file', start_time)
+
+    if band_wthr.nno_wthr > 0:
+        mess = WARN_STR + 'no wthr data for {} of {} AOI cells in band {}'.format(band_wthr.nno_wthr, num_meta_cells,
+                                                                                                            num_band)
+        print(mess); form.lgr.info(mess)
+
+    if packer.enabled:
+        start_time = timer.start()
+        nfiles = packer.pack()
+        timer.stop('pack_output', start_time)
+        mess = 'Band {}: packed {} simulation files into {}'.format(num_band, nfiles, packer.zip_fn)
+        print(mess); form.lgr.info(mess)
+
+    if met_store.enabled:
+        start_time = timer.start()
+        nfiles, nlinked, nbytes_saved = met_store.place()
+        timer.stop('place_met_files', start_time)
+        mess = 'Band {}: linked {} of {} met files to shared copies rather than writing them, saving {:.1f} MB'\
+                                                .format(num_band, nlinked, nfiles, nbytes_saved/(1024*1024))
+        print(mess); form.lgr.info(mess)
+
+    if pi_cells.nshared > 0:
+        mess = 'Band {}: plant inputs associated for {} cells of the yield grid and shared with {} further sites'\
+                                                            .format(num_band, pi_cells.ncalls, pi_cells.nshared)
+        print(mess); form.lgr.info(mess)
+
     # close plant input NC dataset
     # ============================
     if pi_var is not None:
@@ -293,8 +407,49 @@ def _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num
         print('\nBand: {}\tLU yes: {}  no: {}\tskipped: {}\tcompleted: {}'
               .format(num_band, landuse_yes, landuse_no, skipped, completed))
 
+    if nresumed > 0:
+        mess = 'Band {}: {} cells already completed by a previous run were replayed'.format(num_band, nresumed)
+        print(mess); form.lgr.info(mess)
+
+    site_hashes.close()
+    if site_hashes.nunchanged > 0:
+        mess = 'Band {}: {} cells with unchanged inputs were not rewritten'.format(num_band, site_hashes.nunchanged)
+        print(mess); form.lgr.info(mess)
+
+    band_summary = band_chckpnt.close()
+    timer.stop('band_total', band_start)
+
     print('')   # spacer
-    return
+    return band_summary, timer.recs
+
+def _fetch_bands(form, lon_ll, lat_ll, lon_ur, lat_ur, lat_step):
+    """
+    return number of latitude steps and list of band numbers and bounding boxes, ordered from north to south,
+    for those bands which overlap the HWSD aoi
+    """
+    start_at_band = form.sttngs['start_at_band']
+    nsteps = int((lat_ur-lat_ll)/lat_step) + 1
+    bands = []
+    for isec in range(nsteps):
+        lat_ll_new = lat_ur - lat_step
+        num_band = isec + 1
+
+        # if the latitude floor of the band has not reached the ceiling of the HWSD aoi then skip this band
+        # =================================================================================================
+        if lat_ll_new > form.hwsd_mu_globals.lat_ur_aoi or num_band < start_at_band:
+            print('Skipping out of area band {} of {} with latitude extent of min: {}\tmax: {}\n'
+                                                    .format(num_band, nsteps, round(lat_ll_new,6), round(lat_ur, 6)))
+        else:
+            bands.append((num_band, list([lon_ll, lat_ll_new, lon_ur, lat_ur])))
+
+        # check to see if the last band is reached
+        # =========================================
+        if form.hwsd_mu_globals.lat_ll_aoi > lat_ll_new or num_band == nsteps:
+            break
+
+        lat_ur = lat_ll_new
+
+    return nsteps, bands
 
 def generate_banded_sims(form):
     '''
@@ -354,8 +509,7 @@ def generate_banded_sims(form):
 
     # print('Study bounding box and HWSD CSV file overlap')
     #        ============================================
-    start_at_band = form.sttngs['start_at_band']
-    print('Starting at band {}'.format(start_at_band))
+    print('Starting at band {}'.format(form.sttngs['start_at_band']))
     yield_df = fetch_yields(form)
 
     # trap situation where both methods of including external plant inputs are active
@@ -366,59 +520,82 @@ def generate_banded_sims(form):
 
     # extract required values from the HWSD database and simplify if requested
     # ========================================================================
-    hwsd = hwsd_bil.HWSD_bil(form.lgr, form.hwsd_dir)
+    if form.sttngs['hwsd_study_grid_flag']:
+        study_grid = create_study_grid(form, form.sttngs['bbox'])
+    else:
+        study_grid = None
 
-    # TODO: patch to be sorted
-    # ========================
-    mu_global_pairs = {}
-    for mu_global in form.hwsd_mu_globals.mu_global_list:
-        mu_global_pairs[mu_global] = None
+    if study_grid is None:
+        hwsd = hwsd_bil.HWSD_bil(form.lgr, form.hwsd_dir)
+    else:
+        hwsd = study_grid.hwsd
 
-    soil_recs = hwsd.get_soil_recs(mu_global_pairs)  # list is already sorted
-    for mu_global in hwsd.bad_muglobals:
-        del(soil_recs[mu_global])
+    soil_recs, bad_mu_globals = fetch_soil_recs(form, hwsd, form.hwsd_mu_globals.mu_global_list)
 
     form.hwsd_mu_globals.soil_recs = simplify_soil_recs(soil_recs, dom_soil_flag)
-    form.hwsd_mu_globals.bad_mu_globals = [0] +  hwsd.bad_muglobals
+    form.hwsd_mu_globals.bad_mu_globals = [0] +  bad_mu_globals
     del(hwsd); del(soil_recs)
 
-    # create climate object
-    # =====================
+    # create climate object and weather cache
+    # =======================================
     climgen = ClimGenNC(form)
+    wthr_cache = PettmpCache(form.sttngs['wthr_cache_dir'], form.sttngs['wthr_cache_max_mb'])
 
     # main banding loop
     # =================
-    lat_step = 0.5
-    nsteps = int((lat_ur-lat_ll)/lat_step) + 1
-    for isec in range(nsteps):
-        lat_ll_new = lat_ur - lat_step
-        num_band = isec + 1
+    lat_step, mess = choose_lat_step(form, climgen, lon_ll, lat_ll, lon_ur, lat_ur)
+    print(mess); form.lgr.info(mess)
+    nsteps, bands = _fetch_bands(form, lon_ll, lat_ll, lon_ur, lat_ur, lat_step)
 
-        # if the latitude floor of the band has not reached the ceiling of the HWSD aoi then skip this band
-        # =================================================================================================
-        if lat_ll_new > form.hwsd_mu_globals.lat_ur_aoi or num_band < start_at_band:
-            print('Skipping out of area band {} of {} with latitude extent of min: {}\tmax: {}\n'
-                                                    .format(num_band, nsteps, round(lat_ll_new,6), round(lat_ur, 6)))
-        else:
-            form.sttngs['bbox'] = list([lon_ll, lat_ll_new, lon_ur, lat_ur])
+    # met files shared by a previous run must be separated before any are rewritten
+    # ===============================================================================
+    release_met_files(form.sims_dir, form.study)
+
+    # record progress so that an interrupted run can be resumed
+    # =========================================================
+    run_manifest = RunManifest(form.sims_dir, form.study, lat_step, list([lon_ll, lat_ll, lon_ur, lat_ur]),
+                                                                                            form.sttngs['resume_flag'])
+
+    # bands completed by a previous run are not regenerated but their study file lines are replayed
+    # ==============================================================================================
+    complete_bands = run_manifest.complete_bands()
+    if len(complete_bands) > 0:
+        print('Replaying {} bands completed by a previous run'.format(len(complete_bands)))
+
+    band_kwargs = {'climgen': climgen, 'chess_extent': chess_extent, 'mask_defn': mask_defn, 'yield_df': yield_df,
+                'yield_defn': yield_defn, 'pi_var': pi_var, 'pi_csv_tple': pi_csv_tple, 'wthr_cache': wthr_cache,
+                'run_manifest': run_manifest, 'study_grid': study_grid}
+
+    run_profile = RunProfile(form.sttngs['profile_flag'])
+
+    def _band_done(num_band, band_result):
+        band_summary, timings = band_result
+        run_manifest.band_finished(num_band, band_summary)
+        run_profile.add_band(num_band, timings)
+
+    num_procs = form.sttngs['num_procs']
+    if num_procs > 1 and len(bands) > 1:
+        for num_band, bbox in bands:
+            run_manifest.band_started(num_band)
+        run_bands_in_pool(form, bands, _generate_ecosse_files, band_kwargs, num_procs, _band_done)
+    else:
+        for num_band, bbox in bands:
+            form.sttngs['bbox'] = bbox
 
             print('\nProcessing band {} of {} with latitude extent of min: {}\tmax: {}'
-                  .format(num_band, nsteps, round(lat_ll_new,6), round(lat_ur, 6)))
+                  .format(num_band, nsteps, round(bbox[1], 6), round(bbox[3], 6)))
 
             # does actual work
             # ================
-            _generate_ecosse_files(form, climgen, chess_extent, mask_defn, yield_df, num_band,
-                                                                        yield_defn, pi_var, pi_csv_tple)
-
-        # check to see if the last band is completed
-        # ==========================================
-        lat_ll_aoi = form.hwsd_mu_globals.lat_ll_aoi
-        if lat_ll_aoi > lat_ll_new or num_band == nsteps:
-            print('Finished processing after {} bands of latitude extents'.format(num_band))
-            for ichan in range(len(form.fstudy)):
-                form.fstudy[ichan].close()
-            break
+            run_manifest.band_started(num_band)
+            _band_done(num_band, _generate_ecosse_files(form, num_band = num_band, **band_kwargs))
 
-        lat_ur = lat_ll_new
+    if len(bands) > 0:
+        print('Finished processing after {} bands of latitude extents'.format(bands[-1][0]))
+
+    run_profile.write_report(form.sims_dir, form.study)
+
+    for ichan in range(len(form.fstudy)):
+        form.fstudy[ichan].close()
 
     return
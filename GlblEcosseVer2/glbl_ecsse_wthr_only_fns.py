@@ -7,6 +7,7 @@
 # Licence:     <your licence>
 # Description:
 #   generate weather from HWSD file
+#   cells are mapped to weather cells and written in bulk - see wthr_grid_index.py
 #-------------------------------------------------------------------------------
 #
 """
@@ -16,16 +17,25 @@ __author__ = 's03mm5'
 
 from time import time
 import csv
+import json
 from os.path import join
-from PyQt5.QtWidgets import QApplication
+import numpy as np
 
 import getClimGenNC
 import hwsd_bil
 from glbl_ecsse_high_level_fns import simplify_soil_recs
 from prepare_ecosse_files import update_progress
-from getClimGenFns import check_clim_nc_limits, associate_climate
+from getClimGenFns import check_clim_nc_limits
+from wthr_grid_index import WthrGridIndex, METRICS
+from wthr_cache_fns import PettmpCache
+from soil_rec_cache_fns import fetch_soil_recs
+from gui_events_fns import process_events
 
 HEADERS = ['latitude', 'longitude', 'mu_global', 'gran_lat', 'gran_lon']
+CELLS_DTYPE = [('latitude', 'f8'), ('longitude', 'f8'), ('mu_global', 'i4'), ('gran_lat', 'i4'), ('gran_lon', 'i4')]
+OUTPUT_FMTS = ['txt', 'npy']
+WARN_STR = '*** Warning *** '
+WRITE_CHUNK = 10000     # number of cells gathered and written at once by _write_weather_bulk
 
 def generate_soil_output(form):
     """
@@ -54,13 +64,10 @@ def generate_soil_output(form):
     # ========================================================================
     hwsd = hwsd_bil.HWSD_bil(form.lgr, form.hwsd_dir)
 
-    mu_global_pairs = {mu_global : None for mu_global in form.hwsd_mu_globals.mu_global_list}     # dict comprehension
-    soil_recs = hwsd.get_soil_recs(mu_global_pairs)  # list is already sorted
-    for mu_global in hwsd.bad_muglobals:
-        del (soil_recs[mu_global])
+    soil_recs, bad_mu_globals = fetch_soil_recs(form, hwsd, form.hwsd_mu_globals.mu_global_list)
 
-    form.hwsd_mu_globals.soil_recs = simplify_soil_recs(soil_recs)
-    form.hwsd_mu_globals.bad_mu_globals = [0] + hwsd.bad_muglobals
+    form.hwsd_mu_globals.soil_recs = simplify_soil_recs(soil_recs, form.w_use_dom_soil.isChecked())
+    form.hwsd_mu_globals.bad_mu_globals = [0] + bad_mu_globals
     aoi_indices_fut, aoi_indices_hist = climgen.genLocalGrid(bbox, hwsd)
 
     # step through each cell
@@ -82,44 +89,86 @@ def generate_soil_output(form):
 
     # close CSV files
     # ==============
-    for key in wthr_csv.output_fhs:
-        wthr_csv.output_fhs[key].close()
+    wthr_csv.close()
     print('\nFinished processing')
 
     return
 
-def _fetch_weather(form, climgen, site_rec, pettmp_grid_cell):
+def _sim_period_indices(form, climgen):
     """
-    select requested time segment
+    indices of the simulation period within the future weather time series
     """
-    func_name = 'make_ecosse_file'
-
-    gran_lat, gran_lon, latitude, longitude, area, mu_globals_props = site_rec
-    sims_dir = form.sims_dir
-    fut_clim_scen = climgen.fut_clim_scen
-
-    # unpack weather
-    # ==============
-    pettmp_hist = {}
-    pettmp_fut  = {}
-    for metric in list(['precipitation','temperature']):
-        pettmp_hist[metric] = pettmp_grid_cell[metric][0]
-        pettmp_fut[metric]  = pettmp_grid_cell[metric][1]
-
-    sim_start_year = climgen.sim_start_year
-    sim_end_year = climgen.sim_end_year
-
-    hist_start_year = form.weather_sets['CRU_hist']['year_start']
-    hist_end_year = form.weather_sets['CRU_hist']['year_end']
     fut_start_year = form.weather_sets['ClimGen_A1B']['year_start']
+    indx_strt = 12*(climgen.sim_start_year - fut_start_year)
+    indx_end = 12*(climgen.sim_end_year - fut_start_year + 1)
 
-    pettmp_sim = {}
-    indx_strt = 12*(sim_start_year - fut_start_year)
-    indx_end = 12*(sim_end_year - fut_start_year + 1)
-    for metric in pettmp_fut:
-        pettmp_sim[metric] = pettmp_fut[metric][indx_strt:indx_end]
+    return indx_strt, indx_end
+
+def _writable_rows(vals):
+    """
+    float64 values are converted to Python floats whereas other types are retained so that
+    text output is identical to that from the lists returned by the fetch functions
+    """
+    if vals.dtype == np.float64:
+        return vals.tolist()
+    else:
+        return [list(row) for row in vals]
 
-    return pettmp_sim
+def _write_weather_bulk(form, climgen, wthr_csv, pettmp_hist, pettmp_fut):
+    """
+    map all cells of the HWSD CSV file to weather cells in a single step, then gather the simulation period for
+    each variable as a 2-D array slice and write the rows in blocks of WRITE_CHUNK cells
+    returns number of cells completed, skipped due to absence of historic weather and with no weather at all
+    """
+    data_frame = form.hwsd_mu_globals.data_frame
+    latitudes = np.round(data_frame['latitude'].values.astype(float), 5)
+    longitudes = np.round(data_frame['longitude'].values.astype(float), 5)
+
+    # site records as passed to associate_climate for cells which the lookup cannot resolve
+    # =====================================================================================
+    wthr_indx = WthrGridIndex(pettmp_hist, pettmp_fut)
+    aoi_recs = [list([gran_lat, gran_lon, latitude, longitude, mu_global, None]) for gran_lat, gran_lon, latitude,
+                longitude, mu_global in zip(data_frame['gran_lat'].values.astype(int).tolist(),
+                                            data_frame['gran_lon'].values.astype(int).tolist(), latitudes.tolist(),
+                                            longitudes.tolist(), data_frame['mu_global'].values.astype(int).tolist())]
+    cell_indices = wthr_indx.associate(aoi_recs, climgen)
+
+    no_wthr = cell_indices < 0
+    no_hist = np.zeros(len(cell_indices), dtype = bool)
+    no_hist[~no_wthr] = wthr_indx.hist_empty[cell_indices[~no_wthr]]
+    valid = ~no_wthr & ~no_hist
+
+    nno_wthr = int(no_wthr.sum())
+    if nno_wthr > 0:
+        print('*** Warning *** no weather data for {} sites'.format(nno_wthr))
+
+    nskipped = int(no_hist.sum())
+    if nskipped > 0:
+        form.lgr.info('No historic weather data for {} sites'.format(nskipped))
+
+    # site records comprise latitude, longitude, mu_global, gran_lat, gran_lon
+    # ========================================================================
+    site_cols = [latitudes[valid].tolist(), longitudes[valid].tolist(),
+                 data_frame['mu_global'].values[valid].astype(int).tolist(),
+                 data_frame['gran_lat'].values[valid].astype(int).tolist(),
+                 data_frame['gran_lon'].values[valid].astype(int).tolist()]
+
+    # gather and write the simulation period in blocks of cells to bound the memory held at once
+    # ===========================================================================================
+    indx_strt, indx_end = _sim_period_indices(form, climgen)
+    valid_indices = cell_indices[valid]
+    nvalid = len(valid_indices)
+    wthr_csv.create_results_files(nvalid)
+    for indx1 in range(0, nvalid, WRITE_CHUNK):
+        indx2 = min(indx1 + WRITE_CHUNK, nvalid)
+        site_recs = list(zip(*[site_col[indx1:indx2] for site_col in site_cols]))
+        vals_vars = {}
+        for varname, metric in zip(wthr_csv.varnames, METRICS):
+            vals_vars[varname] = wthr_indx.fut_array(metric)[valid_indices[indx1:indx2], indx_strt:indx_end]
+
+        wthr_csv.write_block(site_recs, vals_vars)
+
+    return nvalid, nskipped, nno_wthr
 
 def generate_weather_only(form):
     """
@@ -167,10 +216,9 @@ def generate_weather_only(form):
         return
     print(mess)
 
-    # Create and initialise CSV object
-    # ================================
-    wthr_csv = WthrCsvOutputs(form, climgen)
-    wthr_csv.create_results_files()
+    # Create CSV object, results files are created once the number of cells with weather is known
+    # ===========================================================================================
+    wthr_csv = WthrCsvOutputs(form, climgen, form.sttngs['wthr_output_fmt'])
 
     num_band = 0
     hwsd = hwsd_bil.HWSD_bil(form.lgr, form.hwsd_dir)
@@ -182,50 +230,23 @@ def generate_weather_only(form):
     data may be present in one but not the other 
     '''
     print('Getting future weather data for this HWSD CSV file')
-    QApplication.processEvents()
-    pettmp_fut = climgen.fetch_cru_future_NC_data(aoi_indices_fut, num_band)
+    process_events()
+    wthr_cache = PettmpCache(form.sttngs['wthr_cache_dir'], form.sttngs['wthr_cache_max_mb'])
+    pettmp_fut = wthr_cache.fetch(climgen, 'fetch_cru_future_NC_data', aoi_indices_fut, num_band)
     print('Getting historic weather')
-    QApplication.processEvents()
-    pettmp_hist = climgen.fetch_cru_historic_NC_data(aoi_indices_hist, num_band)
+    process_events()
+    pettmp_hist = wthr_cache.fetch(climgen, 'fetch_cru_historic_NC_data', aoi_indices_hist, num_band)
 
-    # step through each cell
-    # ======================
-    skipped, completed, warning_count = 3*[0]
+    # map all cells to weather cells and write weather
+    # ===============================================
     last_time, start_time = 2*[time()]
     ncells = form.hwsd_mu_globals.data_frame.shape[0]
-    for index, row in form.hwsd_mu_globals.data_frame.iterrows():
-        mu_global = int(row['mu_global'])
-        latitude = round(row['latitude'], 5)
-        longitude = round(row['longitude'], 5)
-        gran_lat = int(row['gran_lat'])
-        gran_lon = int(row['gran_lon'])
-
-        site_rec = list([gran_lat, gran_lon, latitude, longitude, mu_global, None])
-
-        pettmp_grid_cell = associate_climate(site_rec, climgen, pettmp_hist, pettmp_fut)
-        if len(pettmp_grid_cell) == 0:
-            print('*** Warning *** no weather data for site with lat: {}\tlon: {}'
-                  .format(round(site_rec[2], 3), round(site_rec[3], 3)))
-            continue
-
-        if len(pettmp_grid_cell['precipitation'][0]) == 0:
-            mess = 'No historic weather data for lat/lon: {}/{}'.format(row['latitude'], row['longitude'])
-            form.lgr.info(mess)
-            skipped += 1
-            continue
-
-        pettmp_sim = _fetch_weather(form, climgen, site_rec, pettmp_grid_cell)
-        for varname, var2 in zip(wthr_csv.writers, pettmp_sim):
-            site_rec = list([latitude, longitude, mu_global, gran_lat, gran_lon])
-            wthr_csv.writers[varname].writerow(site_rec + pettmp_sim[var2])
-
-        completed += 1
-        last_time = update_progress(last_time, start_time, completed, ncells, skipped, warning_count)
+    completed, skipped, warning_count = _write_weather_bulk(form, climgen, wthr_csv, pettmp_hist, pettmp_fut)
+    last_time = update_progress(last_time, start_time, completed, ncells, skipped, warning_count)
 
     # close CSV files
     # ==============
-    for key in wthr_csv.output_fhs:
-        wthr_csv.output_fhs[key].close()
+    wthr_csv.close()
     print('\nFinished processing')
 
     return
@@ -233,8 +254,11 @@ def generate_weather_only(form):
 class WthrCsvOutputs(object):
     """
     Class to write CSV results of a Spatial ECOSSE run
+    output format is either tab separated text, the default, or NumPy binary files of float32 values with
+    an accompanying array of cell coordinates - the binary files are written through memory maps as each block
+    arrives and can be memory mapped when read, see read_wthr_npy
     """
-    def __init__(self, form, climgen):
+    def __init__(self, form, climgen, output_fmt = 'txt'):
 
         self.lgr = form.lgr
         self.varnames = list(['precip','tair'])
@@ -243,18 +267,29 @@ class WthrCsvOutputs(object):
         self.sim_start_year = climgen.sim_start_year
         self.sim_end_year = climgen.sim_end_year
 
-    def create_results_files(self):
+        if output_fmt not in OUTPUT_FMTS:
+            print(WARN_STR + 'output format {} not recognised - will use {}'.format(output_fmt, OUTPUT_FMTS[0]))
+            output_fmt = OUTPUT_FMTS[0]
+        self.output_fmt = output_fmt
+
+    def create_results_files(self, ncells = 0):
         """
         Create empty results files
+        ncells, the number of cells to be written, sets the size of the binary files
         """
-        size_current = csv.field_size_limit(131072*4)
-
         self.output_fhs = {}
         self.writers = {}
-        hdr_rec = HEADERS
+        hdr_rec = list(HEADERS)
         for year in range(self.sim_start_year, self.sim_end_year + 1):
             for month in range(1, 13):
                 hdr_rec.append('{0}-{1:0>2}'.format(str(year), str(month)))
+        self.months = hdr_rec[len(HEADERS):]
+
+        if self.output_fmt == 'npy':
+            self._open_npy_files(ncells)
+            return
+
+        size_current = csv.field_size_limit(131072*4)
 
         for varname in self.varnames:
             fname = self.study + '_{0}.txt'.format(varname)
@@ -268,3 +303,80 @@ class WthrCsvOutputs(object):
             self.writers[varname] = csv.writer(self.output_fhs[varname], delimiter='\t')
             self.writers[varname].writerow(hdr_rec)
         return
+
+    def _open_npy_files(self, ncells):
+        """
+        binary files of cell coordinates and of each variable are created at full size and memory mapped
+        """
+        self.nwritten = 0
+        self.ncells = ncells
+        self.npy_maps = {}
+        npy_specs = [('cells', CELLS_DTYPE, (ncells,))]
+        npy_specs += [(varname, np.float32, (ncells, len(self.months))) for varname in self.varnames]
+        for name, dtype, shape in npy_specs:
+            fname = join(self.sims_dir, self.study + '_{0}.npy'.format(name))
+            try:
+                self.npy_maps[name] = np.lib.format.open_memmap(fname, mode = 'w+', dtype = dtype, shape = shape)
+            except (OSError, IOError) as err:
+                err_mess = 'Unable to open output file. {0}'.format(err)
+                self.lgr.critical(err_mess)
+                print(err_mess)
+
+    def write_block(self, site_recs, vals_vars):
+        """
+        site_recs is a list of latitude, longitude, mu_global, gran_lat, gran_lon
+        vals_vars is a dictionary, keyed by varname, of 2-D arrays of sites by months
+        """
+        if self.output_fmt == 'npy':
+            indx1 = self.nwritten
+            indx2 = indx1 + len(site_recs)
+            if indx2 > self.ncells:
+                raise ValueError('{} cells exceeds the {} for which binary files were created'
+                                                                                        .format(indx2, self.ncells))
+
+            if 'cells' in self.npy_maps:
+                self.npy_maps['cells'][indx1:indx2] = np.array(site_recs, dtype = CELLS_DTYPE)
+            for varname in self.varnames:
+                if varname in self.npy_maps:
+                    self.npy_maps[varname][indx1:indx2] = vals_vars[varname]
+            self.nwritten = indx2
+        else:
+            for varname in self.varnames:
+                self.writers[varname].writerows([list(site_rec) + row
+                                        for site_rec, row in zip(site_recs, _writable_rows(vals_vars[varname]))])
+        return
+
+    def close(self):
+        """
+        close text files or flush and close binary files
+        """
+        if self.output_fmt == 'txt':
+            for varname in self.output_fhs:
+                self.output_fhs[varname].close()
+            return
+
+        for name in self.npy_maps:
+            self.npy_maps[name].flush()
+        self.npy_maps = {}
+
+        if self.nwritten < self.ncells:
+            print(WARN_STR + 'only {} of {} cells were written to the binary files'.format(self.nwritten, self.ncells))
+        try:
+            with open(join(self.sims_dir, self.study + '_wthr_npy.json'), 'w') as fhdr:
+                json.dump({'varnames': self.varnames, 'months': self.months, 'ncells': self.nwritten}, fhdr,
+                                                                                                        indent=2)
+        except (OSError, IOError) as err:
+            err_mess = 'Unable to write output file. {0}'.format(err)
+            self.lgr.critical(err_mess)
+            print(err_mess)
+
+        return
+
+def read_wthr_npy(sims_dir, study, varname):
+    """
+    memory map weather written in npy format, returns array of cell coordinates and array of cells by months
+    """
+    cells = np.load(join(sims_dir, study + '_cells.npy'))
+    vals = np.load(join(sims_dir, study + '_{0}.npy'.format(varname)), mmap_mode = 'r')
+
+    return cells, vals
@@ -0,0 +1,32 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        gui_events_fns.py
+# Purpose:     keep the GUI responsive during long running loops without requiring PyQt5
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   functions shared by the GUI and the batch runner call process_events where they previously called
+#   QApplication.processEvents - events are processed only where PyQt5 is installed and a QApplication exists,
+#   so that batch runs can start on machines without PyQt5 or an X server
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'gui_events_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+try:
+    from PyQt5.QtWidgets import QApplication
+except ImportError:
+    QApplication = None
+
+def process_events():
+    """
+    equivalent of QApplication.processEvents, a no-op when there is no GUI
+    """
+    if QApplication is not None and QApplication.instance() is not None:
+        QApplication.processEvents()
+
+    return
@@ -0,0 +1,235 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        hwsd_grid_fns.py
+# Purpose:     read the HWSD raster once per study and provide each band with a view of it
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the HWSD raster, hwsd.bil, is a band interleaved grid of mu_globals described by hwsd.hdr in the HWSD directory
+#   rather than each band creating an HWSD_bil object and reading its own strip of the raster, the raster is memory
+#   mapped once for the study and each band is given an HwsdBand, an HWSD_bil whose grid of mu_globals is a view of
+#   the window of the raster covering the band - pages of the raster are read by the operating system as the view
+#   is accessed so the raster is neither copied nor held in process memory
+#   each band maps the raster copy-on-write so that, as with HWSD_bil, its grid may be modified without altering the
+#   raster or the grids of other bands
+#   enabled by the hwsd_study_grid_flag setting, otherwise HWSD_bil reads the raster for each band
+#   the HWSD_bil object of the study also supplies soil records for the study - see generate_banded_sims
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'hwsd_grid_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from math import floor, ceil
+from os.path import join, isfile
+import numpy as np
+
+import hwsd_bil
+
+HDR_FNAME = 'hwsd.hdr'
+BIL_FNAME = 'hwsd.bil'
+BIL_DTYPES = {8: 'u1', 16: 'u2', 32: 'u4'}
+MASK_NROWS = 256        # rows of a band whose mu_globals are checked against the HWSD CSV file of the study at once
+WARN_STR = '*** Warning *** '
+
+def read_bil_header(hwsd_dir):
+    """
+    ESRI BIL header: keyword value pairs e.g. NROWS 21600, NCOLS 43200, NBITS 16, ULXMAP -179.99583333
+    returns dictionary of keywords in upper case and their values
+    """
+    hdr_fname = join(hwsd_dir, HDR_FNAME)
+    hdr = {}
+    with open(hdr_fname, 'r') as fhdr:
+        for line in fhdr:
+            fields = line.split()
+            if len(fields) >= 2:
+                hdr[fields[0].upper()] = fields[1]
+
+    return hdr
+
+class BilGeometry(object):
+    """
+    rows and columns of the raster and the coordinates of their centres
+    """
+    def __init__(self, hdr):
+
+        self.nrows = int(hdr['NROWS'])
+        self.ncols = int(hdr['NCOLS'])
+        nbits = int(hdr.get('NBITS', 16))
+        if hdr.get('BYTEORDER', 'I').upper() == 'M':
+            byte_order = '>'
+        else:
+            byte_order = '<'
+        self.dtype = np.dtype(byte_order + BIL_DTYPES[nbits])
+        self.resol = float(hdr['XDIM'])
+        self.lon_ul = float(hdr['ULXMAP'])     # centre of upper left cell
+        self.lat_ul = float(hdr['ULYMAP'])
+
+    def row_range(self, lat_ll, lat_ur):
+        """
+        first and one beyond last row whose centres lie within the latitude range
+        """
+        row_strt = max(0, int(ceil((self.lat_ul - lat_ur)/self.resol - 1.0e-9)))
+        row_end = min(self.nrows, int(floor((self.lat_ul - lat_ll)/self.resol + 1.0e-9)) + 1)
+
+        return row_strt, max(row_strt, row_end)
+
+    def col_range(self, lon_ll, lon_ur):
+        """
+        first and one beyond last column whose centres lie within the longitude range
+        """
+        col_strt = max(0, int(ceil((lon_ll - self.lon_ul)/self.resol - 1.0e-9)))
+        col_end = min(self.ncols, int(floor((lon_ur - self.lon_ul)/self.resol + 1.0e-9)) + 1)
+
+        return col_strt, max(col_strt, col_end)
+
+def open_bil_memmap(hwsd_dir, geom, mode = 'r'):
+    """
+    memory map of the whole raster, read only or, for mode 'c', copy-on-write
+    """
+    return np.memmap(join(hwsd_dir, BIL_FNAME), dtype = geom.dtype, mode = mode, shape = (geom.nrows, geom.ncols))
+
+class HwsdStudyGrid(object):
+    """
+    window of the memory mapped HWSD raster enclosing the study bounding box
+    """
+    def __init__(self, lgr, hwsd_dir, bbox):
+
+        self.lgr = lgr
+        self.hwsd_dir = hwsd_dir
+        self.hwsd = hwsd_bil.HWSD_bil(lgr, hwsd_dir)
+        self.geom = BilGeometry(read_bil_header(hwsd_dir))
+
+        lon_ll, lat_ll, lon_ur, lat_ur = bbox
+        self.row_strt, self.row_end = self.geom.row_range(lat_ll, lat_ur)
+        self.col_strt, self.col_end = self.geom.col_range(lon_ll, lon_ur)
+        self.grid = self._read_window()
+
+        mess = 'Mapped HWSD window of {} rows and {} columns for study'.format(self.grid.shape[0], self.grid.shape[1])
+        print(mess)
+        self.lgr.info(mess)
+
+    def __getstate__(self):
+        """
+        when passed to a pool process the raster is mapped afresh by that process rather than its window pickled
+        """
+        state = dict(vars(self))
+        del state['grid']
+        del state['hwsd']
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self.hwsd = hwsd_bil.HWSD_bil(self.lgr, self.hwsd_dir)
+        self.grid = self._read_window()
+
+    def _read_window(self, mode = 'r'):
+        """
+        view of the memory mapped raster, no values are read until accessed
+        """
+        raster = open_bil_memmap(self.hwsd_dir, self.geom, mode)
+
+        return raster[self.row_strt:self.row_end, self.col_strt:self.col_end]
+
+    def window(self, bbox, copy_on_write = False):
+        """
+        view of the study window covering bbox and the latitude and longitude of the centre of its upper left cell
+        if copy_on_write is set the view is of a fresh copy-on-write mapping which may be modified
+        """
+        geom = self.geom
+        lon_ll, lat_ll, lon_ur, lat_ur = bbox
+        row_strt, row_end = geom.row_range(lat_ll, lat_ur)
+        col_strt, col_end = geom.col_range(lon_ll, lon_ur)
+        row_strt, row_end = max(row_strt, self.row_strt), min(row_end, self.row_end)
+        col_strt, col_end = max(col_strt, self.col_strt), min(col_end, self.col_end)
+
+        if copy_on_write:
+            grid = self._read_window('c')
+        else:
+            grid = self.grid
+        view = grid[row_strt - self.row_strt:max(row_strt, row_end) - self.row_strt,
+                         col_strt - self.col_strt:max(col_strt, col_end) - self.col_strt]
+        lat_ul = geom.lat_ul - row_strt*geom.resol
+        lon_ul = geom.lon_ul + col_strt*geom.resol
+
+        return view, lat_ul, lon_ul
+
+    def band_hwsd(self):
+        """
+        HWSD_bil for a band which reads from the study window
+        """
+        return HwsdBand(self)
+
+class HwsdBand(hwsd_bil.HWSD_bil):
+    """
+    takes the place of HWSD_bil in _generate_ecosse_files - state of the HWSD_bil of the study is copied rather than
+    constructing afresh and the grid of mu_globals is taken from the study window
+    """
+    def __init__(self, study_grid):
+
+        self.__dict__.update(vars(study_grid.hwsd))
+        self.study_grid = study_grid
+
+    def read_bbox_hwsd_mu_globals(self, bbox, hwsd_mu_globals, upscale_resol):
+        """
+        as for HWSD_bil: grid of mu_globals within bbox with those not present in the HWSD CSV file of the study set
+        to zero - the grid is a copy-on-write view of the raster so that, as with HWSD_bil, it may be modified e.g. by
+        gen_grid_cells_for_band, only pages in which mu_globals are set to zero are copied
+        returns number of values
+        """
+        view, lat_ul, lon_ul = self.study_grid.window(bbox, copy_on_write = True)
+        resol = self.study_grid.geom.resol
+
+        mu_global_list = getattr(hwsd_mu_globals, 'mu_global_list', None)
+        if mu_global_list is not None:
+            mu_global_list = np.asarray(mu_global_list)
+            for row_strt in range(0, view.shape[0], MASK_NROWS):
+                rows = view[row_strt:row_strt + MASK_NROWS]
+                absent = ~np.isin(rows, mu_global_list)
+                if absent.any():
+                    rows[absent] = 0
+        self.data = view
+
+        self.nlats, self.nlons = view.shape
+        self.upscale_resol = upscale_resol
+        self.lat_ur = lat_ul + resol/2
+        self.lon_ll = lon_ul - resol/2
+        self.lat_ll = self.lat_ur - self.nlats*resol
+        self.lon_ur = self.lon_ll + self.nlons*resol
+
+        return view.size
+
+    def get_mu_globals_dict(self):
+        """
+        mu_globals and the number of cells in which each occurs, or None if there are none
+        """
+        mu_globals, counts = np.unique(self.data, return_counts = True)     # data is a view or a band sized array
+        valid = mu_globals > 0
+        if not valid.any():
+            return None
+
+        return dict(zip(mu_globals[valid].tolist(), counts[valid].tolist()))
+
+def create_study_grid(form, bbox):
+    """
+    returns study grid or None if the HWSD raster cannot be read in this way, in which case each band reads its own
+    """
+    hwsd_dir = form.hwsd_dir
+    if not isfile(join(hwsd_dir, HDR_FNAME)) or not isfile(join(hwsd_dir, BIL_FNAME)):
+        mess = WARN_STR + 'HWSD header or raster not found in ' + hwsd_dir + ' - bands will read the raster'
+        print(mess)
+        form.lgr.warning(mess)
+        return None
+
+    try:
+        return HwsdStudyGrid(form.lgr, hwsd_dir, bbox)
+    except (OSError, KeyError, ValueError) as err:
+        mess = WARN_STR + 'could not read HWSD window for study - bands will read the raster\n\t' + str(err)
+        print(mess)
+        form.lgr.warning(mess)
+        return None
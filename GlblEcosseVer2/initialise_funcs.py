@@ -28,11 +28,53 @@ from mngmnt_fns_and_class import check_xls_coords_fname
 MIN_GUI_LIST = ['weatherResource', 'aveWthrFlag', 'bbox', 'luPiJsonFname', 'hwsdCsvFname', 'maxCells']
 CMN_GUI_LIST = ['study', 'histStrtYr', 'histEndYr', 'climScnr', 'futStrtYr', 'futEndYr', 'gridResol', 'eqilMode']
 BBOX_DEFAULT = [116.90045, 28.2294, 117.0, 29.0]    # bounding box default - somewhere in SE Europe
+
+# optional run settings, held in group runSttngs of the config file, and their defaults
+# =====================================================================================
+RUN_STTNGS_DFLTS = {
+    'num_procs': 1,             # number of processes used to generate latitude bands, 1 for serial
+    'wthr_output_fmt': 'txt',   # format of weather only outputs: txt or npy
+    'wthr_cache_dir': '',       # directory for cache of weather extracted from NetCDF files, blank to disable
+    'wthr_cache_max_mb': 4096,  # size limit of the weather cache
+    'resume_flag': False,       # skip bands and cells recorded as complete in the run manifest of the study
+    'incremental_flag': False,  # only rewrite simulation files of sites whose inputs have changed
+    'profile_flag': False,      # record time spent in each stage of each band in <study>_profile.json and .csv
+    'num_writers': 0,           # threads writing simulation files while the next site is prepared, 0 for serial
+    'writer_queue_max': 64,     # maximum number of sites awaiting their simulation files
+    'packed_flag': False,       # pack simulation files of each band into <study>_packed/bandNNNN.zip
+    'pack_staging_dir': '',     # directory, e.g. on local disk, for files awaiting packing or placing, blank: sims_dir
+    'dedupe_met_flag': False,   # link identical met files to a single copy rather than write them, unless packing
+    'wthr_tile_max_mb': 0,      # fetch weather of each band in longitude tiles within this size, 0 for whole bands
+    'lat_step': 0.5,            # height of latitude bands in degrees, 0 to choose from the two settings below
+    'band_target_cells': 50000, # preferred maximum number of AOI cells per band
+    'band_max_mb': 2048,        # estimated memory limit of weather and AOI records of a band
+    'hwsd_study_grid_flag': False,  # read the HWSD raster once for the study rather than once for each band
+    'soil_cache_dir': '',           # directory for lookup of HWSD soil records shared by studies, blank to disable
+    'nc_slab_flag': False           # read parts of plant input and mask datasets spanning each band into memory once
+}
 sleepTime = 5
 ERROR_STR = '*** Error *** '
 
 # ===========================================
 
+def _read_run_settings(form, config):
+    """
+    transfer optional run settings from the config file to the settings dictionary, defaults are used where absent
+    """
+    grp = 'runSttngs'
+    if grp in config:
+        run_sttngs = config[grp]
+    else:
+        run_sttngs = {}
+
+    for key in RUN_STTNGS_DFLTS:
+        if key in run_sttngs:
+            form.sttngs[key] = run_sttngs[key]
+        else:
+            form.sttngs[key] = RUN_STTNGS_DFLTS[key]
+
+    return
+
 def _write_default_config_file(config_file):
     """
     #        ll_lon,    ll_lat  ur_lon,ur_lat
@@ -85,6 +127,8 @@ def read_config_file(form):
     else:
         config = _write_default_config_file(config_file)
 
+    _read_run_settings(form, config)
+
     grp = 'minGUI'
     for key in MIN_GUI_LIST:
         if key not in config[grp]:
@@ -228,8 +272,8 @@ def read_config_file(form):
     # ==========================
     form.req_resol_deg = None
     form.req_resol_granul = None
-    form.w_use_dom_soil.setChecked(True)
-    form.w_use_high_cover.setChecked(True)
+    form.w_use_dom_soil.setChecked(config['minGUI'].get('useDomSoil', True))    # absent from older config files
+    form.w_use_high_cover.setChecked(config['minGUI'].get('useHighCover', True))
 
     if form.python_exe == '' or form.runsites_py == '' or form.runsites_config_file is None:
         print('Could not activate Run Ecosse widget - python: {}\trunsites: {}\trunsites_config_file: {}'
@@ -290,6 +334,8 @@ def write_config_file(form, message_flag = True):
             'usePiNcFname' : form.w_use_pi_nc.isChecked(),
             'piCsvFname': form.w_lbl_pi_csv.text(),
             'usepiCsvFname': form.w_use_pi_csv.isChecked(),
+            'useDomSoil'   : form.w_use_dom_soil.isChecked(),
+            'useHighCover' : form.w_use_high_cover.isChecked(),
             'usePolyFlag'  : False
         },
         'cmnGUI': {
@@ -309,7 +355,8 @@ def write_config_file(form, message_flag = True):
             'forest': form.w_hilda_lus['forest'].isChecked(),
             'grassland': form.w_hilda_lus['grassland'].isChecked(),
             'all': form.w_hilda_lus['all'].isChecked()
-            }
+            },
+        'runSttngs': {key: form.sttngs.get(key, RUN_STTNGS_DFLTS[key]) for key in RUN_STTNGS_DFLTS}
         }
     if isfile(config_file):
         descriptor = 'Overwrote existing'
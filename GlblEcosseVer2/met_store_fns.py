@@ -0,0 +1,294 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        met_store_fns.py
+# Purpose:     share identical met files of simulation sites through a content addressed store
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   sites at HWSD resolution which fall within the same weather cell are given identical met files
+#   during a run the simulation files of each band are written by make_ecosse_file beneath a staging directory,
+#   which may be on local disk, and moved to the simulations directory when the band finishes - see BandMetStore
+#   the content of each staged met file is hashed before it is placed and, where already held in the store,
+#   <study>_met_store/xx/<sha1>.txt, a hard link to the stored copy is placed instead so that each distinct met
+#   file is written to the simulations directory once - links are created alongside the destination then renamed
+#   over it so that a met file is never missing, where links are not supported files are moved as they are
+#   the site which opens the study files is written directly to the simulations directory so is not staged
+#   only met files of the study's own sites are linked: other studies and the shared weather directories e.g.
+#   CHESS/<grid_ref>, whose met files are rewritten in place by _make_met_files_osgb, are never visited
+#   make_ecosse_file rewrites the met files of a site in place, so linked files are replaced by independent copies
+#   before the study is rerun - see release_met_files
+#   met files of an existing study may be linked after the event e.g.
+#       python met_store_fns.py <sims_dir> <study>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'met_store_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import sys
+from fnmatch import fnmatch
+from hashlib import sha1
+from os import walk, link, replace, remove, makedirs, stat
+from os.path import join, isdir, isfile, samefile, dirname, relpath, normpath
+from shutil import rmtree, move
+
+MET_PATTERN = 'met*.txt'
+WARN_STR = '*** Warning *** '
+
+def study_sites_dir(sims_dir, study):
+    """
+    directory beneath which make_ecosse_file creates the site directories of a study
+    """
+    return join(sims_dir, study)
+
+def _store_dir(sims_dir, study):
+
+    return join(sims_dir, study + '_met_store')
+
+def _met_files(sims_dir, study):
+    """
+    generate paths of met files of the sites of a study
+    """
+    for dirpath, dirnames, fnames in walk(study_sites_dir(sims_dir, study)):
+        dirnames.sort()
+        for fname in sorted(fnames):
+            if fnmatch(fname.lower(), MET_PATTERN):
+                yield join(dirpath, fname)
+
+def _file_digest(path):
+
+    with open(path, 'rb') as fmet:
+        return sha1(fmet.read()).hexdigest()
+
+def _place_file(path, dest_fn):
+    """
+    move file to its destination, replacing any file there, across file systems if need be
+    """
+    try:
+        replace(path, dest_fn)
+    except OSError:
+        move(path, dest_fn)
+
+def _link_over(store_fn, dest_fn):
+    """
+    replace destination, if any, by a hard link to the stored copy
+    """
+    tmp_fn = dest_fn + '.lnk'
+    try:
+        link(store_fn, tmp_fn)
+        replace(tmp_fn, dest_fn)
+    except OSError:
+        if isfile(tmp_fn):
+            remove(tmp_fn)
+        raise
+
+class BandMetStore(object):
+    """
+    staging directory of one band whose met files are placed in the simulations directory through the met store
+    of the study, when disabled the simulations directory is used as is
+    if resume_flag is set, sites staged by an interrupted run are retained and placed with the remainder of the band
+    """
+    def __init__(self, sims_dir, study, num_band, enabled, staging_root = '', resume_flag = False):
+
+        self.enabled = enabled
+        self.sims_dir = sims_dir
+        self.store_dir = _store_dir(sims_dir, study)
+        self.link_err = None
+        if not enabled:
+            return
+
+        if staging_root == '':
+            staging_root = sims_dir
+        self.staging_dir = join(staging_root, study + '_met_staging', 'band{:0>4}'.format(num_band))
+        if isdir(self.staging_dir) and not resume_flag:
+            rmtree(self.staging_dir)
+        if not isdir(self.staging_dir):
+            makedirs(self.staging_dir)
+
+    def site_sims_dir(self):
+        """
+        simulations directory to which site files are written
+        """
+        if self.enabled:
+            return self.staging_dir
+        else:
+            return self.sims_dir
+
+    def cnvrt_study_lines(self, study_lines):
+        """
+        paths in lines written to the study files refer to the simulations directory rather than the staging directory
+        """
+        if not self.enabled:
+            return study_lines
+
+        new_lines = []
+        for lines in study_lines:
+            for staging_dir in (self.staging_dir, normpath(self.staging_dir)):
+                lines = lines.replace(staging_dir, self.sims_dir)
+            new_lines.append(lines)
+
+        return new_lines
+
+    def _place_met_file(self, path, dest_fn):
+        """
+        link the stored copy of a met file of the same content in place of writing it, otherwise move the file and
+        store it - returns number of bytes not written
+        """
+        digest = _file_digest(path)
+        store_subdir = join(self.store_dir, digest[:2])
+        store_fn = join(store_subdir, digest + '.txt')
+
+        if isfile(store_fn):
+            nbytes = stat(path).st_size
+            _link_over(store_fn, dest_fn)
+            remove(path)
+            return nbytes
+
+        _place_file(path, dest_fn)
+        if not isdir(store_subdir):
+            makedirs(store_subdir)
+        link(dest_fn, store_fn)        # first occurrence becomes the stored copy
+
+        return None
+
+    def place(self):
+        """
+        move staged files to the simulations directory, met files whose content is already stored are linked to the
+        stored copy rather than written, then remove the staging directory
+        returns number of met files placed, number linked and bytes saved
+        """
+        nfiles, nlinked, nbytes_saved = 0, 0, 0
+        if not self.enabled:
+            return nfiles, nlinked, nbytes_saved
+
+        for dirpath, dirnames, fnames in walk(self.staging_dir):
+            dest_dir = join(self.sims_dir, relpath(dirpath, self.staging_dir))
+            if not isdir(dest_dir):
+                makedirs(dest_dir)
+
+            for fname in sorted(fnames):
+                path = join(dirpath, fname)
+                dest_fn = join(dest_dir, fname)
+                if not fnmatch(fname.lower(), MET_PATTERN):
+                    _place_file(path, dest_fn)
+                    continue
+
+                nfiles += 1
+                try:
+                    nbytes = self._place_met_file(path, dest_fn)
+                except OSError as err:
+                    self.link_err = err
+                    if isfile(path):
+                        _place_file(path, dest_fn)
+                    continue
+
+                if nbytes is not None:
+                    nlinked += 1
+                    nbytes_saved += nbytes
+
+        rmtree(self.staging_dir)
+        if self.link_err is not None:
+            print(WARN_STR + 'could not link some met files to the store in ' + self.store_dir + '\n\t' +
+                                                                                                    str(self.link_err))
+
+        return nfiles, nlinked, nbytes_saved
+
+def dedupe_met_files(sims_dir, study):
+    """
+    link met files of an existing study, e.g. written without the met store, to the store
+    returns number of met files examined, number replaced by links and bytes saved
+    files already linked to the store, e.g. by a previous run, are counted as neither
+    """
+    store_dir = _store_dir(sims_dir, study)
+    nfiles, nlinked, nbytes_saved = 0, 0, 0
+    link_err = None
+
+    if not isdir(study_sites_dir(sims_dir, study)):
+        print(WARN_STR + 'no site directories for study ' + study + ' in ' + sims_dir)
+        return nfiles, nlinked, nbytes_saved
+
+    for path in _met_files(sims_dir, study):
+        nfiles += 1
+        digest = _file_digest(path)
+        store_subdir = join(store_dir, digest[:2])
+        store_fn = join(store_subdir, digest + '.txt')
+
+        try:
+            if not isfile(store_fn):
+                if not isdir(store_subdir):
+                    makedirs(store_subdir)
+                link(path, store_fn)        # first occurrence becomes the stored copy
+                continue
+
+            if samefile(path, store_fn):
+                continue
+
+            tmp_fn = path + '.lnk'
+            link(store_fn, tmp_fn)
+            nbytes = stat(path).st_size
+            replace(tmp_fn, path)
+        except OSError as err:
+            link_err = err
+            if isfile(path + '.lnk'):
+                remove(path + '.lnk')
+            continue
+
+        nlinked += 1
+        nbytes_saved += nbytes
+
+    if link_err is not None:
+        print(WARN_STR + 'could not link some met files to the store in ' + store_dir + '\n\t' + str(link_err))
+
+    return nfiles, nlinked, nbytes_saved
+
+def release_met_files(sims_dir, study):
+    """
+    replace met files of the study which are linked to its store by independent copies so that rewriting one does
+    not alter the others, then remove the store - returns number of files copied
+    """
+    store_dir = _store_dir(sims_dir, study)
+    if not isdir(store_dir):
+        return 0
+
+    stored = set()
+    for dirpath, dirnames, fnames in walk(store_dir):
+        for fname in fnames:
+            fstat = stat(join(dirpath, fname))
+            stored.add((fstat.st_dev, fstat.st_ino))
+
+    ncopied = 0
+    for path in _met_files(sims_dir, study):
+        fstat = stat(path)
+        if fstat.st_nlink < 2 or (fstat.st_dev, fstat.st_ino) not in stored:
+            continue
+
+        tmp_fn = path + '.cpy'
+        with open(path, 'rb') as fmet:
+            contents = fmet.read()
+        with open(tmp_fn, 'wb') as fcpy:
+            fcpy.write(contents)
+        replace(tmp_fn, path)
+        ncopied += 1
+
+    rmtree(store_dir)
+    print('Released {} shared met files of study {} prior to rerun'.format(ncopied, study))
+
+    return ncopied
+
+def main():
+    """
+    deduplicate met files of an existing study
+    """
+    if len(sys.argv) != 3:
+        print('Usage: python ' + __prog__ + ' sims_dir study')
+        sys.exit(1)
+
+    nfiles, nlinked, nbytes_saved = dedupe_met_files(sys.argv[1], sys.argv[2])
+    print('Replaced {} of {} met files by links to shared copies, saving {:.1f} MB'
+                                                                .format(nlinked, nfiles, nbytes_saved/(1024*1024)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        nc_slab_fns.py
+# Purpose:     serve point reads of a NetCDF dataset from the part of each variable covering a band
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   associate_yield_nc and check_mask_location read one point of the plant input or land use mask dataset for each
+#   site - for large datasets this amounts to tens of thousands of small reads per band
+#   a SlabDataset takes the place of the netCDF4 Dataset: on first access each variable with a latitude dimension
+#   reads the rows spanning the band, restricted to the columns spanning its longitude range, in a single read,
+#   subsequent reads within the slab are served from memory with indices in the same sense as the full grid; reads
+#   outside the slab, or which cannot be translated e.g. negative indices, are passed to the dataset
+#   enabled by the nc_slab_flag setting so that very large grids may still use point reads
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'nc_slab_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from numbers import Integral
+from netCDF4 import Dataset
+import numpy as np
+
+from plant_input_grid_fns import find_name, LAT_NAMES, LON_NAMES
+
+def _band_window(coords, val_ll, val_ur):
+    """
+    first and one beyond last index of the coordinate spanning val_ll to val_ur, with one index either side
+    """
+    coords = np.asarray(coords, dtype = float)
+    indices = np.flatnonzero((coords >= val_ll) & (coords <= val_ur))
+    if len(indices) == 0:
+        indices = np.array([np.argmin(np.abs(coords - (val_ll + val_ur)/2))])
+
+    return max(0, int(indices.min()) - 1), min(len(coords), int(indices.max()) + 2)
+
+def _translate(indx, strt, end):
+    """
+    index of a windowed dimension translated to the window strt to end, or None if it falls outside it
+    """
+    if isinstance(indx, Integral):
+        if not strt <= indx < end:
+            return None
+        return int(indx) - strt
+    elif isinstance(indx, slice) and indx.step in (None, 1):
+        if indx.start is None or indx.stop is None or not strt <= indx.start <= indx.stop <= end:
+            return None
+        return slice(indx.start - strt, indx.stop - strt)
+    else:
+        return None
+
+class SlabVariable(object):
+    """
+    part of a variable, windows maps the position of each windowed dimension e.g. latitude and longitude to the
+    first and one beyond last index of the window
+    """
+    def __init__(self, nc_var, windows):
+
+        self.nc_var = nc_var
+        self.windows = windows
+        self.slab = None
+
+    def __getattr__(self, attr):
+        return getattr(self.nc_var, attr)
+
+    def __len__(self):
+        return len(self.nc_var)
+
+    def _slab_key(self, key):
+        """
+        key translated to the slab, or None if it falls outside it
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if any(elem is Ellipsis for elem in key) or len(key) <= max(self.windows) or len(key) > self.nc_var.ndim:
+            return None
+
+        slab_key = list(key)
+        for axis, (strt, end) in self.windows.items():
+            slab_key[axis] = _translate(key[axis], strt, end)
+            if slab_key[axis] is None:
+                return None
+
+        return tuple(slab_key)
+
+    def __getitem__(self, key):
+
+        slab_key = self._slab_key(key)
+        if slab_key is None:
+            return self.nc_var[key]
+
+        if self.slab is None:
+            slab_window = [slice(None)]*self.nc_var.ndim
+            for axis, (strt, end) in self.windows.items():
+                slab_window[axis] = slice(strt, end)
+            self.slab = self.nc_var[tuple(slab_window)]
+
+        return self.slab[slab_key]
+
+class SlabDataset(object):
+    """
+    takes the place of a netCDF4 Dataset opened for reading, variables with a latitude dimension are served from
+    the rows spanning lat_ll to lat_ur and, where they also have a longitude dimension, the columns spanning lon_ll
+    to lon_ur
+    """
+    def __init__(self, nc_fname, lat_ll, lat_ur, lon_ll, lon_ur):
+
+        self.nc_dset = Dataset(nc_fname, mode='r')
+        self.variables = dict(self.nc_dset.variables)
+
+        lat_dim = find_name(self.nc_dset.dimensions, LAT_NAMES)
+        lat_var = find_name(self.nc_dset.variables, LAT_NAMES)
+        if lat_dim is None or lat_var is None:
+            return
+
+        lon_dim = find_name(self.nc_dset.dimensions, LON_NAMES)
+        lon_var = find_name(self.nc_dset.variables, LON_NAMES)
+        lat_window = _band_window(self.nc_dset.variables[lat_var][:], lat_ll, lat_ur)
+        if lon_dim is None or lon_var is None:
+            lon_window = None
+        else:
+            lon_window = _band_window(self.nc_dset.variables[lon_var][:], lon_ll, lon_ur)
+
+        for var_name, nc_var in self.nc_dset.variables.items():
+            if lat_dim not in nc_var.dimensions or var_name == lat_var:
+                continue
+            windows = {nc_var.dimensions.index(lat_dim): lat_window}
+            if lon_window is not None and lon_dim in nc_var.dimensions:
+                windows[nc_var.dimensions.index(lon_dim)] = lon_window
+            self.variables[var_name] = SlabVariable(nc_var, windows)
+
+    def __getattr__(self, attr):
+        return getattr(self.nc_dset, attr)
+
+    def __getitem__(self, var_name):
+        return self.variables[var_name]
+
+    def close(self):
+        self.variables = {}
+        self.nc_dset.close()
+
+def open_band_dataset(nc_fname, bbox, slab_flag):
+    """
+    Dataset, or SlabDataset covering bbox if slab_flag is set
+    """
+    if slab_flag:
+        lon_ll, lat_ll, lon_ur, lat_ur = bbox
+        return SlabDataset(nc_fname, lat_ll, lat_ur, lon_ll, lon_ur)
+    else:
+        return Dataset(nc_fname, mode='r')
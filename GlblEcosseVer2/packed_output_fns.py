@@ -0,0 +1,200 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        packed_output_fns.py
+# Purpose:     pack simulation files of each band into a single archive rather than many small files
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   in packed mode the simulation files of a band are written beneath a staging directory, which may be on local
+#   disk, then added to <study>_packed/bandNNNN.zip in the simulations directory when the band finishes
+#   archive members are named relative to the staging directory so that extracting a site to the simulations
+#   directory recreates the layout of an unpacked run - paths in the study files refer to this layout
+#   each archive is accompanied by an index, bandNNNN_index.json, of the directories it holds so that a site can
+#   be extracted without searching every archive e.g.
+#       python packed_output_fns.py <sims_dir> <study> <site_dir> [<site_dir> ...]
+#   the site which opens the study files is always written directly to the simulations directory
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'packed_output_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import sys
+import json
+from glob import glob
+from os import makedirs, walk, replace
+from os.path import join, isdir, isfile, relpath, normpath
+from shutil import rmtree
+from zipfile import ZipFile, ZIP_DEFLATED
+
+WARN_STR = '*** Warning *** '
+
+def _packed_dir(sims_dir, study):
+
+    return join(sims_dir, study + '_packed')
+
+def _member_name(path, root_dir):
+    """
+    archive members use forward slashes whatever the platform
+    """
+    return relpath(path, root_dir).replace('\\', '/')
+
+def _site_dir(member):
+    """
+    directory of an archive member
+    """
+    if '/' in member:
+        return member.rsplit('/', 1)[0]
+    else:
+        return ''
+
+class BandPacker(object):
+    """
+    staging directory and archive of one band, when disabled the simulations directory is used as is
+    if resume_flag is set, sites staged by an interrupted run are retained and packed with the remainder of the band
+    """
+    def __init__(self, sims_dir, study, num_band, enabled, staging_root = '', resume_flag = False):
+
+        self.enabled = enabled
+        self.sims_dir = sims_dir
+        self.nfiles = 0
+        if not enabled:
+            return
+
+        if staging_root == '':
+            staging_root = sims_dir
+        self.staging_dir = join(staging_root, study + '_staging', 'band{:0>4}'.format(num_band))
+        if isdir(self.staging_dir) and not resume_flag:
+            rmtree(self.staging_dir)
+        if not isdir(self.staging_dir):
+            makedirs(self.staging_dir)
+
+        packed_dir = _packed_dir(sims_dir, study)
+        if not isdir(packed_dir):
+            makedirs(packed_dir)
+
+        self.zip_fn = join(packed_dir, 'band{:0>4}.zip'.format(num_band))
+        self.index_fn = join(packed_dir, 'band{:0>4}_index.json'.format(num_band))
+
+    def site_sims_dir(self):
+        """
+        simulations directory to which site files are written
+        """
+        if self.enabled:
+            return self.staging_dir
+        else:
+            return self.sims_dir
+
+    def cnvrt_study_lines(self, study_lines):
+        """
+        paths in lines written to the study files refer to the simulations directory rather than the staging directory
+        """
+        if not self.enabled:
+            return study_lines
+
+        new_lines = []
+        for lines in study_lines:
+            for staging_dir in (self.staging_dir, normpath(self.staging_dir)):
+                lines = lines.replace(staging_dir, self.sims_dir)
+            new_lines.append(lines)
+
+        return new_lines
+
+    def pack(self):
+        """
+        add staged files to the archive of the band, replacing existing members of the same name, then remove the
+        staging directory - members of an existing archive which were not restaged, such as unchanged sites in
+        incremental mode, are carried over
+        returns number of files packed
+        """
+        if not self.enabled:
+            return 0
+
+        staged = {}
+        for dirpath, dirnames, fnames in walk(self.staging_dir):
+            for fname in fnames:
+                path = join(dirpath, fname)
+                staged[_member_name(path, self.staging_dir)] = path
+
+        tmp_fn = self.zip_fn + '.tmp'
+        index = {}
+        with ZipFile(tmp_fn, 'w', compression = ZIP_DEFLATED) as zip_out:
+            if isfile(self.zip_fn):
+                with ZipFile(self.zip_fn, 'r') as zip_in:
+                    for member in zip_in.namelist():
+                        if member not in staged:
+                            zip_out.writestr(zip_in.getinfo(member), zip_in.read(member))
+                            index.setdefault(_site_dir(member), []).append(member)
+
+            for member in sorted(staged):
+                zip_out.write(staged[member], member)
+                index.setdefault(_site_dir(member), []).append(member)
+
+        replace(tmp_fn, self.zip_fn)
+        with open(self.index_fn, 'w') as findex:
+            json.dump(index, findex, indent=0, sort_keys=True)
+
+        rmtree(self.staging_dir)
+        self.nfiles = len(staged)
+
+        return self.nfiles
+
+def read_packed_index(sims_dir, study):
+    """
+    directory -> name of archive, for all bands of a study
+    """
+    dir_to_zip = {}
+    for index_fn in sorted(glob(join(_packed_dir(sims_dir, study), 'band*_index.json'))):
+        with open(index_fn, 'r') as findex:
+            index = json.load(findex)
+        zip_fn = index_fn.replace('_index.json', '.zip')
+        for site_dir in index:
+            dir_to_zip[site_dir] = zip_fn
+
+    return dir_to_zip
+
+def extract_sites(sims_dir, study, site_dirs, out_dir = None):
+    """
+    extract the files of each site directory, given relative to the simulations directory, to out_dir which
+    defaults to the simulations directory - returns number of files extracted
+    """
+    if out_dir is None:
+        out_dir = sims_dir
+
+    dir_to_zip = read_packed_index(sims_dir, study)
+    members_by_zip = {}
+    for site_dir in site_dirs:
+        site_dir = site_dir.replace('\\', '/').strip('/')
+        matches = [dir_name for dir_name in dir_to_zip if dir_name == site_dir or dir_name.startswith(site_dir + '/')]
+        if len(matches) == 0:
+            print(WARN_STR + 'site directory ' + site_dir + ' not found in packed output of study ' + study)
+        for dir_name in matches:
+            members_by_zip.setdefault(dir_to_zip[dir_name], []).append(dir_name)
+
+    nfiles = 0
+    for zip_fn in sorted(members_by_zip):
+        dir_names = set(members_by_zip[zip_fn])
+        with ZipFile(zip_fn, 'r') as zip_in:
+            members = [member for member in zip_in.namelist() if _site_dir(member) in dir_names]
+            zip_in.extractall(out_dir, members)
+        nfiles += len(members)
+
+    return nfiles
+
+def main():
+    """
+    extract sites from packed output of a study
+    """
+    if len(sys.argv) < 4:
+        print('Usage: python ' + __prog__ + ' sims_dir study site_dir [site_dir ...]')
+        sys.exit(1)
+
+    sims_dir, study = sys.argv[1:3]
+    nfiles = extract_sites(sims_dir, study, sys.argv[3:])
+    print('Extracted {} files to {}'.format(nfiles, sims_dir))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        pet_batch_fns.py
+# Purpose:     Thornthwaite potential evapotranspiration for many cells and years in one call
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   follows the thornthwaite function of the thornthwaite module, which takes 12 monthly temperatures for one
+#   location and year, but operates on an array of cells by months with a vector of latitudes
+#   mean daylight hours are calculated once for each distinct latitude and year type (leap or non-leap) rather than
+#   for every cell and year; sums are accumulated in the same order as thornthwaite and powers use np.power so
+#   results agree with thornthwaite to within rounding, well inside the two decimal places written to met files
+#   the Thornthwaite equation has no real value for months at or below freezing, for these cell years the
+#   thornthwaite function itself is called so that its results, whatever they are, are carried over unchanged
+#   see test_pet_batch_fns.py
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'pet_batch_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from math import sin, tan, acos, pi, radians
+from calendar import isleap
+import numpy as np
+
+from thornthwaite import thornthwaite
+
+MNTHS_YR = 12
+MONTH_DAYS = list([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+LEAP_MONTH_DAYS = list([31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+def monthly_mean_daylight_hours(lats, leap_flag = False):
+    """
+    mean daylight hours for each month, returns array of latitudes by months
+    lats are in degrees
+    """
+    if leap_flag:
+        month_days = LEAP_MONTH_DAYS
+    else:
+        month_days = MONTH_DAYS
+
+    mean_dlh = np.zeros((len(lats), MNTHS_YR))
+    for ilat, lat in enumerate(lats):
+        tan_lat = tan(radians(lat))
+        doy = 1         # day of the year
+        for imnth, mdays in enumerate(month_days):
+            dlh = 0.0   # cumulative daylight hours for the month
+            for daynum in range(mdays):
+                sol_dec = 0.409 * sin(((2.0 * pi / 365.0) * doy - 1.39))
+                cos_sha = -tan_lat * tan(sol_dec)
+                sha = acos(min(max(cos_sha, -1.0), 1.0))     # sunset hour angle
+                dlh += (24.0 / pi) * sha
+                doy += 1
+
+            mean_dlh[ilat, imnth] = dlh / mdays
+
+    return mean_dlh
+
+def thornthwaite_batch(temps, lats, strt_year):
+    """
+    estimate monthly potential evapotranspiration [mm/month] using the Thornthwaite (1948) method
+        temps:      mean monthly air temperatures [deg C], array of cells by months starting in January of strt_year
+        lats:       latitude of each cell in degrees
+    months of an incomplete final year are ignored
+    returns list for each cell of PET for each month - for cell years with any month at or below freezing these are
+    the values returned by thornthwaite, otherwise Python floats calculated for all such cell years in one step
+    """
+    temps = np.asarray(temps, dtype = float)
+    if temps.ndim == 1:
+        temps = temps.reshape(1, -1)
+
+    ncells = temps.shape[0]
+    nyears = temps.shape[1] // MNTHS_YR
+    temps = temps[:, :nyears*MNTHS_YR].reshape(ncells, nyears, MNTHS_YR)
+    lats = np.asarray(lats, dtype = float)
+
+    # cell years for which the equation has a real value in every month
+    # ===================================================================
+    above_zero = (temps > 0.0).all(axis = 2)
+
+    # mean daylight hours for each distinct latitude
+    # ==============================================
+    ulats, lat_indices = np.unique(lats, return_inverse = True)
+    years = range(strt_year, strt_year + nyears)
+    dlh_yr_types = {}
+    for leap_flag in set(isleap(year) for year in years):
+        dlh_yr_types[leap_flag] = monthly_mean_daylight_hours(ulats, leap_flag)[lat_indices]
+
+    # heat index for each cell and year, summed in month order
+    # ========================================================
+    safe_temps = np.where(above_zero[:, :, np.newaxis], temps, 1.0)
+    heat_indx = np.zeros((ncells, nyears))
+    for imnth in range(MNTHS_YR):
+        heat_indx += np.power(safe_temps[:, :, imnth] / 5.0, 1.514)
+
+    alpha = (6.75e-07 * np.power(heat_indx, 3.0)) - (7.71e-05 * np.power(heat_indx, 2.0)) + \
+                                                                            (1.792e-02 * heat_indx) + 0.49239
+
+    pet = np.zeros((ncells, nyears, MNTHS_YR))
+    for iyr, year in enumerate(years):
+        leap_flag = isleap(year)
+        month_days = np.array(LEAP_MONTH_DAYS if leap_flag else MONTH_DAYS, dtype = float)
+        dlh = dlh_yr_types[leap_flag]
+        t_ratio = 10.0 * safe_temps[:, iyr, :] / heat_indx[:, iyr:iyr + 1]
+
+        # multiply by 10 to convert cm/month --> mm/month
+        pet[:, iyr, :] = 1.6 * (dlh / 12.0) * (month_days / 30.0) * np.power(t_ratio, alpha[:, iyr:iyr + 1]) * 10.0
+
+    # remaining cell years are passed to thornthwaite
+    # ===============================================
+    pets = []
+    for icell in range(ncells):
+        pet_cell = []
+        for iyr, year in enumerate(years):
+            if above_zero[icell, iyr]:
+                pet_cell += pet[icell, iyr].tolist()
+            else:
+                pet_cell += thornthwaite(temps[icell, iyr].tolist(), float(lats[icell]), year)
+        pets.append(pet_cell)
+
+    return pets
@@ -0,0 +1,173 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        plant_input_grid_fns.py
+# Purpose:     associate plant inputs once for each cell of the plant input grid rather than once for each site
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   associate_yield and associate_yield_nc set the plant inputs of the limited data object from the cell of the
+#   yield grid nearest to a site - the grid is usually coarser than the AOI so many sites of a band share a cell
+#   the nearest cell of every site of a band is found in a single step from the coordinates of the NetCDF dataset
+#   or DataFrame, then the association function is called for the first two sites visited in each cell and the
+#   attributes of the limited data object whose values it changes are copied to the other sites of the cell
+#   values are compared by shape and hash rather than identity so that attributes modified in place are found
+#   sites lying on the boundary between cells or beyond the grid, and grids whose coordinates cannot be identified
+#   e.g. plant inputs keyed by granular cell, are associated site by site as before
+#   should the two sites of a cell be given different values, i.e. the association depends on more than the cell,
+#   no cell is shared
+#   the names of all attributes changed are kept in site_attribs so that only these are copied for each site written
+#   by a writer thread - see site_writer_fns.py
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'plant_input_grid_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from copy import deepcopy
+from hashlib import sha1
+from pickle import dumps, PicklingError
+import numpy as np
+
+LAT_NAMES = ('lat', 'latitude')
+LON_NAMES = ('lon', 'longitude')
+EDGE_TOL = 1.0e-6           # sites within this many degrees of a cell boundary are associated individually
+WARN_STR = '*** Warning *** '
+
+def find_name(names, candidates):
+    """
+    first of names which matches one of the candidates, ignoring case, or None
+    """
+    for name in names:
+        if str(name).lower() in candidates:
+            return name
+
+    return None
+
+def pi_grid_coords(yield_df = None, yield_dset = None):
+    """
+    latitudes and longitudes of the plant input grid, from the coordinate variables of a NetCDF dataset or the
+    distinct coordinates of a DataFrame which must form a complete grid
+    returns None, None if either cannot be identified
+    """
+    if yield_dset is not None:
+        lat_var = find_name(yield_dset.variables, LAT_NAMES)
+        lon_var = find_name(yield_dset.variables, LON_NAMES)
+        if lat_var is None or lon_var is None:
+            return None, None
+        lats = np.asarray(yield_dset.variables[lat_var][:], dtype = float)
+        lons = np.asarray(yield_dset.variables[lon_var][:], dtype = float)
+    elif yield_df is not None:
+        lat_col = find_name(yield_df.columns, LAT_NAMES)
+        lon_col = find_name(yield_df.columns, LON_NAMES)
+        if lat_col is None or lon_col is None:
+            return None, None
+        lats = np.unique(yield_df[lat_col].values.astype(float))
+        lons = np.unique(yield_df[lon_col].values.astype(float))
+        if len(yield_df[[lat_col, lon_col]].drop_duplicates()) != len(lats)*len(lons):
+            return None, None      # scattered points rather than a complete grid
+    else:
+        return None, None
+
+    if lats.ndim != 1 or lons.ndim != 1 or len(lats) < 2 or len(lons) < 2:
+        return None, None
+
+    return lats, lons
+
+def nearest_indices(coords, vals):
+    """
+    index of the coordinate nearest to each value, -1 where the value is equidistant from two coordinates or lies
+    more than half a cell beyond the grid
+    """
+    coords = np.asarray(coords, dtype = float)
+    vals = np.asarray(vals, dtype = float)
+    order = np.argsort(coords)
+    srtd = coords[order]
+    half_cell = np.median(np.diff(srtd))/2
+
+    upper = np.clip(np.searchsorted(srtd, vals), 1, len(srtd) - 1)
+    dist_lower = vals - srtd[upper - 1]
+    dist_upper = srtd[upper] - vals
+    nearest = np.where(dist_lower <= dist_upper, upper - 1, upper)
+
+    ambiguous = np.abs(dist_lower - dist_upper) < EDGE_TOL
+    outside = (vals < srtd[0] - half_cell) | (vals > srtd[-1] + half_cell)
+
+    return np.where(ambiguous | outside, -1, order[nearest])
+
+def _value_key(val):
+    """
+    shape and hash of arrays and of data such as lists of plant inputs, other objects e.g. the form are identified
+    by identity
+    """
+    if isinstance(val, np.ndarray):
+        return val.shape, val.dtype.str, sha1(np.ascontiguousarray(val).tobytes()).hexdigest()
+
+    if isinstance(val, (list, tuple, dict, str, bytes, int, float, bool, type(None))):
+        try:
+            return type(val).__name__, sha1(dumps(val)).hexdigest()
+        except (PicklingError, TypeError, AttributeError):
+            pass
+
+    return 'id', id(val)
+
+def _value_keys(ltd_data):
+    """
+    value key of each attribute of the limited data object
+    """
+    return {attr: _value_key(val) for attr, val in vars(ltd_data).items()}
+
+class PlantInputCells(object):
+    """
+    nearest plant input cell of each AOI cell of a band and the plant inputs associated with each cell visited
+    """
+    def __init__(self, aoi_res, lats = None, lons = None):
+
+        self.ncalls = 0
+        self.nshared = 0
+        self.cell_states = {}
+        self.site_attribs = set()
+        if lats is None or lons is None:
+            self.cell_ids = None
+            return
+
+        ilats = nearest_indices(lats, [site_rec[2] for site_rec in aoi_res])
+        ilons = nearest_indices(lons, [site_rec[3] for site_rec in aoi_res])
+        self.cell_ids = np.where((ilats < 0) | (ilons < 0), -1, ilats*len(lons) + ilons).tolist()
+
+    def associate(self, site_indx, ltd_data, assoc_func, *args):
+        """
+        call assoc_func, e.g. associate_yield, with args for the first two sites of each cell, thereafter, if both
+        sites were given the same values, copy the attributes it changed
+        """
+        cell_id = -1 if self.cell_ids is None else self.cell_ids[site_indx]
+        cell_state = self.cell_states.get(cell_id)
+        if cell_state is not None and cell_state['verified'] and self.site_attribs <= set(cell_state['vals']):
+            for attr, val in cell_state['vals'].items():
+                setattr(ltd_data, attr, deepcopy(val))
+            self.nshared += 1
+            return
+
+        before = _value_keys(ltd_data)
+        assoc_func(*args)
+        self.ncalls += 1
+        after = _value_keys(ltd_data)
+        self.site_attribs.update(attr for attr, key in after.items() if before.get(attr) != key)
+        if cell_id < 0:
+            return
+
+        keys = {attr: after[attr] for attr in self.site_attribs if attr in after}
+        if cell_state is None or set(cell_state['keys']) != set(keys):
+            self.cell_states[cell_id] = {'keys': keys, 'verified': False,
+                                         'vals': {attr: deepcopy(getattr(ltd_data, attr)) for attr in keys}}
+        elif cell_state['keys'] == keys:
+            cell_state['verified'] = True
+        else:
+            changed = sorted(attr for attr in keys if keys[attr] != cell_state['keys'][attr])
+            mess = WARN_STR + '{} gave {} different values for sites of the same cell - plant inputs will be ' \
+                                                        'associated for each site'.format(assoc_func.__name__, changed)
+            print(mess)
+            self.cell_ids = None
+            self.cell_states = {}
@@ -0,0 +1,240 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        run_manifest_fns.py
+# Purpose:     record progress of a banded study so that an interrupted run can be resumed
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the manifest, <study>_manifest.jsonl in the simulations directory, has a header line followed by one JSON line
+#   for each band which is started or finished - a finished entry records the number of cells and a checksum of the
+#   cells for which simulation files were written
+#   while a band is processed each completed cell is appended to a checkpoint file for that band, one JSON line
+#   holding its key, position in the band, input hash and the lines it contributed to the study files, so that a band
+#   which was interrupted is resumed from the first cell not yet completed
+#   on resuming, the study file lines of completed cells and bands are replayed so that the study files are the same
+#   as for an uninterrupted run - the cell which opened the study files has no recorded lines and is regenerated
+#   band entries are written by the main process only whereas checkpoint files are written by whichever process
+#   generates the band
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'run_manifest_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import json
+from hashlib import sha1
+from time import strftime
+from glob import glob
+from os import makedirs, remove
+from os.path import join, isfile, isdir
+
+MANIFEST_VERSION = 2
+BAND_STARTED = 'started'
+BAND_COMPLETE = 'complete'
+BAND_INCOMPLETE = 'incomplete'     # band exited early e.g. when completed_max is reached
+WARN_STR = '*** Warning *** '
+
+def site_key(site_rec):
+    """
+    granular lat and lon of an AOI cell e.g. 00300_04230
+    """
+    return '{:0>5}_{:0>5}'.format(site_rec[0], site_rec[1])
+
+def _read_checkpoint(chckpnt_fn):
+    """
+    entries of completed cells keyed by cell, the last line may be partial if the run was killed while writing
+    """
+    entries = {}
+    with open(chckpnt_fn, 'r') as fchckpnt:
+        for line in fchckpnt:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[entry['key']] = entry
+
+    return entries
+
+class BandCheckpoint(object):
+    """
+    appends each completed cell to the checkpoint file of a band, done_keys holds entries of completed cells by key
+    """
+    def __init__(self, chckpnt_fn, done_keys):
+
+        self.chckpnt_fn = chckpnt_fn
+        self.done_keys = done_keys
+        self.ncells = len(done_keys)
+        self.exit_early = False
+        self._fobj = open(chckpnt_fn, 'a')
+
+    def record(self, key, study_lines, site_hash = None, site_indx = None):
+        """
+        study_lines is None for the cell which opened the study files
+        flush after each cell so that the file reflects work done should the run be interrupted
+        """
+        if key in self.done_keys:
+            return      # replayed from a previous run
+
+        entry = {'key': key, 'indx': site_indx, 'hash': site_hash, 'study_lines': study_lines}
+        self._fobj.write(json.dumps(entry) + '\n')
+        self._fobj.flush()
+        self.done_keys[key] = entry
+        self.ncells += 1
+
+    def replay_site(self, site_writer, key):
+        """
+        if the cell was completed by a previous run then pass its study file lines to the site writer and return True
+        cells whose lines cannot be replayed e.g. the cell which opened the study files, are regenerated
+        """
+        entry = self.done_keys.get(key)
+        if entry is None or not site_writer.can_replay(entry['study_lines']):
+            return False
+
+        site_writer.replay(key, (entry['hash'], entry['indx']), entry['study_lines'])
+
+        return True
+
+    def close(self):
+        """
+        returns band summary for the manifest
+        """
+        self._fobj.close()
+        checksum = sha1('\n'.join(sorted(self.done_keys)).encode()).hexdigest()
+        if self.exit_early:
+            status = BAND_INCOMPLETE
+        else:
+            status = BAND_COMPLETE
+
+        return {'status': status, 'ncells': self.ncells, 'checksum': checksum}
+
+class RunManifest(object):
+    """
+    if resume_flag is False then any manifest and checkpoints from a previous run of the study are discarded
+    """
+    def __init__(self, sims_dir, study, lat_step, bbox, resume_flag = False):
+
+        self.manifest_fn = join(sims_dir, study + '_manifest.jsonl')
+        self.chckpnt_dir = join(sims_dir, study + '_checkpoints')
+        self.resume_flag = resume_flag
+        self.bands = {}
+        self.prev_complete = {}     # bands completed by a previous run, whose study file lines are replayed
+
+        if not isdir(self.chckpnt_dir):
+            makedirs(self.chckpnt_dir)
+
+        if resume_flag and isfile(self.manifest_fn):
+            if self._read_manifest(lat_step, bbox):
+                self.prev_complete = {num_band: self.bands[num_band] for num_band in self.complete_bands()}
+                print('Resuming study {} - {} bands already complete'.format(study, len(self.prev_complete)))
+                return
+            print(WARN_STR + 'manifest ' + self.manifest_fn +
+                                                        ' is for a different banding or version - will start afresh')
+
+        self.resume_flag = False
+        for chckpnt_fn in glob(join(self.chckpnt_dir, 'band*.txt')) + glob(join(self.chckpnt_dir, 'band*.jsonl')):
+            remove(chckpnt_fn)
+
+        header = {'study': study, 'version': MANIFEST_VERSION, 'lat_step': lat_step, 'bbox': bbox,
+                                                                                'created': strftime('%Y-%m-%d %H:%M:%S')}
+        with open(self.manifest_fn, 'w') as fmanifest:
+            fmanifest.write(json.dumps(header) + '\n')
+
+    def _read_manifest(self, lat_step, bbox):
+        """
+        returns False if the manifest was written for a different banding of the study area or by another version
+        the latest entry for each band takes precedence
+        """
+        with open(self.manifest_fn, 'r') as fmanifest:
+            lines = fmanifest.readlines()
+
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return False
+
+        if header.get('version') != MANIFEST_VERSION or header.get('lat_step') != lat_step or \
+                                                                                        header.get('bbox') != bbox:
+            return False
+
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue    # last line may be partial if the run was killed while writing
+            self.bands[entry['band']] = entry
+
+        return True
+
+    def complete_bands(self):
+        """
+        numbers of bands which finished
+        """
+        return [num_band for num_band in self.bands if self.bands[num_band]['status'] == BAND_COMPLETE]
+
+    def _append(self, entry):
+
+        with open(self.manifest_fn, 'a') as fmanifest:
+            fmanifest.write(json.dumps(entry) + '\n')
+        self.bands[entry['band']] = entry
+
+    def band_started(self, num_band):
+
+        self._append({'band': num_band, 'status': BAND_STARTED, 'time': strftime('%Y-%m-%d %H:%M:%S')})
+
+    def band_finished(self, num_band, summary):
+        """
+        summary is returned by the close method of the band checkpoint or is None if no cells were generated
+        """
+        if summary is None:
+            summary = {'status': BAND_COMPLETE, 'ncells': 0, 'checksum': sha1(b'').hexdigest()}
+
+        entry = {'band': num_band, 'time': strftime('%Y-%m-%d %H:%M:%S')}
+        entry.update(summary)
+        self._append(entry)
+
+    def _chckpnt_fname(self, num_band):
+
+        return join(self.chckpnt_dir, 'band{:0>4}.jsonl'.format(num_band))
+
+    def band_checkpoint(self, num_band):
+        """
+        called by the process which generates the band - cells from an interrupted run are carried over if resuming
+        """
+        chckpnt_fn = self._chckpnt_fname(num_band)
+        if self.resume_flag and isfile(chckpnt_fn):
+            done_keys = _read_checkpoint(chckpnt_fn)
+        else:
+            done_keys = {}
+            open(chckpnt_fn, 'w').close()
+
+        return BandCheckpoint(chckpnt_fn, done_keys)
+
+    def replay_band(self, num_band, fstudy):
+        """
+        write study file lines of a band completed by a previous run in the order of its cells and return its summary
+        returns None if the band must be regenerated e.g. it holds the cell which opened the study files
+        """
+        entry = self.prev_complete.get(num_band)
+        if entry is None:
+            return None
+
+        chckpnt_fn = self._chckpnt_fname(num_band)
+        if isfile(chckpnt_fn):
+            cells = list(_read_checkpoint(chckpnt_fn).values())
+        else:
+            cells = []
+        if len(cells) != entry['ncells']:
+            return None
+
+        if len(cells) > 0:
+            if fstudy == '' or any(cell['study_lines'] is None or cell['indx'] is None or
+                                                        len(cell['study_lines']) != len(fstudy) for cell in cells):
+                return None
+            for cell in sorted(cells, key = lambda cell: cell['indx']):
+                for fobj, lines in zip(fstudy, cell['study_lines']):
+                    fobj.write(lines)
+
+        return {'status': BAND_COMPLETE, 'ncells': entry['ncells'], 'checksum': entry['checksum']}
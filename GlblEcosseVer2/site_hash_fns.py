@@ -0,0 +1,218 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        site_hash_fns.py
+# Purpose:     skip regeneration of simulation files for sites whose inputs have not changed
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the inputs of each site are hashed and compared with the hash recorded when the site was last written
+#   the inputs hashed are: the site record, the soil records of its mu_globals, its weather, the attributes of the
+#   limited data object set for each site, e.g. plant inputs, and the hash of the inputs common to the band
+#   the band hash covers the other attributes of the limited data object, the climate attributes which key the
+#   weather cache and the form settings listed in FORM_ATTRIBS and FORM_WDGTS - it is taken once for each band, or
+#   again should further attributes be set for a site
+#   containers and objects are hashed in full, recursing into their contents
+#   the study file lines written for each site, captured by the site writer, are recorded alongside the hash so
+#   that they can be replayed when the site is skipped - see site_writer_fns.py
+#   hashes are held in one file per band in <study>_site_hashes in the simulations directory
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'site_hash_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import json
+from io import IOBase
+from logging import Logger
+from hashlib import sha1
+from os import makedirs, replace
+from os.path import join, isfile, isdir
+import numpy as np
+from pandas import DataFrame, Series, util
+
+from wthr_cache_fns import climgen_key_attribs
+
+HASH_VERSION = 3
+SIMPLE_TYPES = (bool, int, float, complex, str, bytes, type(None))
+OPAQUE_TYPES = (IOBase, Logger)     # only the type of these is hashed e.g. open study files
+FORM_ATTRIBS = ('sims_dir', 'req_resol_deg', 'req_resol_granul')
+FORM_WDGTS = (('w_equimode', 'text'), ('w_ave_weather', 'isChecked'), ('combo16', 'currentIndex'),
+              ('w_lbl13', 'text'), ('w_use_pi_nc', 'isChecked'), ('w_lbl_pi_nc', 'text'),
+              ('w_use_pi_csv', 'isChecked'), ('w_lbl_pi_csv', 'text'))   # settings used by make_ecosse_file
+WARN_STR = '*** Warning *** '
+
+def _canonical(val, skip_ids, seen = None):
+    """
+    representation of val from which its hash is taken: containers are recursed into in a fixed order and objects
+    are represented by their class and attributes, objects whose ids are in skip_ids by their class only
+    """
+    if seen is None:
+        seen = set()
+
+    if isinstance(val, SIMPLE_TYPES):
+        return val
+
+    if isinstance(val, np.generic):
+        return val.item()
+
+    if isinstance(val, np.ndarray):
+        if val.dtype.hasobject:
+            return ('ndarray', [_canonical(elem, skip_ids, seen) for elem in val.tolist()])
+        return ('ndarray', val.dtype.str, val.shape, sha1(np.ascontiguousarray(val).tobytes()).hexdigest())
+
+    if isinstance(val, (DataFrame, Series)):
+        return (type(val).__name__, sha1(util.hash_pandas_object(val).values.tobytes()).hexdigest())
+
+    if id(val) in seen or id(val) in skip_ids or isinstance(val, OPAQUE_TYPES):
+        return (type(val).__name__,)
+
+    seen = seen | {id(val)}
+    if isinstance(val, (list, tuple)):
+        return (type(val).__name__, [_canonical(elem, skip_ids, seen) for elem in val])
+
+    if isinstance(val, (set, frozenset)):
+        return ('set', sorted(repr(_canonical(elem, skip_ids, seen)) for elem in val))
+
+    if isinstance(val, dict):
+        return ('dict', sorted((repr(_canonical(key, skip_ids, seen)), _canonical(elem, skip_ids, seen))
+                                                                                    for key, elem in val.items()))
+    if hasattr(val, '__dict__') and not callable(val):
+        return (type(val).__name__, _canonical(vars(val), skip_ids, seen))
+
+    return (type(val).__name__,)
+
+def form_key_attribs(form):
+    """
+    settings of the form, other than those determining the site and soil records, used to write simulation files
+    """
+    key_attribs = [(attr, getattr(form, attr, None)) for attr in FORM_ATTRIBS]
+    for wdgt_name, method in FORM_WDGTS:
+        wdgt = getattr(form, wdgt_name, None)
+        key_attribs.append((wdgt_name, None if wdgt is None else getattr(wdgt, method)()))
+
+    return key_attribs
+
+def band_inputs_hash(ltd_data, climgen, form, study, site_attribs):
+    """
+    hash of the inputs common to the sites of a band, the attributes of ltd_data in site_attribs are excluded
+    the form and climgen objects are hashed through their listed attributes should ltd_data refer to them
+    """
+    band_attribs = {attr: val for attr, val in vars(ltd_data).items() if attr not in site_attribs}
+
+    hsh = sha1()
+    hsh.update(repr([HASH_VERSION, study]).encode())
+    hsh.update(repr(_canonical(band_attribs, {id(form), id(climgen), id(ltd_data)})).encode())
+    hsh.update(repr(climgen_key_attribs(climgen)).encode())
+    hsh.update(repr(form_key_attribs(form)).encode())
+
+    return hsh.hexdigest()
+
+def site_inputs_hash(site_rec, soil_recs, pettmp_grid_cell, ltd_data, site_attribs, band_hash):
+    """
+    hash of everything from which the simulation files of a site are generated, band_hash is that of the inputs
+    common to the band taken by band_inputs_hash with the same site_attribs
+    """
+    mu_globals_props = site_rec[-1]
+
+    hsh = sha1()
+    hsh.update(repr([band_hash, site_rec[:-1], sorted(mu_globals_props.items())]).encode())
+    for mu_global in sorted(mu_globals_props):
+        hsh.update(repr(soil_recs.get(mu_global)).encode())
+
+    for metric in sorted(pettmp_grid_cell):
+        for wthr_vals in pettmp_grid_cell[metric]:
+            hsh.update(np.asarray(wthr_vals, dtype = float).tobytes())
+
+    site_vals = [(attr, getattr(ltd_data, attr, None)) for attr in sorted(site_attribs)]
+    hsh.update(repr(_canonical(site_vals, {id(ltd_data)})).encode())
+
+    return hsh.hexdigest()
+
+class SiteHashIndex(object):
+    """
+    hashes and study file lines of the sites of one band
+    """
+    def __init__(self, sims_dir, study, num_band, enabled):
+
+        self.enabled = enabled
+        self.prev_entries = {}
+        self.entries = {}
+        self.band_hashes = {}
+        self.nunchanged = 0
+        if not enabled:
+            return
+
+        hash_dir = join(sims_dir, study + '_site_hashes')
+        if not isdir(hash_dir):
+            makedirs(hash_dir)
+
+        self.hash_fn = join(hash_dir, 'band{:0>4}.json'.format(num_band))
+        if isfile(self.hash_fn):
+            try:
+                with open(self.hash_fn, 'r') as fhash:
+                    self.prev_entries = json.load(fhash)
+            except (OSError, ValueError) as err:
+                print(WARN_STR + 'could not read site hashes from {} - all sites will be written\n\t{}'
+                                                                                        .format(self.hash_fn, err))
+
+    def site_hash(self, site_rec, soil_recs, pettmp_grid_cell, ltd_data, site_attribs, climgen, form, study):
+        """
+        hash of the inputs of a site, site_attribs are the names of the attributes of ltd_data set for each site
+        the hash of the inputs common to the band is taken for the first site with these site_attribs
+        returns None, and disables the index, if the climgen object lacks an attribute of the weather key
+        """
+        band_key = frozenset(site_attribs)
+        if band_key not in self.band_hashes:
+            try:
+                self.band_hashes[band_key] = band_inputs_hash(ltd_data, climgen, form, study, band_key)
+            except AttributeError as err:
+                mess = WARN_STR + 'incremental mode disabled since inputs cannot be hashed - all sites will be ' \
+                                                                                        'written\n\t' + str(err)
+                print(mess); form.lgr.warning(mess)
+                self.enabled = False
+                return None
+
+        return site_inputs_hash(site_rec, soil_recs, pettmp_grid_cell, ltd_data, band_key,
+                                                                                        self.band_hashes[band_key])
+
+    def prev_study_lines(self, form, key, site_hash):
+        """
+        if the site inputs are unchanged then return the study file lines recorded for the site, otherwise None
+        """
+        if not self.enabled:
+            return None
+
+        entry = self.prev_entries.get(key)
+        if entry is None or entry['hash'] != site_hash or entry['study_lines'] is None:
+            return None
+
+        if form.fstudy == '' or len(form.fstudy) != len(entry['study_lines']):
+            return None    # study files not yet opened
+
+        self.nunchanged += 1
+
+        return entry['study_lines']
+
+    def record(self, key, site_hash, study_lines):
+        """
+        study_lines is None for the site which opened the study files since lines could not be captured
+        """
+        if self.enabled:
+            self.entries[key] = {'hash': site_hash, 'study_lines': study_lines}
+
+    def close(self):
+        """
+        sites no longer in the band are dropped from the index
+        """
+        if not self.enabled:
+            return
+
+        tmp_fn = self.hash_fn + '.tmp'
+        with open(tmp_fn, 'w') as fhash:
+            json.dump(self.entries, fhash)
+        replace(tmp_fn, self.hash_fn)
+
+        return
@@ -0,0 +1,329 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        site_writer_fns.py
+# Purpose:     write simulation files of sites in a pool of threads while the next site is prepared
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   each site is submitted with a copy of the limited data object, in which only the attributes set for each site
+#   are copied, and a copy of the form whose study files are in memory - lines written to the study files are
+#   appended to the real study files in order of submission once the site is finished so that the study files are
+#   identical to those from a serial run
+#   the number of sites submitted but not yet finished is capped, when the cap is reached the main loop waits for
+#   the oldest site - all sites are finished by flush, which is called at the end of each band
+#   with no writer threads each site is written when submitted, straight to the study files unless lines are held or
+#   converted by the packer, with no copies made
+#   where study file lines are held, e.g. for tiled bands, the lines of the site which opens the study files are
+#   those at the end of each study file once it is written, taking the number of lines written by each of the other
+#   sites - if any site precedes it in AOI order these lines are moved to those held so that every site is written in
+#   AOI order after the header
+#   in packed mode site files are written to the staging directory of the band packer - see packed_output_fns.py
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'site_writer_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
+from io import StringIO
+
+from form_proxy_fns import widget_free_copy
+
+WARN_STR = '*** Warning *** '
+
+def _study_files_open(form):
+    """
+    study files are opened when the first simulation is written
+    """
+    if form.fstudy == '' or len(form.fstudy) == 0:
+        return False
+    else:
+        return True
+
+def _snapshot(obj, attribs, shared = ()):
+    """
+    shallow copy in which the attributes set for each site are deep copied so that no nested state, e.g. lists of
+    plant inputs, is shared with the object being prepared for the next site - objects in shared, such as the form
+    and climgen, are referenced rather than copied
+    """
+    memo = {id(val): val for val in shared}
+    obj_copy = copy(obj)
+    for attr in attribs:
+        if hasattr(obj, attr):
+            setattr(obj_copy, attr, deepcopy(getattr(obj, attr), memo))
+
+    return obj_copy
+
+class _StudyFileRecorder(object):
+    """
+    study file which also records the lines written to it
+    """
+    def __init__(self, fobj):
+
+        self.fobj = fobj
+        self.lines = []
+
+    def write(self, lines):
+
+        self.lines.append(lines)
+        return self.fobj.write(lines)
+
+    def getvalue(self):
+
+        return ''.join(self.lines)
+
+    def __getattr__(self, name):
+
+        return getattr(self.fobj, name)
+
+def _capture_study_lines(form, make_func, args):
+    """
+    call make_func, e.g. make_ecosse_file, with the form followed by args, capturing lines written to the study files
+    """
+    form.fstudy = [StringIO() for ichan in range(len(form.fstudy))]
+    make_func(form, *args)
+
+    return [fobj.getvalue() for fobj in form.fstudy]
+
+class SiteWriterPool(object):
+    """
+    on_done is called in the main thread with the site key, study file lines and data supplied with the site, in
+    order of submission, once the simulation files of each site have been written
+    packer, if supplied and enabled, provides the directory to which site files are written and converts study file
+    lines
+    """
+    def __init__(self, form, num_writers, max_pending, on_done, packer = None):
+
+        self.form = form
+        self.packer = packer if packer is not None and packer.enabled else None
+        self.num_writers = num_writers
+        self.max_pending = max(1, max_pending)
+        self.on_done = on_done
+        self.pending = deque()
+        self.held_lines = None
+        self.nwritten = 0
+        self._form_snapshot = None
+        if num_writers > 0:
+            self._executor = ThreadPoolExecutor(max_workers = num_writers, thread_name_prefix = 'site_writer')
+        else:
+            self._executor = None
+
+    def submit(self, key, data, make_func, *args):
+        """
+        args follow the form in the call to make_func, any which are modified while preparing the next site,
+        such as the limited data object, must be copies
+        """
+        if self._executor is None or not _study_files_open(self.form):
+            self.flush()
+            self._write_now(key, data, make_func, args)
+            return
+
+        if self._form_snapshot is None:
+            self._form_snapshot = widget_free_copy(self.form)
+
+        while len(self.pending) >= self.max_pending:
+            self._finish_oldest()       # back pressure
+
+        form_site = copy(self._form_snapshot)
+        form_site.fstudy = list(self.form.fstudy)
+        form_site.sims_dir = self._site_sims_dir()
+        future = self._executor.submit(_capture_study_lines, form_site, make_func, args)
+        self.pending.append((key, data, future))
+
+    def site_copy(self, obj, attribs, *shared):
+        """
+        copy of an object which is modified for each site, e.g. the limited data object whose plant inputs are set by
+        associate_yield, so that the copy submitted is unaffected by preparation of subsequent sites
+        attribs are the names of the attributes set for each site, only these are copied
+        shared are objects referenced by these attributes which are not modified, these and the form are not copied
+        no copy is needed when sites are written as they are submitted
+        """
+        if self._executor is None:
+            return obj
+        else:
+            return _snapshot(obj, attribs, (self.form,) + shared)
+
+    def can_replay(self, study_lines):
+        """
+        recorded study file lines can be replayed only once the study files are open
+        """
+        return study_lines is not None and _study_files_open(self.form) and len(study_lines) == len(self.form.fstudy)
+
+    def replay(self, key, data, study_lines):
+        """
+        site whose simulation files already exist e.g. unchanged in incremental mode or completed by a previous run,
+        its lines are written in turn
+        """
+        self.pending.append((key, data, study_lines))
+        if self._executor is None:
+            self.flush()
+
+    def _write_now(self, key, data, make_func, args):
+        """
+        write in the main thread, lines of the site which opens the study files are taken from the study files only
+        if lines are held
+        """
+        if _study_files_open(self.form) and self.held_lines is None and self.packer is None:
+            fstudy = self.form.fstudy
+            self.form.fstudy = [_StudyFileRecorder(fobj) for fobj in fstudy]
+            try:
+                make_func(self.form, *args)
+                study_lines = [fobj.getvalue() for fobj in self.form.fstudy]
+            finally:
+                self.form.fstudy = fstudy
+        elif _study_files_open(self.form):
+            fstudy = self.form.fstudy
+            sims_dir = self.form.sims_dir
+            self.form.sims_dir = self._site_sims_dir()
+            try:
+                study_lines = self._cnvrt_study_lines(_capture_study_lines(self.form, make_func, args))
+            finally:
+                self.form.fstudy = fstudy
+                self.form.sims_dir = sims_dir
+            self._append_study_lines(key, study_lines)
+        else:
+            make_func(self.form, *args)
+            study_lines = None
+            if self.held_lines is not None and _study_files_open(self.form):
+                self.held_lines[key] = None     # lines are already in the study files, see _detach_opener_lines
+
+        self.nwritten += 1
+        self.on_done(key, study_lines, data)
+
+    def _detach_opener_lines(self, held_lines):
+        """
+        lines of the site which opened the study files, which are at the end of each study file, are removed so that
+        they can be written with those of other sites - the number of lines is that written by each of the other sites
+        to the same study file, each file is then rewritten with its header only
+        returns None, leaving the study files as they are, if the lines cannot be identified
+        """
+        nlines = set(tuple(lines.count('\n') for lines in study_lines) for study_lines in held_lines.values()
+                                                                                        if study_lines is not None)
+        if len(nlines) != 1:
+            mess = WARN_STR + 'number of study file lines differs between sites - lines of the first site are not moved'
+            print(mess); self.form.lgr.warning(mess)
+            return None
+
+        headers = []
+        study_lines = []
+        for fobj, nline in zip(self.form.fstudy, nlines.pop()):
+            if hasattr(fobj, 'getvalue'):
+                content = fobj.getvalue()
+            else:
+                fobj.flush()
+                with open(fobj.name, 'r', encoding = getattr(fobj, 'encoding', None)) as fread:
+                    content = fread.read()
+
+            lines = content.splitlines(keepends = True)
+            if nline == 0 or len(lines) < nline:
+                mess = WARN_STR + 'study file {} is shorter than expected - lines of the first site are not moved'\
+                                                                                .format(getattr(fobj, 'name', ''))
+                print(mess); self.form.lgr.warning(mess)
+                return None
+
+            headers.append(''.join(lines[:-nline]))
+            study_lines.append(''.join(lines[-nline:]))
+
+        for fobj, header in zip(self.form.fstudy, headers):
+            fobj.seek(0)
+            fobj.truncate()
+            fobj.write(header)
+
+        return study_lines
+
+    def _site_sims_dir(self):
+
+        if self.packer is None:
+            return self.form.sims_dir
+        else:
+            return self.packer.site_sims_dir()
+
+    def _cnvrt_study_lines(self, study_lines):
+
+        if self.packer is None:
+            return study_lines
+        else:
+            return self.packer.cnvrt_study_lines(study_lines)
+
+    def _append_study_lines(self, key, study_lines):
+
+        if self.held_lines is None:
+            for fobj, lines in zip(self.form.fstudy, study_lines):
+                fobj.write(lines)
+        else:
+            self.held_lines[key] = study_lines
+
+    def hold_study_lines(self):
+        """
+        retain study file lines of each site until release_study_lines is called e.g. when sites are visited in
+        an order other than that of the AOI records
+        """
+        self.held_lines = {}
+
+    def release_study_lines(self, keys):
+        """
+        wait for all submitted sites then write their study file lines in the order given by keys
+        """
+        self.flush()
+        held_lines = self.held_lines
+        self.held_lines = None
+        if held_lines is None:
+            return
+
+        # lines of the site which opened the study files need only be moved if another site precedes it
+        # ==============================================================================================
+        held_keys = [key for key in keys if key in held_lines]
+        for key in held_keys:
+            if held_lines[key] is not None:
+                break
+            held_lines.pop(key)
+
+        opener_keys = [key for key, study_lines in held_lines.items() if study_lines is None]
+        if len(opener_keys) > 0:
+            study_lines = self._detach_opener_lines(held_lines)
+            for key in opener_keys:
+                held_lines[key] = study_lines
+
+        for key in held_keys:
+            if key in held_lines and held_lines[key] is not None:
+                self._append_study_lines(key, held_lines.pop(key))
+
+    def _finish_oldest(self):
+        """
+        wait for the oldest site, an exception raised while writing it is raised here
+        """
+        key, data, future = self.pending.popleft()
+        if isinstance(future, list):
+            study_lines = future
+        else:
+            study_lines = self._cnvrt_study_lines(future.result())
+            self.nwritten += 1
+
+        self._append_study_lines(key, study_lines)
+        self.on_done(key, study_lines, data)
+
+    def flush(self):
+        """
+        wait for all submitted sites
+        """
+        while len(self.pending) > 0:
+            self._finish_oldest()
+
+    def close(self):
+        """
+        sites submitted before an exception in the main loop are still written, as are study file lines still held
+        """
+        try:
+            if self.held_lines is None:
+                self.flush()
+            else:
+                self.release_study_lines(list(self.held_lines.keys()) + [key for key, data, future in self.pending])
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait = True)
+            self._form_snapshot = None
@@ -0,0 +1,125 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        soil_rec_cache_fns.py
+# Purpose:     persistent lookup of HWSD soil records shared by studies
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   the HWSD attribute data does not change between studies yet get_soil_recs queries it for every mu_global of
+#   every study - here the soil records of each mu_global retrieved, together with the mu_globals found to have no
+#   valid soils, are saved as a SoilRecStore in a versioned .npz file in the soil cache directory
+#   the file name carries a signature of the HWSD directory, the names, sizes and modification times of its files,
+#   so that a changed HWSD database is never matched with records retrieved from another
+#   studies look up their mu_globals by index in the store and only mu_globals absent from the cache are retrieved
+#   from the HWSD database, after which the cache is rewritten
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'soil_rec_cache_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from hashlib import sha1
+from os import listdir, makedirs, replace, remove, getpid, stat
+from os.path import join, isfile, isdir
+
+import numpy as np
+
+from soil_rec_store import SoilRecStore
+
+SOIL_CACHE_VERSION = 2
+WARN_STR = '*** Warning *** '
+
+def hwsd_signature(hwsd_dir):
+    """
+    digest of the names, sizes and modification times of files in the HWSD directory
+    """
+    sig = sha1()
+    for fname in sorted(listdir(hwsd_dir)):
+        path = join(hwsd_dir, fname)
+        if isfile(path):
+            fstat = stat(path)
+            sig.update('{}\t{}\t{}\n'.format(fname, fstat.st_size, int(fstat.st_mtime)).encode())
+
+    return sig.hexdigest()
+
+def soil_cache_fname(cache_dir, hwsd_dir):
+
+    return join(cache_dir, 'soil_recs_v{}_{}.npz'.format(SOIL_CACHE_VERSION, hwsd_signature(hwsd_dir)[:16]))
+
+def _read_cache(cache_fn):
+    """
+    returns store and list of bad mu_globals, an empty store if the cache is absent or cannot be read
+    """
+    empty_store = SoilRecStore.from_soil_recs({})
+    if not isfile(cache_fn):
+        return empty_store, []
+
+    try:
+        store, metadata = SoilRecStore.load(cache_fn)
+        if int(metadata['version']) != SOIL_CACHE_VERSION:
+            raise ValueError('version {} does not match {}'.format(int(metadata['version']), SOIL_CACHE_VERSION))
+    except (OSError, KeyError, ValueError) as err:
+        print(WARN_STR + 'ignoring unreadable soil record cache ' + cache_fn + '\n\t' + str(err))
+        return empty_store, []
+
+    return store, metadata['bad_mu_globals'].tolist()
+
+def _write_cache(cache_fn, store, bad_mu_globals):
+    """
+    write to a temporary file and rename so that concurrent studies never read a partly written cache
+    """
+    tmp_fn = cache_fn + '.{}.tmp'.format(getpid())
+    try:
+        store.save(tmp_fn, version = np.array(SOIL_CACHE_VERSION),
+                                            bad_mu_globals = np.array(sorted(bad_mu_globals), dtype = np.int64))
+        replace(tmp_fn, cache_fn)
+    except (OSError, ValueError) as err:
+        if isfile(tmp_fn):
+            remove(tmp_fn)
+        print(WARN_STR + 'could not write soil record cache ' + cache_fn + '\n\t' + str(err))
+
+def _retrieve_soil_recs(hwsd, mu_global_list):
+    """
+    query HWSD database, returns soil records as a store and list of bad mu_globals
+    """
+    soil_recs = hwsd.get_soil_recs({mu_global: None for mu_global in mu_global_list})  # list is already sorted
+    bad_mu_globals = list(hwsd.bad_muglobals)
+    for mu_global in bad_mu_globals:
+        del(soil_recs[mu_global])
+
+    return SoilRecStore.from_soil_recs(soil_recs), bad_mu_globals
+
+def fetch_soil_recs(form, hwsd, mu_global_list):
+    """
+    soil records of mu_global_list, bad mu_globals excluded, from the cache where the soil_cache_dir setting is
+    not blank otherwise from the HWSD database
+    returns SoilRecStore and list of bad mu_globals in the order of mu_global_list
+    """
+    cache_dir = form.sttngs['soil_cache_dir']
+    if cache_dir == '':
+        return _retrieve_soil_recs(hwsd, mu_global_list)
+
+    if not isdir(cache_dir):
+        makedirs(cache_dir)
+    cache_fn = soil_cache_fname(cache_dir, form.hwsd_dir)
+
+    store, bad_mu_globals = _read_cache(cache_fn)
+    bad_set = set(bad_mu_globals)
+    missing = [mu_global for mu_global in mu_global_list if mu_global not in store and mu_global not in bad_set]
+
+    if len(missing) > 0:
+        new_store, new_bad = _retrieve_soil_recs(hwsd, missing)
+        store = store.merge(new_store)
+        bad_set.update(new_bad)
+        _write_cache(cache_fn, store, bad_set)
+
+    mess = 'Soil records of {} mu_globals taken from cache, {} retrieved from HWSD database'\
+                                                        .format(len(mu_global_list) - len(missing), len(missing))
+    print(mess); form.lgr.info(mess)
+
+    study_bad = [mu_global for mu_global in mu_global_list if mu_global in bad_set]
+
+    return store.subset(mu_global_list), study_bad
@@ -0,0 +1,331 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        soil_rec_store.py
+# Purpose:     compact columnar store of HWSD soil records
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   soil records returned by get_soil_recs are a dictionary of mu_global -> list of soils where each soil is a list
+#   of metrics followed by its share of the mu_global; here all soils are held in a single NumPy structured array,
+#   one field per metric, with the soils of each mu_global occupying a contiguous run of rows
+#   numeric metrics are held as float64 whatever the values supplied, a boolean array of the same shape as the soils
+#   records which values were integers so that each soil is returned with the types it was supplied with and stores
+#   holding different mixes of integers and floats can be merged without changing either
+#   duplicate compression and dominant soil selection are carried out as group-by operations on this array
+#   the store responds to the same lookups and updates as the dictionary e.g. soil_recs[mu_global] returns a list of
+#   soils and del soil_recs[mu_global] removes them - an update rebuilds the arrays so is not intended for loops
+#   stores may be saved to and loaded from a NumPy .npz file - see soil_rec_cache_fns
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'soil_rec_store.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import numpy as np
+
+SHARE_FIELD = 'share'
+
+def _is_int(val):
+
+    return isinstance(val, (int, np.integer)) and not isinstance(val, bool)
+
+def _column_dtype(vals):
+    """
+    numeric metrics are held as floats, integers being recorded in the integer mask
+    """
+    if all(isinstance(val, (int, float, np.integer, np.floating)) and not isinstance(val, bool) for val in vals):
+        return np.float64
+    else:
+        return object
+
+def _share_as_float(int_mask, recs, rows):
+    """
+    dominant soils are assigned a share of 100.0, shares of other soils keep their type
+    """
+    int_mask = int_mask.copy()
+    int_mask[rows, recs.dtype.names.index(SHARE_FIELD)] = False
+
+    return int_mask
+
+def _common_dtype(recs_a, recs_b):
+    """
+    dtype to which soils of both arrays can be converted, arrays must share the same fields
+    numeric fields are float64 in both unless one holds objects
+    """
+    if recs_a.dtype.names != recs_b.dtype.names:
+        raise ValueError('soil records have different metrics')
+
+    return [(field, np.promote_types(recs_a.dtype[field], recs_b.dtype[field])) for field in recs_a.dtype.names]
+
+class SoilRecStore(object):
+    """
+    recs is a structured array of soils ordered by mu_global, offsets are the first row of each mu_global
+    int_mask has a row for each soil and a column for each field, True where the value supplied was an integer
+    """
+    def __init__(self, mu_globals, offsets, recs, int_mask):
+
+        self.mu_globals = np.asarray(mu_globals, dtype = np.int64)
+        self.offsets = np.asarray(offsets, dtype = np.int64)     # one more than the number of mu_globals
+        self.recs = recs
+        self.int_mask = np.asarray(int_mask, dtype = bool).reshape(len(recs), len(recs.dtype.names))
+        self._indices = {mu_global: indx for indx, mu_global in enumerate(self.mu_globals.tolist())}
+
+    @classmethod
+    def from_soil_recs(cls, soil_recs):
+        """
+        build store from dictionary of mu_global -> list of soils, metrics of each soil are converted per column
+        """
+        mu_globals = list(soil_recs.keys())
+        nsoils = [len(soil_recs[mu_global]) for mu_global in mu_globals]
+        offsets = np.concatenate([[0], np.cumsum(nsoils, dtype = np.int64)])
+        rows = [tuple(soil) for mu_global in mu_globals for soil in soil_recs[mu_global]]
+
+        if len(rows) == 0:
+            recs = np.zeros(0, dtype = [(SHARE_FIELD, np.float64)])
+        else:
+            nmetrics = len(rows[0]) - 1
+            columns = list(zip(*rows))
+            dtype = [('m{}'.format(icol), _column_dtype(columns[icol])) for icol in range(nmetrics)]
+            dtype.append((SHARE_FIELD, _column_dtype(columns[-1])))
+            recs = np.array(rows, dtype = dtype)
+        int_mask = [[_is_int(val) for val in row] for row in rows]
+
+        return cls(mu_globals, offsets, recs, int_mask)
+
+    @classmethod
+    def load(cls, fname):
+        """
+        store saved by save, the metadata saved with it is returned as a dictionary of arrays
+        """
+        with np.load(fname, allow_pickle = False) as npz:
+            arrays = {key: npz[key] for key in npz.files}
+
+        store = cls(arrays.pop('mu_globals'), arrays.pop('offsets'), arrays.pop('recs'), arrays.pop('int_mask'))
+
+        return store, arrays
+
+    def save(self, fname, **metadata):
+        """
+        write store and any metadata arrays to a single .npz file
+        raises ValueError if the store holds non-numeric metrics, which cannot be saved without pickling
+        """
+        if any(self.recs.dtype[field] == object for field in self.recs.dtype.names):
+            raise ValueError('soil records with non-numeric metrics cannot be saved')
+
+        with open(fname, 'wb') as fnpz:
+            np.savez(fnpz, mu_globals = self.mu_globals, offsets = self.offsets, recs = self.recs,
+                                                                            int_mask = self.int_mask, **metadata)
+
+    def subset(self, mu_global_list):
+        """
+        store restricted to those mu_globals of mu_global_list which it holds, in the order of mu_global_list
+        """
+        indices = np.array([self._indices[mu_global] for mu_global in mu_global_list if mu_global in self._indices],
+                                                                                                dtype = np.int64)
+        nsoils = self.offsets[indices + 1] - self.offsets[indices]
+        rows = np.concatenate([np.arange(self.offsets[indx], self.offsets[indx + 1]) for indx in indices.tolist()]
+                                                                            + [np.zeros(0, dtype = np.int64)])
+        offsets = np.concatenate([[0], np.cumsum(nsoils, dtype = np.int64)])
+
+        return SoilRecStore(self.mu_globals[indices], offsets, self.recs[rows], self.int_mask[rows])
+
+    def merge(self, other):
+        """
+        store holding the mu_globals of both stores, those of other taking precedence
+        """
+        keep = [mu_global for mu_global in self if mu_global not in other]
+        if len(keep) == 0:
+            return other
+        elif len(other) == 0:
+            return self
+
+        mine = self.subset(keep)
+        dtype = _common_dtype(mine.recs, other.recs)
+        recs = np.concatenate([mine.recs.astype(dtype), other.recs.astype(dtype)])
+        offsets = np.concatenate([mine.offsets, other.offsets[1:] + mine.offsets[-1]])
+
+        int_mask = np.concatenate([mine.int_mask, other.int_mask])
+
+        return SoilRecStore(np.concatenate([mine.mu_globals, other.mu_globals]), offsets, recs, int_mask)
+
+    @property
+    def metric_fields(self):
+        return [field for field in self.recs.dtype.names if field != SHARE_FIELD]
+
+    @property
+    def nsoils(self):
+        return len(self.recs)
+
+    # dictionary interface
+    # ====================
+    def __len__(self):
+        return len(self.mu_globals)
+
+    def __contains__(self, mu_global):
+        return mu_global in self._indices
+
+    def __iter__(self):
+        return iter(self.mu_globals.tolist())
+
+    def keys(self):
+        return self.mu_globals.tolist()
+
+    def __getitem__(self, mu_global):
+        """
+        soils of a mu_global as a list of lists, as returned by get_soil_recs
+        """
+        indx = self._indices[mu_global]
+        strt, end = self.offsets[indx], self.offsets[indx + 1]
+
+        return [[int(val) if is_int else val for val, is_int in zip(soil, int_row)]
+                            for soil, int_row in zip(self.recs[strt:end].tolist(), self.int_mask[strt:end].tolist())]
+
+    def __setitem__(self, mu_global, soils):
+        """
+        soils of a mu_global as a list of lists, replacing those held, which keep their position, or appended
+        raises ValueError if the soils have different metrics from those held
+        """
+        if len(soils) == 0:
+            new = SoilRecStore([mu_global], [0, 0], self.recs[:0], self.int_mask[:0])
+        else:
+            new = SoilRecStore.from_soil_recs({mu_global: soils})
+
+        nsoils = np.diff(self.offsets)
+        if mu_global in self._indices:
+            indx = self._indices[mu_global]
+            mu_globals = self.mu_globals
+            nsoils[indx] = len(new.recs)
+        else:
+            indx = len(self.mu_globals)
+            mu_globals = np.append(self.mu_globals, mu_global)
+            nsoils = np.append(nsoils, len(new.recs))
+        strt, end = self.offsets[indx], self.offsets[min(indx + 1, len(self.offsets) - 1)]
+
+        if len(self.recs) == 0:
+            recs, int_mask = new.recs, new.int_mask     # a store with no soils takes the metrics of the new soils
+        else:
+            dtype = _common_dtype(self.recs, new.recs)
+            recs = np.concatenate([self.recs[:strt].astype(dtype), new.recs.astype(dtype),
+                                                                                    self.recs[end:].astype(dtype)])
+            int_mask = np.concatenate([self.int_mask[:strt], new.int_mask, self.int_mask[end:]])
+        offsets = np.concatenate([[0], np.cumsum(nsoils, dtype = np.int64)])
+
+        self.__init__(mu_globals, offsets, recs, int_mask)
+
+    def __delitem__(self, mu_global):
+
+        indx = self._indices[mu_global]
+        strt, end = self.offsets[indx], self.offsets[indx + 1]
+        nsoils = np.delete(np.diff(self.offsets), indx)
+        offsets = np.concatenate([[0], np.cumsum(nsoils, dtype = np.int64)])
+        rows = np.r_[0:strt, end:len(self.recs)]
+
+        self.__init__(np.delete(self.mu_globals, indx), offsets, self.recs[rows], self.int_mask[rows])
+
+    def pop(self, mu_global, *default):
+        """
+        remove and return the soils of a mu_global, or default if given and the mu_global is not held
+        """
+        if mu_global in self._indices:
+            soils = self[mu_global]
+            del self[mu_global]
+            return soils
+        elif len(default) > 0:
+            return default[0]
+        else:
+            raise KeyError(mu_global)
+
+    def get(self, mu_global, default = None):
+        if mu_global in self._indices:
+            return self[mu_global]
+        else:
+            return default
+
+    def values(self):
+        return [self[mu_global] for mu_global in self]
+
+    def items(self):
+        return [(mu_global, self[mu_global]) for mu_global in self]
+
+    def simplify(self, use_dom_soil_flag):
+        """
+        vectorised equivalent of compressing each group of soils:
+            soils of a mu_global are sorted and those with identical metrics are merged, summing their shares
+            where more than one soil remains and use_dom_soil_flag is set, the soil with the largest share, the first
+            in sorted order where shares are equal, is assigned a share of 100; otherwise the mu_global is dropped
+        mu_globals with no soils are dropped
+        returns simplified store, number of sub-soils before and after compression
+        """
+        ngrps = len(self.mu_globals)
+        nsoils_grp = np.diff(self.offsets)
+        num_raw = int(nsoils_grp.sum())
+        if num_raw == 0:
+            return SoilRecStore([], [0], self.recs[:0], self.int_mask[:0]), 0, 0
+
+        grp_ids = np.repeat(np.arange(ngrps), nsoils_grp)
+        metric_fields = self.metric_fields
+
+        # sort soils within each group by metrics then share, as for sorted() on lists of soils
+        # =====================================================================================
+        sort_keys = [self.recs[SHARE_FIELD]] + [self.recs[field] for field in reversed(metric_fields)] + [grp_ids]
+        order = np.lexsort(sort_keys)
+        srtd = self.recs[order]
+        srtd_mask = self.int_mask[order]
+        srtd_grps = grp_ids[order]
+
+        # a new soil starts wherever the group or any metric differs from the previous row
+        # ================================================================================
+        new_soil = np.ones(num_raw, dtype = bool)
+        same = srtd_grps[1:] == srtd_grps[:-1]
+        for field in metric_fields:
+            same &= srtd[field][1:] == srtd[field][:-1]
+        new_soil[1:] = ~same
+
+        starts = np.flatnonzero(new_soil)
+        lengths = np.diff(np.append(starts, num_raw))
+
+        # sum shares in sorted order so that results match sequential addition
+        # =====================================================================
+        shares = srtd[SHARE_FIELD][starts].copy()
+        for iadd in range(1, int(lengths.max())):
+            has_more = lengths > iadd
+            shares[has_more] = shares[has_more] + srtd[SHARE_FIELD][starts[has_more] + iadd]
+
+        cmprssd = srtd[starts]
+        cmprssd[SHARE_FIELD] = shares
+
+        # metrics take the types of the first soil of each run, a summed share is an integer if all its parts are
+        # =======================================================================================================
+        share_col = self.recs.dtype.names.index(SHARE_FIELD)
+        cmprssd_mask = srtd_mask[starts]
+        cmprssd_mask[:, share_col] = np.logical_and.reduceat(srtd_mask[:, share_col], starts)
+        cmprssd_grps = srtd_grps[starts]
+        nsoils_cmprssd = np.bincount(cmprssd_grps, minlength = ngrps)
+        num_compress = len(cmprssd)
+
+        # groups reduced to one soil are kept, multi soil groups reduce to the dominant soil or are dropped
+        # =================================================================================================
+        keep_rows = nsoils_cmprssd[cmprssd_grps] == 1
+
+        multi = nsoils_cmprssd > 1
+        if use_dom_soil_flag and multi.any():
+            grp_max = np.full(ngrps, shares.min(), dtype = shares.dtype)
+            np.maximum.at(grp_max, cmprssd_grps, shares)
+            max_rows = np.flatnonzero((shares == grp_max[cmprssd_grps]) & multi[cmprssd_grps])
+            dummy, first_indices = np.unique(cmprssd_grps[max_rows], return_index = True)
+            dom_rows = max_rows[first_indices]
+
+            cmprssd_mask = _share_as_float(cmprssd_mask, cmprssd, dom_rows)
+            cmprssd[SHARE_FIELD][dom_rows] = 100.0
+            keep_rows[dom_rows] = True
+
+        # rows remain in original mu_global order since the sort is by group first
+        # ========================================================================
+        new_grps = cmprssd_grps[keep_rows]
+        new_offsets = np.arange(len(new_grps) + 1)
+
+        return SoilRecStore(self.mu_globals[new_grps], new_offsets, cmprssd[keep_rows], cmprssd_mask[keep_rows]), \
+                                                                                            num_raw, num_compress
@@ -0,0 +1,122 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        stage_timer_fns.py
+# Purpose:     opt-in timing of the stages of each band
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   wall time and number of calls are accumulated for each stage of a band e.g. HWSD read, climate fetch,
+#   make_ecosse_file - timings of all bands are written to <study>_profile.json and <study>_profile.csv
+#   in the simulations directory when the study finishes
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'stage_timer_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import json
+from csv import writer as csv_writer
+from time import perf_counter, strftime
+from os.path import join
+
+STAGES = list(['hwsd_read', 'gen_grid_cells', 'climate_fetch', 'associate_climate', 'plant_inputs',
+                                            'make_ecosse_file', 'pack_output', 'place_met_files', 'band_total'])
+CSV_HDRS = list(['band', 'stage', 'secs', 'ncalls', 'secs_per_call'])
+
+class StageTimer(object):
+    """
+    timings for a single band: stage -> [seconds, number of calls]
+    when disabled start and stop do nothing so calls can remain in the main loop
+    """
+    def __init__(self, enabled):
+
+        self.enabled = enabled
+        self.recs = {}
+
+    def start(self):
+
+        if self.enabled:
+            return perf_counter()
+        else:
+            return 0.0
+
+    def stop(self, stage, start_time):
+
+        if self.enabled:
+            rec = self.recs.setdefault(stage, [0.0, 0])
+            rec[0] += perf_counter() - start_time
+            rec[1] += 1
+
+class RunProfile(object):
+    """
+    timings of all bands of a study, gathered in the main process
+    """
+    def __init__(self, enabled):
+
+        self.enabled = enabled
+        self.bands = {}
+
+    def add_band(self, num_band, recs):
+
+        if self.enabled and recs:
+            self.bands[num_band] = recs
+
+    def totals(self):
+        """
+        timings for each stage summed over all bands
+        """
+        totals = {}
+        for num_band in self.bands:
+            for stage, (secs, ncalls) in self.bands[num_band].items():
+                rec = totals.setdefault(stage, [0.0, 0])
+                rec[0] += secs
+                rec[1] += ncalls
+
+        return totals
+
+    def write_report(self, sims_dir, study):
+        """
+        write timings as JSON and CSV, returns name of JSON file or None if profiling is disabled
+        """
+        if not self.enabled:
+            return None
+
+        def _stage_dict(recs):
+            return {stage: {'secs': round(recs[stage][0], 6), 'ncalls': recs[stage][1]} for stage in recs}
+
+        totals = self.totals()
+        report = {'study': study, 'created': strftime('%Y-%m-%d %H:%M:%S'), 'totals': _stage_dict(totals),
+                  'bands': {str(num_band): _stage_dict(self.bands[num_band]) for num_band in sorted(self.bands)}}
+
+        json_fn = join(sims_dir, study + '_profile.json')
+        with open(json_fn, 'w') as fjson:
+            json.dump(report, fjson, indent=2)
+
+        rows = []
+        for num_band in sorted(self.bands):
+            rows += _csv_rows(num_band, self.bands[num_band])
+        rows += _csv_rows('all', totals)
+
+        with open(join(sims_dir, study + '_profile.csv'), 'w', newline='') as fcsv:
+            writer = csv_writer(fcsv)
+            writer.writerow(CSV_HDRS)
+            writer.writerows(rows)
+
+        print('Wrote timings of {} bands to {}'.format(len(self.bands), json_fn))
+
+        return json_fn
+
+def _csv_rows(band_id, recs):
+    """
+    one row per stage, in pipeline order
+    """
+    rows = []
+    for stage in STAGES + sorted(set(recs) - set(STAGES)):
+        if stage in recs:
+            secs, ncalls = recs[stage]
+            rows.append([band_id, stage, round(secs, 6), ncalls, round(secs/max(ncalls, 1), 6)])
+
+    return rows
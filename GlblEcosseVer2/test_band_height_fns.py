@@ -0,0 +1,62 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_band_height_fns.py
+# Purpose:     check the choice of band height against the target number of cells and memory limit
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_band_height_fns.py'
+__version__ = '0.0.1'
+
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('getClimGenFns')
+
+from band_height_fns import choose_lat_step, WARN_STR
+
+BBOX = [-4.0, 50.0, 2.0, 58.0]
+
+def _form(ncells, **sttngs):
+
+    run_sttngs = {'lat_step': 0, 'band_target_cells': 50000, 'band_max_mb': 2048, 'wthr_tile_max_mb': 0,
+                  'req_resol_upscale': 1, 'start_at_band': 1}
+    run_sttngs.update(sttngs)
+    hwsd_mu_globals = SimpleNamespace(data_frame = pd.DataFrame({'mu_global': range(ncells)}),
+                                      lat_ll_aoi = BBOX[1], lat_ur_aoi = BBOX[3])
+
+    return SimpleNamespace(sttngs = run_sttngs, hwsd_mu_globals = hwsd_mu_globals)
+
+def _climgen():
+
+    return SimpleNamespace(hist_start_year = 1961, sim_end_year = 2100)
+
+@pytest.mark.parametrize('ncells, expected', [(80000, 5.0), (800000, 0.5), (8000000, 0.0625), (800, 8.0)])
+def test_cells_target(ncells, expected):
+
+    lat_step, mess = choose_lat_step(_form(ncells), _climgen(), *BBOX)
+    assert lat_step == expected
+    assert WARN_STR not in mess
+
+def test_memory_limit():
+
+    lat_step, mess = choose_lat_step(_form(800, band_max_mb = 10), _climgen(), *BBOX)
+    assert lat_step < 8.0
+
+    tiled_step, mess = choose_lat_step(_form(800, band_max_mb = 10, wthr_tile_max_mb = 5), _climgen(), *BBOX)
+    assert tiled_step > lat_step
+
+def test_setting_overrides():
+
+    lat_step, mess = choose_lat_step(_form(800, lat_step = 0.25, start_at_band = 5), _climgen(), *BBOX)
+    assert lat_step == 0.25
+    assert WARN_STR not in mess
+
+def test_start_at_band_raises():
+
+    with pytest.raises(ValueError, match = 'start at band 3'):
+        choose_lat_step(_form(80000, start_at_band = 3), _climgen(), *BBOX)
@@ -0,0 +1,81 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_band_pool_fns.py
+# Purpose:     check that study files from bands run in a pool of processes match those of a serial run
+# Licence:     <your licence>
+# Description:
+#   bands are generated by a stand-in for _generate_ecosse_files which, like it, opens the study files when the
+#   first site is written - the first band has no sites so that two bands are run in the main process
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_band_pool_fns.py'
+__version__ = '0.0.1'
+
+from os.path import join
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('netCDF4')
+
+from band_pool_fns import run_bands_in_pool
+
+STUDY = 'pool_test'
+NCHANS = 2
+BANDS = [(num_band, [-4.0, 56.0 - 0.5*num_band, -1.0, 56.5 - 0.5*num_band]) for num_band in range(1, 7)]
+
+def _band_func(form, num_band, nsites):
+    """
+    stand-in for _generate_ecosse_files, returns the band number and bounding box seen by the band
+    """
+    if num_band == 1:
+        return num_band, form.sttngs['bbox']        # no sites in the first band
+
+    if form.fstudy == '':
+        form.fstudy = [open(join(form.sims_dir, STUDY + '_{}.txt'.format(ichan)), 'w') for ichan in range(NCHANS)]
+        for ichan, fobj in enumerate(form.fstudy):
+            fobj.write('header {}\n'.format(ichan))
+
+    for isite in range(nsites):
+        for ichan, fobj in enumerate(form.fstudy):
+            fobj.write('{}\t{}_{}\n'.format(ichan, num_band, isite))
+
+    return num_band, form.sttngs['bbox']
+
+def _run(sims_dir, num_procs):
+    """
+    returns contents of the study files and the bands reported as done
+    """
+    form = SimpleNamespace(fstudy = '', sims_dir = sims_dir, sttngs = {'bbox': None})
+    done = []
+    try:
+        if num_procs > 1:
+            run_bands_in_pool(form, BANDS, _band_func, {'nsites': 3}, num_procs,
+                                                                    lambda num_band, result: done.append(result))
+        else:
+            for num_band, bbox in BANDS:
+                form.sttngs['bbox'] = bbox
+                done.append(_band_func(form, num_band = num_band, nsites = 3))
+    finally:
+        for fobj in form.fstudy:
+            fobj.close()
+
+    contents = []
+    for ichan in range(NCHANS):
+        with open(join(sims_dir, STUDY + '_{}.txt'.format(ichan)), 'r') as fstudy:
+            contents.append(fstudy.read())
+
+    return contents, done
+
+def test_pool_matches_serial(tmp_path):
+
+    (tmp_path / 'serial').mkdir()
+    (tmp_path / 'pool').mkdir()
+    expected, expected_done = _run(str(tmp_path / 'serial'), 1)
+    assert expected[0].count('\n') == 1 + 3*(len(BANDS) - 1)
+
+    contents, done = _run(str(tmp_path / 'pool'), 2)
+    assert contents == expected
+    assert done == expected_done
@@ -0,0 +1,116 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_form_proxy_fns.py
+# Purpose:     check widget proxies, form snapshots and the detaching of NetCDF datasets passed to other processes
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_form_proxy_fns.py'
+__version__ = '0.0.1'
+
+import pickle
+from threading import Lock
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+netCDF4 = pytest.importorskip('netCDF4')
+
+from form_proxy_fns import (WdgtProxy, HeadlessForm, NcDsetPath, snapshot_form, detach_nc_dsets,
+                                                                                            reattach_nc_dsets)
+
+def test_combo_proxy():
+    """
+    unlike a QComboBox, setting an unknown item adds it
+    """
+    combo = WdgtProxy(items = ['CRU', 'EObs'], indx = 0)
+    assert combo.currentText() == 'CRU'
+
+    combo.setCurrentIndex(5)
+    assert combo.currentIndex() == 0
+
+    combo.setCurrentText('CHESS')
+    assert combo.currentText() == 'CHESS' and combo.count() == 3 and combo.findText('EObs') == 1
+
+    combo.clear()
+    assert combo.currentText() == '' and combo.currentIndex() == -1
+
+def test_check_box_proxy():
+
+    chck_box = WdgtProxy(text = 'use dominant soil')
+    chck_box.setCheckState(2)
+    assert chck_box.isChecked() and chck_box.checkState() == 2
+
+    chck_box.setChecked(0)
+    assert not chck_box.isChecked() and chck_box.checkState() == 0
+    assert chck_box.setToolTip('no-op') is None     # methods with no bearing on simulation files
+
+def test_headless_form_widgets():
+    """
+    widgets are created on first reference, other attributes are not
+    """
+    form = HeadlessForm(['cropland', 'grassland'])
+    form.w_study.setText('batch_study')
+    assert form.w_study.text() == 'batch_study'
+    assert sorted(form.w_hilda_lus) == ['cropland', 'grassland']
+
+    with pytest.raises(AttributeError):
+        form.sims_dir
+
+def test_headless_form_unset_widget(capsys):
+    """
+    a widget first referenced after the configuration file has been read is reported
+    """
+    form = HeadlessForm(['cropland'])
+    form.w_use_dom_soil.setChecked(True)
+    form.config_read()
+    assert form.w_use_dom_soil.isChecked()
+    assert capsys.readouterr().out == ''
+
+    assert not form.w_use_high_cover.isChecked()
+    assert 'w_use_high_cover' in capsys.readouterr().out
+
+def test_snapshot_form(tmp_path):
+    """
+    the snapshot can be pickled - open files are dropped and unpicklable attributes of objects are stripped
+    """
+    fobj = open(str(tmp_path / 'study.txt'), 'w')
+    try:
+        form = SimpleNamespace(sttngs = {'num_procs': 2}, fstudy = [fobj], w_study = WdgtProxy(text = 'study'),
+                        hwsd_mu_globals = SimpleNamespace(mu_global_list = [10001, 10002], lock = Lock()))
+        form_proxy = snapshot_form(form)
+    finally:
+        fobj.close()
+
+    form_proxy = pickle.loads(pickle.dumps(form_proxy))
+    assert form_proxy.sttngs == {'num_procs': 2}
+    assert not hasattr(form_proxy, 'fstudy')
+    assert form_proxy.w_study.text() == 'study'
+    assert form_proxy.hwsd_mu_globals.mu_global_list == [10001, 10002]
+    assert not hasattr(form_proxy.hwsd_mu_globals, 'lock')
+
+def test_detach_reattach_nc_dsets(tmp_path):
+
+    nc_fname = str(tmp_path / 'mask.nc')
+    with netCDF4.Dataset(nc_fname, 'w') as nc_dset:
+        nc_dset.createDimension('lat', 3)
+        nc_dset.createVariable('lat', 'f4', ('lat',))[:] = np.array([50.25, 50.75, 51.25])
+
+    mask_defn = SimpleNamespace(nc_fname = nc_fname, nc_dset = netCDF4.Dataset(nc_fname, 'r'))
+    try:
+        detached = detach_nc_dsets(mask_defn)
+        assert isinstance(detached.nc_dset, NcDsetPath) and detached.nc_dset.nc_fname == nc_fname
+        assert isinstance(mask_defn.nc_dset, netCDF4.Dataset)
+
+        detached = pickle.loads(pickle.dumps(detached))
+        reattach_nc_dsets(detached)
+        assert np.array_equal(detached.nc_dset.variables['lat'][:], mask_defn.nc_dset.variables['lat'][:])
+        detached.nc_dset.close()
+    finally:
+        mask_defn.nc_dset.close()
+
+    assert detach_nc_dsets(None) is None
+    assert detach_nc_dsets(mask_defn).nc_dset is None     # closed datasets are not reopened
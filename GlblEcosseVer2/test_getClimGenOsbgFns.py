@@ -0,0 +1,114 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_getClimGenOsbgFns.py
+# Purpose:     check that met files written by _make_met_files_osgb match those written before it was vectorised
+#              and the size of the hyperslabs read by add_data_to_grid_cells
+# Licence:     <your licence>
+# Description:
+#   temperatures are chosen so that some fall halfway between hundredths in degrees Celsius, for which np.round and
+#   Python round can differ
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_getClimGenOsbgFns.py'
+__version__ = '0.0.1'
+
+from calendar import monthrange
+from csv import writer as csv_writer
+from os.path import join
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip('cvrtcoord')
+pytest.importorskip('thornthwaite')
+
+import getClimGenOsbgFns
+from getClimGenOsbgFns import _make_met_files_osgb, _chunk_grid_refs, _wthr_tsteps, MNTHS_YR, numSecsDay
+
+STRT_YEAR = 1991    # includes a leap year
+NYEARS = 3
+
+def _baseline_met_files(clim_dir, pettmp_grid_cell):
+    """
+    met files as written one year at a time before vectorising, with PET supplied
+    """
+    pettmp_precip = pettmp_grid_cell['precip']
+    pettmp_tas = [val - 273.15 for val in pettmp_grid_cell['tas']]
+
+    for iyr, year in enumerate(range(STRT_YEAR, STRT_YEAR + NYEARS)):
+        indx1 = iyr*MNTHS_YR
+        indx2 = indx1 + MNTHS_YR
+        temp_mean = pettmp_tas[indx1:indx2]
+        pet = pettmp_grid_cell['pet'][indx1:indx2]
+        precips = [precip * numSecsDay * monthrange(year, imnth + 1)[1]
+                                                        for imnth, precip in enumerate(pettmp_precip[indx1:indx2])]
+
+        pot_evapotrans = [round(p, 2) for p in pet]
+        precip_out     = [round(p, 2) for p in precips]
+        tmean_out      = [round(t, 2) for t in temp_mean]
+
+        output = []
+        for tstep, mean_temp in enumerate(tmean_out):
+            output.append([tstep+1, precip_out[tstep], pot_evapotrans[tstep], mean_temp])
+
+        with open(join(clim_dir, 'met{}s.txt'.format(year)), 'w', newline='') as fpout:
+            writer = csv_writer(fpout, delimiter='\t')
+            writer.writerows(output)
+
+def _read_met_files(clim_dir):
+
+    contents = []
+    for year in range(STRT_YEAR, STRT_YEAR + NYEARS):
+        with open(join(clim_dir, 'met{}s.txt'.format(year)), 'r', newline='') as fmet:
+            contents.append(fmet.read())
+
+    return contents
+
+def test_matches_baseline_rounding(tmp_path):
+
+    nmnths = MNTHS_YR*NYEARS
+    rng = np.random.default_rng(42)
+    tas = [293.835 + 0.13*imnth for imnth in range(nmnths)]     # halfway between hundredths in Celsius
+    temps = [val - 273.15 for val in tas]
+    assert any(float(np.round(temp, 2)) != round(temp, 2) for temp in temps)
+
+    pettmp_grid_cell = {'tas': tas, 'precip': rng.uniform(0.0, 1.0e-4, nmnths).tolist(),
+                                                                    'pet': rng.uniform(0.0, 120.0, nmnths).tolist()}
+    climgen = SimpleNamespace(mnthly_flag = True, max_num_years = NYEARS, hist_start_year = STRT_YEAR)
+
+    (tmp_path / 'baseline').mkdir()
+    _baseline_met_files(str(tmp_path / 'baseline'), pettmp_grid_cell)
+
+    met_fnames = _make_met_files_osgb(str(tmp_path / 'cell'), 52.5, climgen, pettmp_grid_cell)
+    assert met_fnames == ['met{}s.txt'.format(year) for year in range(STRT_YEAR, STRT_YEAR + NYEARS)]
+    assert _read_met_files(str(tmp_path / 'cell')) == _read_met_files(str(tmp_path / 'baseline'))
+
+def test_wthr_tsteps():
+    """
+    last month of the historic data is discarded as are future months before fut_strt_indx
+    """
+    climgen = SimpleNamespace(hist_precip_dset = {'precip': np.zeros((25*MNTHS_YR + 1, 2, 2))},
+                              fut_precip_dset = {'pr': np.zeros((60*MNTHS_YR, 2, 2))}, fut_strt_indx = 5*MNTHS_YR)
+    hist_tsteps = len(range(25*MNTHS_YR + 1)[slice(None, -1)])
+    fut_tsteps = len(range(60*MNTHS_YR)[slice(5*MNTHS_YR, None)])
+
+    assert _wthr_tsteps(climgen) == hist_tsteps + fut_tsteps == 80*MNTHS_YR
+
+def test_chunk_byte_cap(monkeypatch):
+    """
+    hyperslab enclosing each group of grid cells is within SLAB_MAX_BYTES for the item size of the variable
+    """
+    monkeypatch.setattr(getClimGenOsbgFns, 'SLAB_MAX_BYTES', MNTHS_YR*8*30)
+    grid_cells = {'{}_{}'.format(nrth, east): SimpleNamespace(indx_nrth = nrth, indx_east = east)
+                                                                        for nrth in range(20) for east in range(10)}
+    for itemsize, max_cells in ((4, 60), (8, 30)):
+        chunks = _chunk_grid_refs(grid_cells, list(grid_cells.keys()), MNTHS_YR, itemsize)
+        assert len(chunks) > 200//max_cells
+        assert sorted(ref for chunk in chunks for ref in chunk) == sorted(grid_cells.keys())
+        for chunk in chunks:
+            nrths = [grid_cells[ref].indx_nrth for ref in chunk]
+            easts = [grid_cells[ref].indx_east for ref in chunk]
+            assert (max(nrths) - min(nrths) + 1)*(max(easts) - min(easts) + 1) <= max_cells
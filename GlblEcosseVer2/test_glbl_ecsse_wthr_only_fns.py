@@ -0,0 +1,207 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_glbl_ecsse_wthr_only_fns.py
+# Purpose:     check that weather written block by block in npy format matches that written as text and that
+#              weather written in chunks matches that written at once
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_glbl_ecsse_wthr_only_fns.py'
+__version__ = '0.0.1'
+
+import csv
+import json
+from logging import getLogger
+from os.path import join
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('getClimGenNC')
+pytest.importorskip('hwsd_bil')
+
+import glbl_ecsse_wthr_only_fns
+from glbl_ecsse_wthr_only_fns import WthrCsvOutputs, read_wthr_npy, _write_weather_bulk
+
+STUDY = 'wthr_npy'
+STRT_YEAR, END_YEAR = 2001, 2003
+FUT_STRT_YEAR = 2000
+GRANULARITY = 120
+
+def _blocks(nblocks, ncells, seed):
+    """
+    site records and variables for each block
+    """
+    rng = np.random.default_rng(seed)
+    nmnths = 12*(END_YEAR - STRT_YEAR + 1)
+    blocks = []
+    for iblock in range(nblocks):
+        site_recs = [(round(55.0 - 0.01*icell, 5), round(-3.0 + 0.01*iblock, 5), 10000 + icell, 4200 + icell,
+                                                                            22000 + iblock) for icell in range(ncells)]
+        vals_vars = {'precip': np.round(rng.gamma(2.0, 30.0, (ncells, nmnths)), 1),
+                     'tair': np.round(8.0 + 6.0*rng.standard_normal((ncells, nmnths)), 1)}
+        blocks.append((site_recs, vals_vars))
+
+    return blocks
+
+def _form(sims_dir):
+
+    return SimpleNamespace(lgr = getLogger(__prog__), sims_dir = sims_dir,
+                                                                    w_study = SimpleNamespace(text = lambda: STUDY))
+
+def _write(sims_dir, output_fmt, blocks):
+
+    form = _form(sims_dir)
+    climgen = SimpleNamespace(sim_start_year = STRT_YEAR, sim_end_year = END_YEAR)
+    wthr_csv = WthrCsvOutputs(form, climgen, output_fmt)
+    wthr_csv.create_results_files(sum(len(site_recs) for site_recs, vals_vars in blocks))
+    for site_recs, vals_vars in blocks:
+        wthr_csv.write_block(site_recs, vals_vars)
+    wthr_csv.close()
+
+    return wthr_csv
+
+def test_npy_matches_txt(tmp_path):
+
+    blocks = _blocks(3, 7, 11)
+    (tmp_path / 'txt').mkdir()
+    (tmp_path / 'npy').mkdir()
+    _write(str(tmp_path / 'txt'), 'txt', blocks)
+    wthr_csv = _write(str(tmp_path / 'npy'), 'npy', blocks)
+    assert wthr_csv.npy_maps == {}
+
+    with open(join(str(tmp_path / 'npy'), STUDY + '_wthr_npy.json'), 'r') as fhdr:
+        hdr = json.load(fhdr)
+    assert hdr['ncells'] == 21
+
+    for varname in ['precip', 'tair']:
+        with open(join(str(tmp_path / 'txt'), STUDY + '_{}.txt'.format(varname)), 'r', newline='') as ftxt:
+            rows = list(csv.reader(ftxt, delimiter='\t'))
+        assert rows[0][5:] == hdr['months']
+
+        cells, vals = read_wthr_npy(str(tmp_path / 'npy'), STUDY, varname)
+        assert vals.dtype == np.float32 and vals.shape == (21, len(hdr['months']))
+        for row, cell, cell_vals in zip(rows[1:], cells.tolist(), vals):
+            assert [float(val) for val in row[:2]] + [int(val) for val in row[2:5]] == list(cell)
+            assert np.array_equal(np.array(row[5:], dtype = np.float32), cell_vals)
+
+def test_npy_too_many_cells(tmp_path):
+
+    blocks = _blocks(2, 3, 5)
+    climgen = SimpleNamespace(sim_start_year = STRT_YEAR, sim_end_year = END_YEAR)
+    wthr_csv = WthrCsvOutputs(_form(str(tmp_path)), climgen, 'npy')
+    wthr_csv.create_results_files(4)
+    wthr_csv.write_block(*blocks[0])
+    with pytest.raises(ValueError):
+        wthr_csv.write_block(*blocks[1])
+    wthr_csv.close()
+
+def _gran_key(lat, lon):
+
+    return '{:0>5}_{:0>5}'.format(int(round((90.0 - lat)*GRANULARITY)), int(round((180.0 + lon)*GRANULARITY)))
+
+def _bulk_inputs(ncells, seed):
+    """
+    HWSD cells within half degree weather cells, one of which has no historic weather
+    """
+    rng = np.random.default_rng(seed)
+    nmnths = 12*(END_YEAR - FUT_STRT_YEAR + 1)
+    pettmp_hist = {'precipitation': {}, 'temperature': {}}
+    pettmp_fut = {'precipitation': {}, 'temperature': {}}
+    for wthr_lat in [55.25, 55.75]:
+        for wthr_lon in [-3.75, -3.25, -2.75, -2.25]:
+            key = _gran_key(wthr_lat, wthr_lon)
+            for pettmp in pettmp_hist, pettmp_fut:
+                pettmp['precipitation'][key] = np.round(rng.gamma(2.0, 30.0, nmnths), 1).tolist()
+                pettmp['temperature'][key] = np.round(8.0 + 6.0*rng.standard_normal(nmnths), 1).tolist()
+    for metric in pettmp_hist:
+        pettmp_hist[metric][_gran_key(55.25, -2.25)] = []
+
+    gran_lats = 4080 + rng.integers(0, GRANULARITY, ncells)       # 56 to 55 degrees
+    gran_lons = 21120 + rng.integers(0, 2*GRANULARITY, ncells)    # -4 to -2 degrees
+    data_frame = pd.DataFrame({'gran_lat': gran_lats, 'gran_lon': gran_lons,
+                               'mu_global': 10000 + rng.integers(0, 50, ncells),
+                               'latitude': 90.0 - (gran_lats + 0.5)/GRANULARITY,
+                               'longitude': (gran_lons + 0.5)/GRANULARITY - 180.0})
+
+    return data_frame, pettmp_hist, pettmp_fut
+
+def _write_bulk(sims_dir, output_fmt, bulk_inputs):
+    """
+    returns counts from _write_weather_bulk and the number of blocks written
+    """
+    data_frame, pettmp_hist, pettmp_fut = bulk_inputs
+    form = _form(sims_dir)
+    form.hwsd_mu_globals = SimpleNamespace(data_frame = data_frame)
+    form.weather_sets = {'ClimGen_A1B': {'year_start': FUT_STRT_YEAR}}
+    climgen = SimpleNamespace(sim_start_year = STRT_YEAR, sim_end_year = END_YEAR)
+
+    wthr_csv = WthrCsvOutputs(form, climgen, output_fmt)
+    nblocks = [0]
+    write_block = wthr_csv.write_block
+
+    def _count_blocks(site_recs, vals_vars):
+        nblocks[0] += 1
+        write_block(site_recs, vals_vars)
+
+    wthr_csv.write_block = _count_blocks
+    counts = _write_weather_bulk(form, climgen, wthr_csv, pettmp_hist, pettmp_fut)
+    wthr_csv.close()
+
+    return counts, nblocks[0]
+
+def _read_txt(sims_dir):
+
+    contents = []
+    for varname in ['precip', 'tair']:
+        with open(join(sims_dir, STUDY + '_{}.txt'.format(varname)), 'r', newline='') as ftxt:
+            contents.append(ftxt.read())
+
+    return contents
+
+def test_chunked_txt_matches_single_block(tmp_path, monkeypatch):
+
+    bulk_inputs = _bulk_inputs(50, 3)
+    (tmp_path / 'single').mkdir()
+    (tmp_path / 'chunked').mkdir()
+
+    counts, nblocks = _write_bulk(str(tmp_path / 'single'), 'txt', bulk_inputs)
+    assert nblocks == 1 and counts[1] > 0 and counts[0] + counts[1] == 50
+
+    monkeypatch.setattr(glbl_ecsse_wthr_only_fns, 'WRITE_CHUNK', 7)
+    assert _write_bulk(str(tmp_path / 'chunked'), 'txt', bulk_inputs) == (counts, -(-counts[0] // 7))
+
+    expected = _read_txt(str(tmp_path / 'single'))
+    assert expected[0].count('\n') == 1 + counts[0]
+    assert _read_txt(str(tmp_path / 'chunked')) == expected
+
+def _read_npy(sims_dir):
+
+    contents = []
+    for varname in ['precip', 'tair']:
+        cells, vals = read_wthr_npy(sims_dir, STUDY, varname)
+        contents.append((cells.tolist(), np.array(vals)))
+
+    return contents
+
+def test_chunked_npy_matches_single_block(tmp_path, monkeypatch):
+
+    bulk_inputs = _bulk_inputs(50, 4)
+    (tmp_path / 'single').mkdir()
+    (tmp_path / 'chunked').mkdir()
+
+    counts, nblocks = _write_bulk(str(tmp_path / 'single'), 'npy', bulk_inputs)
+    assert nblocks == 1
+
+    monkeypatch.setattr(glbl_ecsse_wthr_only_fns, 'WRITE_CHUNK', 6)
+    assert _write_bulk(str(tmp_path / 'chunked'), 'npy', bulk_inputs) == (counts, -(-counts[0] // 6))
+
+    expected = _read_npy(str(tmp_path / 'single'))
+    assert len(expected[0][0]) == counts[0]
+    for (cells, vals), (expected_cells, expected_vals) in zip(_read_npy(str(tmp_path / 'chunked')), expected):
+        assert cells == expected_cells
+        assert vals.dtype == np.float32 and np.array_equal(vals, expected_vals)
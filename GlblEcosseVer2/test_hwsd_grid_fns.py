@@ -0,0 +1,143 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_hwsd_grid_fns.py
+# Purpose:     check the mu_globals and bounds given to bands by HwsdBand against HWSD_bil and a direct read
+# Licence:     <your licence>
+# Description:
+#   a synthetic HWSD raster of 2 by 3 degrees at 30 arc seconds is written with its header to a temporary directory
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_hwsd_grid_fns.py'
+__version__ = '0.0.1'
+
+import logging
+from os.path import join
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+hwsd_bil = pytest.importorskip('hwsd_bil')
+
+from hwsd_grid_fns import HwsdStudyGrid, create_study_grid
+
+RESOL = 1/120
+NROWS, NCOLS = 240, 360
+LAT_UR, LON_LL = 53.0, -1.0
+STUDY_BBOX = [-0.9, 51.2, 1.9, 52.95]
+BBOXES = [[-0.9, 52.5, 1.9, 52.95],                 # band at the top of the study
+          [-0.5, 51.75, 1.25, 52.0],                # edges on cell boundaries
+          [0.0 + RESOL/4, 51.2, 0.3, 51.5 - RESOL/3],
+          [-1.5, 51.0, 0.2, 51.4]]                  # extends beyond raster and study
+
+def _write_raster(hwsd_dir):
+
+    raster = (np.arange(NROWS*NCOLS, dtype = np.uint32) % 977 + 1000).astype(np.uint16).reshape(NROWS, NCOLS)
+    raster[::7, ::5] = 0
+    raster.tofile(str(hwsd_dir / 'hwsd.bil'))
+    with open(str(hwsd_dir / 'hwsd.hdr'), 'w') as fhdr:
+        fhdr.write('BYTEORDER I\nLAYOUT BIL\nNROWS {}\nNCOLS {}\nNBANDS 1\nNBITS 16\n'.format(NROWS, NCOLS))
+        fhdr.write('ULXMAP {}\nULYMAP {}\nXDIM {}\nYDIM {}\n'.format(LON_LL + RESOL/2, LAT_UR - RESOL/2, RESOL, RESOL))
+
+    return raster
+
+def _direct(raster, bbox):
+    """
+    cells of the raster whose centres lie within bbox
+    """
+    lon_ll, lat_ll, lon_ur, lat_ur = bbox
+    lats = LAT_UR - RESOL/2 - RESOL*np.arange(NROWS)
+    lons = LON_LL + RESOL/2 + RESOL*np.arange(NCOLS)
+    rows = np.flatnonzero((lats >= lat_ll - 1.0e-9) & (lats <= lat_ur + 1.0e-9))
+    cols = np.flatnonzero((lons >= lon_ll - 1.0e-9) & (lons <= lon_ur + 1.0e-9))
+
+    return raster[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1], lats[rows[0]] + RESOL/2, lons[cols[0]] - RESOL/2
+
+@pytest.fixture
+def study_grid(tmp_path):
+
+    raster = _write_raster(tmp_path)
+    return HwsdStudyGrid(logging.getLogger(__prog__), str(tmp_path), STUDY_BBOX), raster
+
+@pytest.mark.parametrize('bbox', BBOXES)
+@pytest.mark.parametrize('mu_global_list', [None, [1000, 1500, 1976]])
+def test_matches_direct_read(study_grid, bbox, mu_global_list):
+
+    grid, raster = study_grid
+    band_hwsd = grid.band_hwsd()
+    nvals = band_hwsd.read_bbox_hwsd_mu_globals(bbox, SimpleNamespace(mu_global_list = mu_global_list), 1)
+
+    study_window, dummy, dummy = _direct(raster, STUDY_BBOX)
+    expected, lat_ur, lon_ll = _direct(raster, [max(bbox[0], STUDY_BBOX[0]), max(bbox[1], STUDY_BBOX[1]),
+                                                min(bbox[2], STUDY_BBOX[2]), min(bbox[3], STUDY_BBOX[3])])
+    if mu_global_list is not None:
+        expected = np.where(np.isin(expected, mu_global_list), expected, 0)
+
+    assert nvals == expected.size
+    assert np.array_equal(band_hwsd.data, expected)
+    assert (band_hwsd.nlats, band_hwsd.nlons) == expected.shape
+    assert band_hwsd.lat_ur == pytest.approx(lat_ur) and band_hwsd.lon_ll == pytest.approx(lon_ll)
+    assert band_hwsd.lat_ll == pytest.approx(lat_ur - expected.shape[0]*RESOL)
+    assert band_hwsd.lon_ur == pytest.approx(lon_ll + expected.shape[1]*RESOL)
+
+@pytest.mark.parametrize('mu_global_list', [None, [1000, 1500, 1976]])
+def test_data_writable(study_grid, mu_global_list):
+    """
+    functions which modify the grid of mu_globals of HWSD_bil may do so for HwsdBand, the raster is unchanged
+    """
+    grid, raster = study_grid
+    band_hwsd = grid.band_hwsd()
+    band_hwsd.read_bbox_hwsd_mu_globals(BBOXES[0], SimpleNamespace(mu_global_list = mu_global_list), 1)
+
+    assert isinstance(band_hwsd.data, np.memmap)     # no copy of the window is made
+    band_hwsd.data[:] = 0
+
+    assert grid.grid.any()
+    band_hwsd.read_bbox_hwsd_mu_globals(BBOXES[0], SimpleNamespace(mu_global_list = None), 1)
+    assert band_hwsd.data.any()
+    assert np.array_equal(np.fromfile(join(grid.hwsd_dir, 'hwsd.bil'), dtype = np.uint16).reshape(NROWS, NCOLS), raster)
+
+@pytest.mark.parametrize('bbox', BBOXES[:3])
+@pytest.mark.parametrize('mu_global_list', [None, [1000, 1500, 1976]])
+def test_matches_hwsd_bil(study_grid, tmp_path, bbox, mu_global_list):
+
+    """
+    grid, bounds and mu_global counts of HwsdBand are those of HWSD_bil reading the same raster
+    """
+    if not hasattr(hwsd_bil.HWSD_bil, 'read_bbox_hwsd_mu_globals'):
+        pytest.skip('hwsd_bil is a stand-in')
+
+    grid, raster = study_grid
+    hwsd_mu_globals = SimpleNamespace(mu_global_list = mu_global_list)
+    band_hwsd = grid.band_hwsd()
+    nvals = band_hwsd.read_bbox_hwsd_mu_globals(bbox, hwsd_mu_globals, 1)
+
+    hwsd = hwsd_bil.HWSD_bil(logging.getLogger(__prog__), str(tmp_path))
+    assert hwsd.read_bbox_hwsd_mu_globals(bbox, hwsd_mu_globals, 1) == nvals
+
+    assert np.array_equal(band_hwsd.data, hwsd.data)
+    assert (band_hwsd.nlats, band_hwsd.nlons) == (hwsd.nlats, hwsd.nlons)
+    for attr in ('lat_ll', 'lat_ur', 'lon_ll', 'lon_ur'):
+        assert getattr(band_hwsd, attr) == pytest.approx(getattr(hwsd, attr))
+
+    assert band_hwsd.get_mu_globals_dict() == hwsd.get_mu_globals_dict()
+
+def test_fallback_warnings_logged(tmp_path, caplog):
+    """
+    warnings that bands will read the raster themselves reach the log file as well as the console
+    """
+    form = SimpleNamespace(hwsd_dir = str(tmp_path), lgr = logging.getLogger(__prog__))
+    with caplog.at_level(logging.WARNING, logger = __prog__):
+        assert create_study_grid(form, STUDY_BBOX) is None
+
+    _write_raster(tmp_path)
+    with open(str(tmp_path / 'hwsd.hdr'), 'w') as fhdr:
+        fhdr.write('NROWS {}\n'.format(NROWS))         # incomplete header
+    with caplog.at_level(logging.WARNING, logger = __prog__):
+        assert create_study_grid(form, STUDY_BBOX) is None
+
+    mess = [rec.getMessage() for rec in caplog.records if rec.levelno == logging.WARNING]
+    assert len(mess) == 2
+    assert 'not found' in mess[0] and 'could not read' in mess[1]
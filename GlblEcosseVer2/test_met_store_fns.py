@@ -0,0 +1,168 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_met_store_fns.py
+# Purpose:     check that only met files of the sites of a study are linked to its store and that staged met files
+#              whose content is stored are linked rather than written
+# Licence:     <your licence>
+# Description:
+#   the simulations directory holds two studies with identical met files alongside a shared weather directory,
+#   which is rewritten in place, and the bookkeeping files of a study
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_met_store_fns.py'
+__version__ = '0.0.1'
+
+from os import makedirs, stat
+from os.path import join, isdir
+
+import met_store_fns
+from met_store_fns import BandMetStore, dedupe_met_files, release_met_files
+
+MET_TEXT = '1\t2.50\t3.10\t4.00\n'
+
+def _write(path, text):
+
+    with open(path, 'w') as fobj:
+        fobj.write(text)
+
+def _make_sims_dir(sims_dir):
+    """
+    returns paths of met files keyed by owner
+    """
+    paths = {'study_a': [], 'study_b': [], 'chess': [], 'other': []}
+    for study in ('study_a', 'study_b'):
+        for site in ('lat00300_lon04230_mu01234_s01', 'lat00300_lon04231_mu01234_s01', 'lat00301_lon04230_mu05678_s02'):
+            site_dir = join(sims_dir, study, site)
+            makedirs(site_dir)
+            for year in (2001, 2002):
+                met_fn = join(site_dir, 'met{}s.txt'.format(year))
+                _write(met_fn, MET_TEXT + str(year))
+                paths[study].append(met_fn)
+            _write(join(site_dir, 'management.txt'), 'identical\n')
+
+    chess_dir = join(sims_dir, 'CHESS', 'SU123456')
+    makedirs(chess_dir)
+    for year in (2001, 2002):
+        met_fn = join(chess_dir, 'met{}s.txt'.format(year))
+        _write(met_fn, MET_TEXT + str(year))
+        paths['chess'].append(met_fn)
+
+    # bookkeeping of study_a sits beside its site directory
+    # =====================================================
+    makedirs(join(sims_dir, 'study_a_staging'))
+    met_fn = join(sims_dir, 'study_a_staging', 'met2001s.txt')
+    _write(met_fn, MET_TEXT + '2001')
+    paths['other'].append(met_fn)
+
+    return paths
+
+def _read(path):
+
+    with open(path, 'r') as fobj:
+        return fobj.read()
+
+def test_dedupe_only_study_sites(tmp_path):
+
+    sims_dir = str(tmp_path)
+    paths = _make_sims_dir(sims_dir)
+
+    nfiles, nlinked, nbytes_saved = dedupe_met_files(sims_dir, 'study_a')
+    assert (nfiles, nlinked) == (6, 4)
+    assert nbytes_saved == 4*len(MET_TEXT + '2001')
+
+    for path in paths['study_a']:
+        assert stat(path).st_nlink == 4     # three sites plus the store
+    for path in paths['study_b'] + paths['chess'] + paths['other']:
+        assert stat(path).st_nlink == 1
+
+    # rewriting a shared weather file in place does not alter the sites of the study
+    # ==============================================================================
+    _write(paths['chess'][0], 'rewritten\n')
+    assert all(_read(path) == MET_TEXT + '2001' for path in paths['study_a'][::2])
+
+    # a second pass finds every file already linked
+    # =============================================
+    assert dedupe_met_files(sims_dir, 'study_a')[:2] == (6, 0)
+
+def test_release_before_rerun(tmp_path):
+
+    sims_dir = str(tmp_path)
+    paths = _make_sims_dir(sims_dir)
+    dedupe_met_files(sims_dir, 'study_a')
+    dedupe_met_files(sims_dir, 'study_b')
+
+    assert release_met_files(sims_dir, 'study_a') == 6
+    for path in paths['study_a']:
+        assert stat(path).st_nlink == 1
+    for path in paths['study_b']:
+        assert stat(path).st_nlink == 4
+
+    # a site of the rerun study may now be rewritten in place
+    # ========================================================
+    _write(paths['study_a'][0], 'rewritten\n')
+    assert _read(paths['study_a'][2]) == MET_TEXT + '2001'
+    assert _read(paths['study_b'][0]) == MET_TEXT + '2001'
+
+def test_no_study_sites(tmp_path):
+
+    sims_dir = str(tmp_path)
+    paths = _make_sims_dir(sims_dir)
+
+    assert dedupe_met_files(sims_dir, 'study_c') == (0, 0, 0)
+    assert release_met_files(sims_dir, 'study_c') == 0
+    assert all(stat(path).st_nlink == 1 for owner in paths for path in paths[owner])
+
+def _stage_band(met_store, study, irow):
+    """
+    sites of one band as written by make_ecosse_file to the staging directory, the first two share a weather cell
+    returns expected contents of the site files keyed by path relative to the simulations directory
+    """
+    expected = {}
+    for icol, wthr_cell in ((0, 'A'), (1, 'A'), (2, 'B')):
+        site = 'lat{:0>5}_lon{:0>5}_mu01234_s01'.format(300 + irow, 4230 + icol)
+        site_dir = join(met_store.site_sims_dir(), study, site)
+        makedirs(site_dir)
+        for fname, text in (('met2001s.txt', MET_TEXT + wthr_cell), ('met2002s.txt', MET_TEXT + wthr_cell + '2'),
+                                                                            ('management.txt', 'site ' + site)):
+            _write(join(site_dir, fname), text)
+            expected[join(study, site, fname)] = text
+
+    return expected
+
+def test_staged_duplicates_linked(tmp_path, monkeypatch):
+    """
+    met files of the second site of a weather cell, and of cells seen in an earlier band, are never written to the
+    simulations directory
+    """
+    sims_dir = str(tmp_path / 'sims')
+    makedirs(sims_dir)
+    nwritten = []
+    place_file = met_store_fns._place_file
+    monkeypatch.setattr(met_store_fns, '_place_file', lambda path, dest_fn: nwritten.append(dest_fn) or
+                                                                                    place_file(path, dest_fn))
+    expected = {}
+    for num_band, irow in ((1, 0), (2, 1)):
+        met_store = BandMetStore(sims_dir, 'study_a', num_band, True, str(tmp_path / 'local'))
+        expected.update(_stage_band(met_store, 'study_a', irow))
+        study_lines = met_store.cnvrt_study_lines([join(met_store.site_sims_dir(), 'study_a', 'site') + '\n'])
+        assert study_lines == [join(sims_dir, 'study_a', 'site') + '\n']
+
+        nfiles, nlinked, nbytes_saved = met_store.place()
+        assert (nfiles, nlinked) == ((6, 2) if num_band == 1 else (6, 6))
+        assert not isdir(met_store.staging_dir)
+
+    for rel_path, text in expected.items():
+        assert _read(join(sims_dir, rel_path)) == text
+
+    met_fns = [fn for fn in expected if 'met' in fn]
+    assert len([fn for fn in nwritten if 'met' in fn]) == 4     # two weather cells of two years
+    assert sorted(stat(join(sims_dir, fn)).st_nlink for fn in met_fns) == 4*[3] + 8*[5]   # sites plus the store
+
+def test_disabled_store_uses_sims_dir(tmp_path):
+
+    met_store = BandMetStore(str(tmp_path), 'study_a', 1, False)
+    assert met_store.site_sims_dir() == str(tmp_path)
+    assert met_store.place() == (0, 0, 0)
+    assert met_store.cnvrt_study_lines(['a\n']) == ['a\n']
@@ -0,0 +1,79 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_nc_slab_fns.py
+# Purpose:     check that reads served from a SlabDataset match those of the dataset and that the slab is limited to
+#              the band
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_nc_slab_fns.py'
+__version__ = '0.0.1'
+
+import numpy as np
+import pytest
+
+netCDF4 = pytest.importorskip('netCDF4')
+
+from nc_slab_fns import SlabDataset, open_band_dataset
+
+BBOX = [-3.2, 54.1, -1.4, 54.6]       # lon_ll, lat_ll, lon_ur, lat_ur
+
+def _write_dset(nc_fname):
+    """
+    half degree grid with latitudes descending, a variable with a time dimension and one without
+    """
+    lats = np.arange(59.75, 49.0, -0.5)
+    lons = np.arange(-7.75, 2.0, 0.5)
+    with netCDF4.Dataset(nc_fname, 'w') as nc_dset:
+        nc_dset.createDimension('time', 3)
+        nc_dset.createDimension('lat', len(lats))
+        nc_dset.createDimension('lon', len(lons))
+        nc_dset.createVariable('lat', 'f4', ('lat',))[:] = lats
+        nc_dset.createVariable('lon', 'f4', ('lon',))[:] = lons
+        nc_dset.createVariable('yield', 'f4', ('time', 'lat', 'lon'))[:] = \
+                                                    np.arange(3*len(lats)*len(lons)).reshape(3, len(lats), len(lons))
+        nc_dset.createVariable('mask', 'i2', ('lat', 'lon'))[:] = \
+                                                            np.arange(len(lats)*len(lons)).reshape(len(lats), len(lons))
+
+    return lats, lons
+
+def test_reads_match_dataset(tmp_path):
+
+    nc_fname = str(tmp_path / 'grid.nc')
+    lats, lons = _write_dset(nc_fname)
+
+    slab_dset = open_band_dataset(nc_fname, BBOX, True)
+    nc_dset = netCDF4.Dataset(nc_fname, 'r')
+    try:
+        keys = [(0, lat_indx, lon_indx) for lat_indx in range(len(lats)) for lon_indx in range(len(lons))]
+        keys += [(slice(None), 10, 9), (2, slice(10, 12), slice(8, 11)), (1, -1, -1), (Ellipsis, 0)]
+        for key in keys:
+            assert np.array_equal(slab_dset.variables['yield'][key], nc_dset.variables['yield'][key])
+            assert np.array_equal(slab_dset['mask'][key[1:]], nc_dset['mask'][key[1:]])
+
+        assert np.array_equal(slab_dset['lat'][:], nc_dset['lat'][:])
+    finally:
+        slab_dset.close()
+        nc_dset.close()
+
+def test_slab_limited_to_band(tmp_path):
+
+    nc_fname = str(tmp_path / 'grid.nc')
+    lats, lons = _write_dset(nc_fname)
+    lon_ll, lat_ll, lon_ur, lat_ur = BBOX
+
+    slab_dset = SlabDataset(nc_fname, lat_ll, lat_ur, lon_ll, lon_ur)
+    try:
+        lat_indx = int(np.flatnonzero((lats >= lat_ll) & (lats <= lat_ur))[0])
+        lon_indx = int(np.flatnonzero((lons >= lon_ll) & (lons <= lon_ur))[0])
+        slab_dset['mask'][lat_indx, lon_indx]
+        slab_dset['yield'][0, lat_indx, lon_indx]
+
+        nlats = int(((lats >= lat_ll) & (lats <= lat_ur)).sum()) + 2
+        nlons = int(((lons >= lon_ll) & (lons <= lon_ur)).sum()) + 2
+        assert slab_dset['mask'].slab.shape == (nlats, nlons)
+        assert slab_dset['yield'].slab.shape == (3, nlats, nlons)
+    finally:
+        slab_dset.close()
@@ -0,0 +1,96 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_pet_batch_fns.py
+# Purpose:     check thornthwaite_batch against the thornthwaite function, including months below freezing
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_pet_batch_fns.py'
+__version__ = '0.0.1'
+
+from math import pi
+
+import numpy as np
+import pytest
+
+thornthwaite = pytest.importorskip('thornthwaite').thornthwaite
+
+from pet_batch_fns import thornthwaite_batch, MNTHS_YR
+
+STRT_YEAR = 1987    # includes leap years
+
+REL_TOL = 1.0e-12
+
+def _outcome(func, *args):
+    """
+    values returned or the type of exception raised
+    """
+    try:
+        return list(func(*args))
+    except Exception as err:
+        return type(err).__name__
+
+def _check_outcome(outcome, expected):
+    """
+    values must agree to within rounding, NaN and complex values included
+    """
+    if isinstance(expected, list):
+        assert outcome == pytest.approx(expected, rel = REL_TOL, nan_ok = True)
+    else:
+        assert outcome == expected
+
+def _thornthwaite_cell(temps, lat):
+    """
+    PET for every year of one cell as calculated when writing met files before thornthwaite_batch
+    """
+    pet = []
+    for iyr in range(len(temps) // MNTHS_YR):
+        pet += thornthwaite([float(val) for val in temps[iyr*MNTHS_YR:(iyr + 1)*MNTHS_YR]], lat, STRT_YEAR + iyr)
+
+    return pet
+
+def _temps(ncells, nyears, mean_temp, seed):
+    """
+    seasonal cycle with noise, mean_temp of 5 gives winter months below freezing in most years
+    """
+    rng = np.random.default_rng(seed)
+    seasonal = mean_temp - 7.0*np.cos(2.0*pi*np.arange(nyears*MNTHS_YR)/MNTHS_YR)
+
+    return seasonal + rng.normal(0.0, 2.0, (ncells, nyears*MNTHS_YR))
+
+@pytest.mark.parametrize('mean_temp', [12.0, 5.0])
+def test_matches_thornthwaite(mean_temp):
+
+    ncells, nyears = 40, 6
+    temps = _temps(ncells, nyears, mean_temp, 1234)
+    lats = np.linspace(49.9, 58.7, ncells)
+    lats[1::2] = lats[::2]      # cells share latitudes
+
+    if mean_temp < 10.0:
+        assert (temps <= 0.0).any()
+
+    pets = thornthwaite_batch(temps, lats, STRT_YEAR)
+    assert len(pets) == ncells
+    for icell in range(ncells):
+        expected = _outcome(_thornthwaite_cell, temps[icell], float(lats[icell]))
+        _check_outcome(_outcome(lambda: pets[icell]), expected)
+
+def test_frozen_year():
+    """
+    a year with no month above freezing has a heat index of zero
+    """
+    temps = _temps(1, 3, 12.0, 99)
+    temps[0, MNTHS_YR:2*MNTHS_YR] = -np.abs(temps[0, MNTHS_YR:2*MNTHS_YR]) - 0.5
+    lat = 57.5
+
+    _check_outcome(_outcome(lambda: thornthwaite_batch(temps, [lat], STRT_YEAR)[0]),
+                                                                    _outcome(_thornthwaite_cell, temps[0], lat))
+
+def test_incomplete_final_year():
+
+    temps = _temps(2, 3, 12.0, 7)[:, :-5]
+    pets = thornthwaite_batch(temps, [52.0, 53.0], STRT_YEAR)
+
+    assert [len(pet) for pet in pets] == [2*MNTHS_YR, 2*MNTHS_YR]
@@ -0,0 +1,160 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_plant_input_grid_fns.py
+# Purpose:     check that associating plant inputs once per yield cell gives the same plant inputs for every site
+#              as associating each site
+# Licence:     <your licence>
+# Description:
+#   stand-ins for associate_yield_nc and associate_yield index the synthetic yield grid as they do: by rounding the
+#   offset of the site from the first cell and by the nearest point of the DataFrame respectively
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_plant_input_grid_fns.py'
+__version__ = '0.0.1'
+
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from plant_input_grid_fns import PlantInputCells, pi_grid_coords, nearest_indices
+
+RESOL = 0.5
+LATS = 56.75 - RESOL*np.arange(6)       # descending as in most NetCDF files
+LONS = -4.75 + RESOL*np.arange(8)
+NYEARS = 3
+
+def _yields():
+
+    return np.arange(len(LATS)*len(LONS), dtype = float).reshape(len(LATS), len(LONS)) + 0.25
+
+def _assoc_nc(lggr, latitude, longitude, ltd_data, grid):
+    """
+    stand-in for associate_yield_nc
+    """
+    ilat = round((latitude - LATS[0])/(LATS[1] - LATS[0]))
+    ilon = round((longitude - LONS[0])/(LONS[1] - LONS[0]))
+    if 0 <= ilat < len(LATS) and 0 <= ilon < len(LONS):
+        ltd_data.pi_tonnes = NYEARS*[float(grid[ilat, ilon])]
+
+def _assoc_df(lggr, latitude, longitude, ltd_data, yield_df):
+    """
+    stand-in for associate_yield
+    """
+    dist = (yield_df['lat'] - latitude)**2 + (yield_df['lon'] - longitude)**2
+    indx = dist.idxmin()
+    if dist[indx] <= RESOL**2/2:
+        ltd_data.pi_tonnes = NYEARS*[float(yield_df['yield'][indx])]
+
+def _sites():
+    """
+    AOI cells of a band together with sites on, very near and near cell boundaries
+    and beyond the grid
+    """
+    aoi_res = []
+    for lat in np.arange(55.0, 56.5, 1/40) + 1/80:
+        for lon in np.arange(-4.0, -1.5, 1/40):
+            aoi_res.append([0, 0, float(lat), float(lon), 1.0, {}])
+
+    for lat_bndry in (55.5, 56.0):
+        for offset in (0.0, 1.0e-9, -1.0e-9, 1.0e-4, -1.0e-4, 0.01, -0.01):
+            aoi_res.append([0, 0, lat_bndry + offset, -2.8, 1.0, {}])
+            aoi_res.append([0, 0, 55.6, -3.0 + offset, 1.0, {}])
+
+    for lat, lon in ((LATS[0] + 0.3, -3.1), (LATS[-1] - 0.3, -3.1), (55.6, LONS[-1] + 0.4), (55.6, LONS[0] - 0.2)):
+        aoi_res.append([0, 0, lat, lon, 1.0, {}])
+
+    return aoi_res
+
+def _pi_per_site(aoi_res, order, assoc_func, pi_cells, *args):
+    """
+    plant inputs of each site in the order visited, either site by site or through pi_cells
+    """
+    ltd_data = SimpleNamespace(pi_tonnes = NYEARS*[0.0], pi_props = [1.0], study = 'test')
+    pi_tonnes = {}
+    for site_indx in order:
+        lat, lon = aoi_res[site_indx][2:4]
+        if pi_cells is None:
+            assoc_func(None, lat, lon, ltd_data, *args)
+        else:
+            pi_cells.associate(site_indx, ltd_data, assoc_func, None, lat, lon, ltd_data, *args)
+        pi_tonnes[site_indx] = list(ltd_data.pi_tonnes)
+
+    return pi_tonnes
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_nc_cells_match_sites(shuffle):
+
+    aoi_res = _sites()
+    order = list(range(len(aoi_res)))
+    if shuffle:
+        np.random.default_rng(5).shuffle(order)     # sites of a tiled band are visited out of AOI order
+
+    yield_dset = SimpleNamespace(variables = {'latitude': LATS, 'longitude': LONS})
+    lats, lons = pi_grid_coords(yield_dset = yield_dset)
+    pi_cells = PlantInputCells(aoi_res, lats, lons)
+
+    expected = _pi_per_site(aoi_res, order, _assoc_nc, None, _yields())
+    assert _pi_per_site(aoi_res, order, _assoc_nc, pi_cells, _yields()) == expected
+    assert pi_cells.nshared > 10*pi_cells.ncalls
+    assert pi_cells.site_attribs == {'pi_tonnes'}
+
+def test_df_cells_match_sites():
+
+    aoi_res = _sites()
+    grid_lats, grid_lons = np.meshgrid(LATS, LONS, indexing = 'ij')
+    yield_df = pd.DataFrame({'lat': grid_lats.ravel(), 'lon': grid_lons.ravel(), 'yield': _yields().ravel()})
+
+    lats, lons = pi_grid_coords(yield_df = yield_df)
+    pi_cells = PlantInputCells(aoi_res, lats, lons)
+    order = list(range(len(aoi_res)))
+
+    assert _pi_per_site(aoi_res, order, _assoc_df, pi_cells, yield_df) == \
+                                                            _pi_per_site(aoi_res, order, _assoc_df, None, yield_df)
+
+def test_nearest_indices_edges():
+
+    lats = [55.25, 55.75, 56.25]
+    vals = [55.5, 55.5 + 1.0e-9, 55.5 + 1.0e-4, 55.5 - 1.0e-4, 56.51, 56.49, 55.01, 54.99]
+    assert nearest_indices(lats, vals).tolist() == [-1, -1, 1, 0, -1, 2, 0, -1]
+    assert nearest_indices(lats[::-1], vals).tolist() == [-1, -1, 1, 2, -1, 0, 2, -1]
+
+def test_site_attribute_not_shared():
+    """
+    an association function assigning an attribute which differs between sites of the same cell is called for every
+    site once the second site of a cell is visited
+    """
+    def _assoc_extra(lggr, latitude, longitude, ltd_data, grid):
+        _assoc_nc(lggr, latitude, longitude, ltd_data, grid)
+        ltd_data.yield_site = (latitude, longitude)
+
+    aoi_res = _sites()
+    pi_cells = PlantInputCells(aoi_res, LATS, LONS)
+    order = list(range(len(aoi_res)))
+
+    assert _pi_per_site(aoi_res, order, _assoc_extra, pi_cells, _yields()) == \
+                                                    _pi_per_site(aoi_res, order, _assoc_nc, None, _yields())
+    assert pi_cells.ncalls == len(aoi_res)
+    assert pi_cells.site_attribs == {'pi_tonnes', 'yield_site'}
+
+def test_modified_in_place():
+    """
+    plant inputs modified in place rather than assigned are found by value and shared
+    """
+    def _assoc_in_place(lggr, latitude, longitude, ltd_data, grid):
+        pi_tonnes = ltd_data.pi_tonnes
+        _assoc_nc(lggr, latitude, longitude, ltd_data, grid)
+        pi_tonnes[:] = ltd_data.pi_tonnes
+        ltd_data.pi_tonnes = pi_tonnes
+
+    aoi_res = _sites()
+    pi_cells = PlantInputCells(aoi_res, LATS, LONS)
+    order = list(range(len(aoi_res)))
+
+    assert _pi_per_site(aoi_res, order, _assoc_in_place, pi_cells, _yields()) == \
+                                                    _pi_per_site(aoi_res, order, _assoc_nc, None, _yields())
+    assert pi_cells.site_attribs == {'pi_tonnes'}
+    assert pi_cells.nshared > 10*pi_cells.ncalls
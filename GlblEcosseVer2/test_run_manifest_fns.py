@@ -0,0 +1,132 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_run_manifest_fns.py
+# Purpose:     check that a resumed study has the same study files as an uninterrupted one
+# Licence:     <your licence>
+# Description:
+#   bands are driven as in _generate_ecosse_files using a stand-in for make_ecosse_file which, like it, opens the
+#   study files when the first site is written and appends one line per site to each study file
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_run_manifest_fns.py'
+__version__ = '0.0.1'
+
+from os.path import join, isfile
+from types import SimpleNamespace
+
+import pytest
+
+
+from run_manifest_fns import RunManifest, site_key
+from site_writer_fns import SiteWriterPool
+
+STUDY = 'resume_test'
+NCHANS = 2
+BANDS = [(num_band, [[num_band*100 + irow, 400 + icol] for irow in range(2) for icol in range(3)])
+                                                                                        for num_band in range(1, 4)]
+
+class Interrupted(Exception):
+    pass
+
+def _make_site(form, site_rec):
+    """
+    stand-in for make_ecosse_file
+    """
+    if form.fstudy == '':
+        form.fstudy = [open(join(form.sims_dir, STUDY + '_{}.txt'.format(ichan)), 'w') for ichan in range(NCHANS)]
+        for fobj in form.fstudy:
+            fobj.write('header\n')
+
+    for ichan, fobj in enumerate(form.fstudy):
+        fobj.write('{}\t{}\n'.format(ichan, site_key(site_rec)))
+
+def _run_band(form, run_manifest, num_band, aoi_res, num_writers, stop_after):
+    """
+    follows the site loop of _generate_ecosse_files
+    """
+    band_summary = run_manifest.replay_band(num_band, form.fstudy)
+    if band_summary is not None:
+        return band_summary
+
+    band_chckpnt = run_manifest.band_checkpoint(num_band)
+
+    def _site_written(key, study_lines, site_data):
+        site_hash, site_indx = site_data
+        band_chckpnt.record(key, study_lines, site_hash, site_indx)
+
+    site_writer = SiteWriterPool(form, num_writers, 4, _site_written)
+    nsubmitted = 0
+    for site_indx, site_rec in enumerate(aoi_res):
+        key = site_key(site_rec)
+        if band_chckpnt.replay_site(site_writer, key):
+            continue
+
+        if nsubmitted == stop_after:
+            site_writer.close()
+            raise Interrupted()
+
+        site_writer.submit(key, (None, site_indx), _make_site, site_rec)
+        nsubmitted += 1
+
+    site_writer.close()
+
+    return band_chckpnt.close()
+
+def _run_study(sims_dir, resume_flag, num_writers, stop_band = None, stop_after = None):
+    """
+    returns contents of the study files, None for each file if not opened
+    """
+    form = SimpleNamespace(fstudy = '', sims_dir = sims_dir, study = STUDY)
+    run_manifest = RunManifest(sims_dir, STUDY, 0.5, [0.0, 0.0, 1.0, 1.5], resume_flag)
+    try:
+        for num_band, aoi_res in BANDS:
+            run_manifest.band_started(num_band)
+            band_stop = stop_after if num_band == stop_band else None
+            run_manifest.band_finished(num_band, _run_band(form, run_manifest, num_band, aoi_res, num_writers,
+                                                                                                        band_stop))
+    except Interrupted:
+        pass
+    finally:
+        if form.fstudy != '':
+            for fobj in form.fstudy:
+                fobj.close()
+
+    contents = []
+    for ichan in range(NCHANS):
+        study_fn = join(sims_dir, STUDY + '_{}.txt'.format(ichan))
+        if isfile(study_fn):
+            with open(study_fn, 'r') as fstudy:
+                contents.append(fstudy.read())
+        else:
+            contents.append(None)   # interrupted before the study files were opened
+
+    return contents
+
+@pytest.mark.parametrize('num_writers', [0, 2])
+@pytest.mark.parametrize('stop_band, stop_after', [(1, 0), (1, 3), (2, 0), (2, 4), (3, 5)])
+def test_resumed_study_files_match_uninterrupted(tmp_path, num_writers, stop_band, stop_after):
+
+    expected = _run_study(str(tmp_path / 'whole'), False, num_writers)
+    assert expected[0].count('\n') == 1 + sum(len(aoi_res) for num_band, aoi_res in BANDS)
+
+    resume_dir = tmp_path / 'resumed'
+    resume_dir.mkdir()
+    partial = _run_study(str(resume_dir), False, num_writers, stop_band, stop_after)
+    assert partial != expected
+
+    assert _run_study(str(resume_dir), True, num_writers) == expected
+
+def test_resume_twice(tmp_path):
+    """
+    a study interrupted again after resuming
+    """
+    expected = _run_study(str(tmp_path / 'whole'), False, 0)
+
+    resume_dir = tmp_path / 'resumed'
+    resume_dir.mkdir()
+    _run_study(str(resume_dir), False, 0, 2, 2)
+    _run_study(str(resume_dir), True, 0, 3, 1)
+
+    assert _run_study(str(resume_dir), True, 0) == expected
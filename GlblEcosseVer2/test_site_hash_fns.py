@@ -0,0 +1,195 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_site_hash_fns.py
+# Purpose:     check that the site inputs hash changes with any input of the simulation files and only then, and that
+#              a second run with unchanged inputs skips every site
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_site_hash_fns.py'
+__version__ = '0.0.1'
+
+import logging
+from copy import deepcopy
+from io import StringIO
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+import site_hash_fns
+from site_hash_fns import SiteHashIndex, band_inputs_hash, site_inputs_hash
+
+SITE_ATTRIBS = {'pi_tonnes', 'pi_props'}
+
+class Wdgt(object):
+    """
+    minimal line edit and check box
+    """
+    def __init__(self, text = '', checked = False):
+        self._text = text
+        self._checked = checked
+
+    def text(self):
+        return self._text
+
+    def isChecked(self):
+        return self._checked
+
+    def currentIndex(self):
+        return 1
+
+def _inputs():
+
+    form = SimpleNamespace(sims_dir = '/sims', req_resol_deg = 1/120, req_resol_granul = 1, w_equimode = Wdgt('9.5'),
+                           w_ave_weather = Wdgt(checked = False), combo16 = Wdgt(), w_lbl13 = Wdgt('lu_pi.json'),
+                           w_use_pi_nc = Wdgt(checked = True), w_lbl_pi_nc = Wdgt('yields.nc'),
+                           w_use_pi_csv = Wdgt(), w_lbl_pi_csv = Wdgt(), fstudy = '', lgr = None)
+    climgen = SimpleNamespace(wthr_rsrc = 'CRU', wthr_rsrc_key = 'CRU', fut_clim_scen = 'A1B', hist_start_year = 1961,
+                              hist_end_year = 1990, sim_start_year = 2001, sim_end_year = 2010, fut_strt_indx = 0,
+                              max_num_years = 10, mnthly_flag = True, hist_precip_fname = None, hist_tas_fname = None,
+                              fut_precip_fname = None, fut_tas_fname = None, lta_nc_fname = None)
+    ltd_data = SimpleNamespace(pi_tonnes = [2.5, 2.5], pi_props = np.array([0.1, 0.9]), form = form,
+                               climgen = climgen, crop = SimpleNamespace(name = 'wheat', params = {'harvest': [9, 10]}),
+                               lu_ids = {'ara': 1, 'for': 3}, defaults = {'depths': (30, 100)})
+    ltd_data.parent = ltd_data      # a cycle
+    site_rec = [300, 4230, 55.6, -3.4, 0.72, {1234: 1.0}]
+    soil_recs = {1234: [[1.2, 3, 100.0]]}
+    pettmp_grid_cell = {'precipitation': [[1.0, 2.0], [3.0, 4.0]], 'temperature': [[5.0, 6.0], [7.0, 8.0]]}
+
+    return dict(site_rec = site_rec, soil_recs = soil_recs, pettmp_grid_cell = pettmp_grid_cell,
+                ltd_data = ltd_data, climgen = climgen, form = form, study = 'hash_test')
+
+def _hash(inputs):
+
+    band_hash = band_inputs_hash(inputs['ltd_data'], inputs['climgen'], inputs['form'], inputs['study'], SITE_ATTRIBS)
+
+    return site_inputs_hash(inputs['site_rec'], inputs['soil_recs'], inputs['pettmp_grid_cell'], inputs['ltd_data'],
+                                                                                            SITE_ATTRIBS, band_hash)
+
+def test_copies_hash_alike():
+
+    inputs = _inputs()
+    assert _hash(inputs) == _hash(deepcopy(inputs)) == _hash(_inputs())
+
+def _set_nested_dict(inputs):
+    inputs['ltd_data'].defaults['depths'] = (30, 150)
+
+def _set_nested_obj(inputs):
+    inputs['ltd_data'].crop.params['harvest'][1] = 11
+
+def _set_array(inputs):
+    inputs['ltd_data'].pi_props[0] = 0.2
+
+def _set_lu_ids(inputs):
+    inputs['ltd_data'].lu_ids['gra'] = 2
+
+def _set_equimode(inputs):
+    inputs['form'].w_equimode = Wdgt('1')
+
+def _set_ave_weather(inputs):
+    inputs['form'].w_ave_weather = Wdgt(checked = True)
+
+def _set_sims_dir(inputs):
+    inputs['form'].sims_dir = '/other'
+
+def _set_scenario(inputs):
+    inputs['climgen'].fut_clim_scen = 'B2'
+
+def _set_soil(inputs):
+    inputs['soil_recs'][1234][0][1] = 4
+
+def _set_weather(inputs):
+    inputs['pettmp_grid_cell']['temperature'][0][1] = 6.5
+
+def _set_study(inputs):
+    inputs['study'] = 'other'
+
+@pytest.mark.parametrize('change', [_set_nested_dict, _set_nested_obj, _set_array, _set_lu_ids, _set_equimode,
+                                    _set_ave_weather, _set_sims_dir, _set_scenario, _set_soil, _set_weather,
+                                    _set_study])
+def test_change_alters_hash(change):
+
+    inputs = _inputs()
+    prev_hash = _hash(inputs)
+    change(inputs)
+    assert _hash(inputs) != prev_hash
+
+def test_unlisted_form_state_ignored():
+    """
+    the form referred to by the limited data object is hashed only through its listed settings
+    """
+    inputs = _inputs()
+    prev_hash = _hash(inputs)
+    inputs['form'].fstudy = [open(__file__, 'r')]
+    inputs['form'].fstudy[0].close()
+    inputs['form'].w_prgrss = Wdgt('50%')
+    assert _hash(inputs) == prev_hash
+
+def _run_band(sims_dir, inputs, site_recs):
+    """
+    sites of a band written, or skipped if unchanged, as in _generate_ecosse_files with plant inputs set for each site
+    returns number of sites skipped and of band hashes taken
+    """
+    site_hashes = SiteHashIndex(sims_dir, inputs['study'], 1, True)
+    form = inputs['form']
+    ltd_data = inputs['ltd_data']
+    for site_rec in site_recs:
+        key = '{}_{}'.format(site_rec[0], site_rec[1])
+        ltd_data.pi_tonnes = [site_rec[2], site_rec[3]]
+        site_hash = site_hashes.site_hash(site_rec, inputs['soil_recs'], inputs['pettmp_grid_cell'], ltd_data,
+                                                    SITE_ATTRIBS, inputs['climgen'], form, inputs['study'])
+        study_lines = site_hashes.prev_study_lines(form, key, site_hash)
+        if study_lines is None:
+            study_lines = ['{}\t{}\n'.format(key, ichan) for ichan in range(len(form.fstudy))]
+        site_hashes.record(key, site_hash, study_lines)
+    site_hashes.close()
+
+    return site_hashes.nunchanged, len(site_hashes.band_hashes)
+
+def _inputs_with_fstudy(inputs):
+    """
+    fresh inputs of a second run with the study files of the first
+    """
+    inputs_new = _inputs()
+    inputs_new['form'].fstudy = inputs['form'].fstudy
+
+    return inputs_new
+
+def test_unchanged_run_skips_every_site(tmp_path, monkeypatch):
+    """
+    the band hash is taken once for each run
+    """
+    nband_hashes = []
+    band_hash_func = site_hash_fns.band_inputs_hash
+    monkeypatch.setattr(site_hash_fns, 'band_inputs_hash',
+                                                lambda *args: nband_hashes.append(1) or band_hash_func(*args))
+
+    site_recs = [[300 + irow, 4230 + icol, 55.6 - irow/120, -3.4 + icol/120, 0.72, {1234: 1.0}]
+                                                                            for irow in range(4) for icol in range(5)]
+    inputs = _inputs()
+    inputs['form'].fstudy = [StringIO(), StringIO()]
+
+    assert _run_band(str(tmp_path), inputs, site_recs) == (0, 1)
+    assert _run_band(str(tmp_path), _inputs_with_fstudy(inputs), site_recs) == (len(site_recs), 1)
+    assert len(nband_hashes) == 2
+
+    inputs['form'].w_equimode = Wdgt('1')
+    assert _run_band(str(tmp_path), inputs, site_recs) == (0, 1)
+
+def test_missing_climgen_attribute_disables(tmp_path):
+    """
+    sites are written, not skipped, when the weather settings cannot be hashed
+    """
+    inputs = _inputs()
+    inputs['form'].fstudy = [StringIO(), StringIO()]
+    inputs['form'].lgr = logging.getLogger(__prog__)
+    site_recs = [[300, 4230 + icol, 55.6, -3.4 + icol/120, 0.72, {1234: 1.0}] for icol in range(3)]
+    assert _run_band(str(tmp_path), inputs, site_recs) == (0, 1)
+
+    inputs_new = _inputs_with_fstudy(inputs)
+    inputs_new['form'].lgr = logging.getLogger(__prog__)
+    del inputs_new['climgen'].fut_clim_scen
+    assert _run_band(str(tmp_path), inputs_new, site_recs) == (0, 0)
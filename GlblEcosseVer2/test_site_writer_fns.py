@@ -0,0 +1,173 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_site_writer_fns.py
+# Purpose:     check that study files of a band visited tile by tile are the same as those of a band visited in AOI
+#              order, including when the first AOI cells are skipped, with each site written once, and that site
+#              copies share no nested state
+# Licence:     <your licence>
+# Description:
+#   sites are visited in the order of BandWeather for a band split into longitude tiles and written by a stand-in for
+#   make_ecosse_file which, like it, opens the study files and writes their header when the first site is written
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_site_writer_fns.py'
+__version__ = '0.0.1'
+
+import logging
+from io import StringIO
+from os.path import join
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('getClimGenFns')
+
+from band_wthr_fns import BandWeather, band_lon_tiles
+from site_writer_fns import SiteWriterPool
+
+STUDY = 'tiled_test'
+NCHANS = 2
+BBOX = [-4.0, 55.0, -1.0, 55.5]
+
+def _aoi_res():
+    """
+    AOI cells in the order of the HWSD records i.e. by latitude then longitude
+    """
+    return [[irow, icol, 55.45 - irow*0.1, -3.95 + icol*0.25, 1.0, {}] for irow in range(5) for icol in range(12)]
+
+def _make_site(form, site_rec, ncalls = None, fstudy_types = None):
+    """
+    stand-in for make_ecosse_file, ncalls, if given, counts the calls for each site and fstudy_types collects the
+    types of the study files written to
+    """
+    if ncalls is not None:
+        ncalls[site_rec[0], site_rec[1]] = ncalls.get((site_rec[0], site_rec[1]), 0) + 1
+
+    if form.fstudy == '':
+        form.fstudy = [open(join(form.sims_dir, STUDY + '_{}.txt'.format(ichan)), 'w') for ichan in range(NCHANS)]
+        for ichan, fobj in enumerate(form.fstudy):
+            fobj.write('header {}\n'.format(ichan))
+
+    if fstudy_types is not None:
+        fstudy_types.update(type(fobj) for fobj in form.fstudy)
+
+    for ichan, fobj in enumerate(form.fstudy):
+        fobj.write('{}\t{}_{}\t{}\n'.format(ichan, site_rec[0], site_rec[1], site_rec[3]))
+
+def _site_order(aoi_res, tiled):
+    """
+    order in which BandWeather visits the AOI cells, tiles of two weather columns where tiled
+    """
+    band_wthr = BandWeather.__new__(BandWeather)
+    if tiled:
+        band_wthr.tiles = band_lon_tiles(BBOX, 1, 1024*1024//4)
+        assert band_wthr.ntiles == 3
+    else:
+        band_wthr.tiles = band_lon_tiles(BBOX, 0, 1)
+
+    return [site_indx for num_tile, site_indices in band_wthr._tile_site_indices(aoi_res) for site_indx in site_indices]
+
+def _write_band(sims_dir, tiled, num_writers, skip, ncalls = None):
+    """
+    returns contents of the study files
+    """
+    form = SimpleNamespace(fstudy = '', sims_dir = sims_dir, study = STUDY, lgr = logging.getLogger(__prog__))
+    aoi_res = _aoi_res()
+    site_writer = SiteWriterPool(form, num_writers, 3, lambda key, study_lines, data: None)
+    if tiled:
+        site_writer.hold_study_lines()
+
+    try:
+        for site_indx in _site_order(aoi_res, tiled):
+            if site_indx in skip:
+                continue
+            site_rec = aoi_res[site_indx]
+            site_writer.submit(site_indx, None, _make_site, site_rec, ncalls)
+
+        site_writer.release_study_lines(list(range(len(aoi_res))))
+    finally:
+        site_writer.close()
+        for fobj in form.fstudy:
+            fobj.close()
+
+    contents = []
+    for ichan in range(NCHANS):
+        with open(join(sims_dir, STUDY + '_{}.txt'.format(ichan)), 'r') as fstudy:
+            contents.append(fstudy.read())
+
+    return contents
+
+@pytest.mark.parametrize('num_writers', [0, 2])
+@pytest.mark.parametrize('skip, opener_first', [(set(), True), ({0}, True), ({0, 1, 2, 3}, False)])
+def test_tiled_matches_aoi_order(tmp_path, num_writers, skip, opener_first):
+    """
+    where the first four AOI cells are skipped the first site visited, which opens the study files, lies in the first
+    tile whereas the first site in AOI order lies in the second
+    """
+    (tmp_path / 'whole').mkdir()
+    (tmp_path / 'tiled').mkdir()
+
+    expected = _write_band(str(tmp_path / 'whole'), False, 0, skip)
+    assert expected[1].startswith('header 1\n')
+    assert expected[0].count('\n') == 1 + 60 - len(skip)
+
+    aoi_res = _aoi_res()
+    order = _site_order(aoi_res, True)
+    assert ([indx for indx in order if indx not in skip][0] == min(set(range(len(aoi_res))) - skip)) == opener_first
+
+    ncalls = {}
+    assert _write_band(str(tmp_path / 'tiled'), True, num_writers, skip, ncalls) == expected
+    assert len(ncalls) == 60 - len(skip) and set(ncalls.values()) == {1}
+
+def test_site_copy_nested_state():
+    """
+    nested state of the limited data object modified while the next site is prepared is not shared with the copy
+    submitted, whereas the form and climgen are referenced
+    """
+    form = SimpleNamespace(fstudy = '', sims_dir = '', study = STUDY)
+    climgen = SimpleNamespace(sim_start_year = 1801)
+    ltd_data = SimpleNamespace(form = form, climgen = climgen, pi_tonnes = [1.0, 2.0],
+                                        pi_props = [[0.5, 0.5], [0.2, 0.8]], mngmnt = {'crop': [1, 2]}, soils = [1])
+    site_writer = SiteWriterPool(form, 1, 3, lambda key, study_lines, data: None)
+    try:
+        ltd_copy = site_writer.site_copy(ltd_data, {'pi_tonnes', 'pi_props', 'mngmnt', 'yield_site'}, climgen)
+    finally:
+        site_writer.close()
+
+    ltd_data.pi_tonnes[0] = 9.0
+    ltd_data.pi_props[1][0] = 9.0
+    ltd_data.mngmnt['crop'].append(3)
+
+    assert ltd_copy.pi_tonnes == [1.0, 2.0]
+    assert ltd_copy.pi_props == [[0.5, 0.5], [0.2, 0.8]]
+    assert ltd_copy.mngmnt == {'crop': [1, 2]}
+    assert ltd_copy.form is form and ltd_copy.climgen is climgen
+    assert ltd_copy.soils is ltd_data.soils and not hasattr(ltd_copy, 'yield_site')
+
+    assert SiteWriterPool(form, 0, 3, None).site_copy(ltd_data, {'pi_tonnes'}) is ltd_data
+
+def test_serial_writes_to_study_files(tmp_path):
+    """
+    with no writer threads sites are written straight to the study files, whose lines are still passed to on_done
+    """
+    form = SimpleNamespace(fstudy = '', sims_dir = str(tmp_path), study = STUDY, lgr = logging.getLogger(__prog__))
+    done = {}
+    fstudy_types = set()
+    packer = SimpleNamespace(enabled = False)     # as passed by _generate_ecosse_files when not packing
+    site_writer = SiteWriterPool(form, 0, 3, lambda key, study_lines, data: done.update({key: study_lines}), packer)
+    aoi_res = _aoi_res()
+    try:
+        for site_indx in range(3):
+            site_writer.submit(site_indx, None, _make_site, aoi_res[site_indx], None, fstudy_types)
+        site_writer.close()
+        file_types = set(type(fobj) for fobj in form.fstudy)
+    finally:
+        for fobj in form.fstudy:
+            fobj.close()
+
+    assert StringIO not in fstudy_types
+    assert done[0] is None
+    assert done[2] == ['0\t0_2\t{}\n'.format(aoi_res[2][3]), '1\t0_2\t{}\n'.format(aoi_res[2][3])]
+    assert len(file_types) == 1 and StringIO not in file_types
@@ -0,0 +1,163 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_soil_rec_store.py
+# Purpose:     check that soils returned by a SoilRecStore keep the values and types supplied
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_soil_rec_store.py'
+__version__ = '0.0.1'
+
+from copy import copy
+from operator import itemgetter
+
+import numpy as np
+import pytest
+
+from soil_rec_store import SoilRecStore
+
+INT_RECS = {10: [[1, 2, 100]], 11: [[3, 4, 60], [5, 6, 40]]}
+FLOAT_RECS = {20: [[1.5, 2.25, 100.0]], 21: [[3, 4.5, 50], [7.0, 8, 50.0]]}
+
+def _typed(soil_recs):
+    """
+    repr of each soil so that 100 and 100.0 differ
+    """
+    return {mu_global: repr(soil_recs[mu_global]) for mu_global in soil_recs}
+
+def _simplify_dict(soil_recs, use_dom_soil_flag):
+    """
+    simplify_soil_recs as it was before the soil records were held in a store
+    """
+    new_soil_recs = {}
+    for mu_global in soil_recs:
+        if len(soil_recs[mu_global]) == 1:
+            new_soil_recs[mu_global] = soil_recs[mu_global]
+            continue
+
+        new_soil_group = []
+        soil_group = sorted(soil_recs[mu_global])
+        if len(soil_group) == 0:
+            continue
+
+        metrics1 = soil_group[0][:-1]
+        share1 = soil_group[0][-1]
+        for soil in soil_group[1:]:
+            if metrics1 == soil[:-1]:
+                share1 += soil[-1]
+            else:
+                new_soil_group.append(metrics1 + [share1])
+                metrics1 = soil[:-1]
+                share1 = soil[-1]
+
+        new_soil_group.append(metrics1 + [share1])
+        if len(new_soil_group) == 1:
+            new_soil_recs[mu_global] = new_soil_group
+            continue
+
+        if use_dom_soil_flag:
+            dom_soil = copy(sorted(new_soil_group, reverse = True, key = itemgetter(-1))[0])
+            dom_soil[-1] = 100.0
+            new_soil_recs[mu_global] = list([dom_soil])
+
+    return new_soil_recs
+
+def _random_recs(seed, nmu_globals = 300):
+    """
+    soils drawn from a small pool so that duplicates are common, integers and floats mixed within columns
+    """
+    rng = np.random.default_rng(seed)
+    soil_recs = {}
+    for mu_global in range(nmu_globals):
+        soils = []
+        for isoil in range(int(rng.integers(0, 6))):
+            soil = [int(val) if rng.random() < 0.5 else float(val) for val in rng.integers(0, 3, 3)]
+            share = int(rng.integers(1, 50))
+            soils.append(soil + [share if rng.random() < 0.7 else share + 0.5])
+        soil_recs[1000 + mu_global] = soils
+
+    return soil_recs
+
+def test_round_trip():
+
+    store = SoilRecStore.from_soil_recs(INT_RECS)
+    assert _typed(dict(store.items())) == _typed(INT_RECS)
+
+def test_merge_keeps_types():
+
+    merged = SoilRecStore.from_soil_recs(INT_RECS).merge(SoilRecStore.from_soil_recs(FLOAT_RECS))
+    assert _typed(dict(merged.items())) == _typed({**INT_RECS, **FLOAT_RECS})
+
+    # later studies take precedence
+    # =============================
+    merged = merged.merge(SoilRecStore.from_soil_recs({10: [[1.0, 2, 99.5]]}))
+    assert repr(merged[10]) == repr([[1.0, 2, 99.5]])
+    assert repr(merged[11]) == repr(INT_RECS[11])
+
+def test_save_load_keeps_types(tmp_path):
+
+    merged = SoilRecStore.from_soil_recs(INT_RECS).merge(SoilRecStore.from_soil_recs(FLOAT_RECS))
+    fname = str(tmp_path / 'soil_recs.npz')
+    merged.save(fname, version = np.array(2))
+
+    loaded, metadata = SoilRecStore.load(fname)
+    assert int(metadata['version']) == 2
+    assert _typed(dict(loaded.items())) == _typed(dict(merged.items()))
+
+def test_dominant_share_only_float():
+    """
+    an integer share of a single soil mu_global is unaffected by another mu_global reduced to its dominant soil
+    """
+    store, num_raw, num_compress = SoilRecStore.from_soil_recs(INT_RECS).simplify(True)
+    assert repr(store[10]) == repr([[1, 2, 100]])
+    assert repr(store[11]) == repr([[3, 4, 100.0]])
+
+def test_non_numeric_not_saved(tmp_path):
+
+    store = SoilRecStore.from_soil_recs({30: [['clay', 1, 100]]})
+    assert store[30] == [['clay', 1, 100]]
+    with pytest.raises(ValueError):
+        store.save(str(tmp_path / 'soil_recs.npz'))
+
+@pytest.mark.parametrize('use_dom_soil_flag', [True, False])
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_simplify_matches_dict(seed, use_dom_soil_flag):
+
+    soil_recs = _random_recs(seed)
+    store, num_raw, num_compress = SoilRecStore.from_soil_recs(soil_recs).simplify(use_dom_soil_flag)
+    expected = _simplify_dict(soil_recs, use_dom_soil_flag)
+
+    assert store.keys() == list(expected.keys())
+    assert _typed(dict(store.items())) == _typed(expected)
+    assert num_raw == sum(len(soils) for soils in soil_recs.values())
+
+def test_updates_match_dict():
+    """
+    assignments, deletions and pops give the same soils, types and order as the dictionary
+    """
+    soil_recs = _random_recs(7, 40)
+    store = SoilRecStore.from_soil_recs(soil_recs)
+    rng = np.random.default_rng(11)
+    for mu_global, soils in _random_recs(8, 60).items():
+        action = rng.integers(0, 4)
+        if action == 0:
+            soil_recs[mu_global] = soils
+            store[mu_global] = soils
+        elif action == 1 and mu_global in soil_recs:
+            del soil_recs[mu_global]
+            del store[mu_global]
+        elif action == 2:
+            assert repr(store.pop(mu_global, None)) == repr(soil_recs.pop(mu_global, None))
+        assert list(store.keys()) == list(soil_recs.keys())
+
+    assert _typed(store) == _typed(soil_recs)
+    assert store.nsoils == sum(len(soils) for soils in soil_recs.values())
+
+    with pytest.raises(KeyError):
+        store.pop(-1)
+    with pytest.raises(KeyError):
+        del store[-1]
+    with pytest.raises(ValueError):
+        store[-1] = [[1, 2, 3, 4, 100]]     # different metrics
@@ -0,0 +1,124 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_wthr_cache_fns.py
+# Purpose:     check that cached weather is keyed on the weather settings, the datasets read and the grid indices
+# Licence:     <your licence>
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_wthr_cache_fns.py'
+__version__ = '0.0.1'
+
+from os import utime, stat
+
+import pytest
+
+from wthr_cache_fns import PettmpCache
+
+class FakeClimgen(object):
+    """
+    climgen object whose fetch function counts the reads of the datasets
+    """
+    def __init__(self, nc_dir):
+
+        self.wthr_rsrc = self.wthr_rsrc_key = 'CRU'
+        self.fut_clim_scen = 'A1B'
+        self.hist_start_year, self.hist_end_year = 1961, 1990
+        self.sim_start_year, self.sim_end_year = 2001, 2010
+        self.fut_strt_indx, self.max_num_years, self.mnthly_flag = 0, 10, True
+        self.fut_precip_fname = str(nc_dir / 'precip.nc')
+        self.fut_tas_fname = str(nc_dir / 'tas.nc')
+        self.hist_precip_fname = str(nc_dir / 'hist_precip.nc')
+        self.hist_tas_fname = str(nc_dir / 'hist_tas.nc')
+        self.lta_nc_fname = None                        # no such dataset
+        self.num_band = 1                               # not a key attribute
+        for nc_fname in (self.fut_precip_fname, self.fut_tas_fname, self.hist_precip_fname, self.hist_tas_fname):
+            with open(nc_fname, 'w') as fnc:
+                fnc.write('netcdf')
+        self.nreads = 0
+
+    def fetch_cru_future_NC_data(self, aoi_indices, num_band, future_flag = True):
+
+        self.nreads += 1
+        return {'precipitation': {'00300_04230': [float(self.nreads)]}}
+
+def _fetch(wthr_cache, climgen, aoi_indices = (10, 20, 30, 40), **kwargs):
+
+    return wthr_cache.fetch(climgen, 'fetch_cru_future_NC_data', list(aoi_indices), 1, **kwargs)
+
+def _touch_later(nc_fname):
+
+    fstat = stat(nc_fname)
+    utime(nc_fname, ns = (fstat.st_atime_ns, fstat.st_mtime_ns + 2000000000))
+
+def _rewrite(nc_fname):
+
+    with open(nc_fname, 'w') as fnc:
+        fnc.write('netcdf replaced')
+
+def _set_scenario(climgen):
+    climgen.fut_clim_scen = 'B2'
+
+def _set_hist_years(climgen):
+    climgen.hist_end_year = 2000
+
+def _set_sim_years(climgen):
+    climgen.sim_end_year = 2020
+
+def _set_rsrc(climgen):
+    climgen.wthr_rsrc = 'EObs'
+
+def _set_path(climgen):
+    climgen.fut_tas_fname = climgen.fut_precip_fname
+
+def _set_mtime(climgen):
+    _touch_later(climgen.fut_precip_fname)
+
+def _set_size(climgen):
+    _rewrite(climgen.fut_tas_fname)
+
+@pytest.fixture
+def cache_and_climgen(tmp_path):
+
+    nc_dir = tmp_path / 'nc'
+    nc_dir.mkdir()
+    return PettmpCache(str(tmp_path / 'cache'), 64), FakeClimgen(nc_dir)
+
+def test_hit(cache_and_climgen):
+
+    wthr_cache, climgen = cache_and_climgen
+    first = _fetch(wthr_cache, climgen)
+    climgen.num_band = 2
+    assert _fetch(wthr_cache, climgen) == first
+    assert (climgen.nreads, wthr_cache.nhits) == (1, 1)
+
+@pytest.mark.parametrize('change', [_set_scenario, _set_hist_years, _set_sim_years, _set_rsrc, _set_path,
+                                    _set_mtime, _set_size])
+def test_change_misses(cache_and_climgen, change):
+
+    wthr_cache, climgen = cache_and_climgen
+    _fetch(wthr_cache, climgen)
+    change(climgen)
+    _fetch(wthr_cache, climgen)
+    assert (climgen.nreads, wthr_cache.nhits) == (2, 0)
+
+def test_indices_and_kwargs(cache_and_climgen):
+
+    wthr_cache, climgen = cache_and_climgen
+    _fetch(wthr_cache, climgen)
+    _fetch(wthr_cache, climgen, (10, 20, 30, 41))
+    _fetch(wthr_cache, climgen, future_flag = False)
+    assert (climgen.nreads, wthr_cache.nhits) == (3, 0)
+
+def test_missing_attribute_disables(cache_and_climgen, tmp_path):
+    """
+    a climgen object without an attribute of the key is never matched to cached weather
+    """
+    wthr_cache, climgen = cache_and_climgen
+    del climgen.fut_clim_scen
+
+    assert _fetch(wthr_cache, climgen) != _fetch(wthr_cache, climgen)
+    assert climgen.nreads == 2
+    assert wthr_cache.nhits == 0 and wthr_cache.cache_dir == ''
+    assert not (tmp_path / 'cache').exists() or len(list((tmp_path / 'cache').iterdir())) == 0
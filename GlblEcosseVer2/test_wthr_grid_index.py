@@ -0,0 +1,135 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        test_wthr_grid_index.py
+# Purpose:     check that WthrGridIndex chooses the same weather cell as associate_climate for every AOI cell
+# Licence:     <your licence>
+# Description:
+#   the synthetic band has half degree weather cells with some absent from the historic dataset and some with empty
+#   historic weather, its AOI cells extend beyond the weather grid and include cells midway between weather cells
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'test_wthr_grid_index.py'
+__version__ = '0.0.1'
+
+from math import hypot
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+getClimGenFns = pytest.importorskip('getClimGenFns')
+
+import wthr_grid_index
+from wthr_grid_index import WthrGridIndex, GRANULARITY, METRICS
+
+NMNTHS = 24
+
+def _wthr_key(lat, lon):
+
+    return '{:0>5}_{:0>5}'.format(int(round((90.0 - lat)*GRANULARITY)), int(round((180.0 + lon)*GRANULARITY)))
+
+def _band_weather():
+    """
+    future and historic weather for half degree cells covering 52 to 54N and 3 to 0W
+    """
+    pettmp_fut = {metric: {} for metric in METRICS}
+    pettmp_hist = {metric: {} for metric in METRICS}
+    for ilat, lat in enumerate(np.arange(53.75, 52.0, -0.5)):
+        for ilon, lon in enumerate(np.arange(-2.75, 0.0, 0.5)):
+            key = _wthr_key(lat, lon)
+            for imetric, metric in enumerate(METRICS):
+                pettmp_fut[metric][key] = [float(imetric*1000 + ilat*10 + ilon + imnth/100) for imnth in range(NMNTHS)]
+                if (ilat, ilon) == (1, 2):
+                    continue            # absent from historic dataset
+                elif (ilat, ilon) == (2, 4):
+                    pettmp_hist[metric][key] = []
+                else:
+                    pettmp_hist[metric][key] = [-val for val in pettmp_fut[metric][key]]
+
+    return pettmp_hist, pettmp_fut
+
+def _aoi_res():
+    """
+    AOI cells of a band on the HWSD grid, extending beyond the weather grid, plus cells midway between weather cells
+    """
+    aoi_res = []
+    for gran_lat in range(int((90 - 54.2)*GRANULARITY), int((90 - 51.9)*GRANULARITY), 7):
+        for gran_lon in range(int((180 - 3.3)*GRANULARITY), int((180 + 0.2)*GRANULARITY), 11):
+            aoi_res.append([gran_lat, gran_lon, 90.0 - (gran_lat + 0.5)/GRANULARITY,
+                                                    (gran_lon + 0.5)/GRANULARITY - 180.0, 1.0, {}])
+
+    for lat, lon in ((53.0, -2.6), (52.6, -1.5), (53.0, -1.5), (52.4, -1.0)):
+        aoi_res.append([0, 0, lat, lon, 1.0, {}])
+
+    return aoi_res
+
+def _nearest_cell(site_rec, climgen, pettmp_hist, pettmp_fut):
+    """
+    reference association: the most proximate weather cell present in both datasets, first found where equidistant
+    """
+    latitude, longitude = site_rec[2:4]
+    best_key, best_dist = None, None
+    for key in pettmp_fut[METRICS[0]]:
+        if key not in pettmp_hist[METRICS[0]]:
+            continue
+        gran_lat, gran_lon = [int(val) for val in key.split('_')]
+        dist = hypot(90.0 - gran_lat/GRANULARITY - latitude, gran_lon/GRANULARITY - 180.0 - longitude)
+        if best_dist is None or dist < best_dist - 1.0e-9:
+            best_key, best_dist = key, dist
+
+    if best_key is None or best_dist > 2.0:
+        return {}
+
+    return {metric: [pettmp_hist[metric][best_key], pettmp_fut[metric][best_key]] for metric in METRICS}
+
+def _chosen_cells(pettmp_hist, pettmp_fut, aoi_res, climgen):
+
+    wthr_indx = WthrGridIndex(pettmp_hist, pettmp_fut)
+    indices = wthr_indx.associate(aoi_res, climgen)
+
+    return [None if indx < 0 else wthr_indx.grid_cell(indx) for indx in indices.tolist()], wthr_indx
+
+def test_matches_reference(monkeypatch):
+
+    monkeypatch.setattr(wthr_grid_index, 'associate_climate', _nearest_cell)
+    pettmp_hist, pettmp_fut = _band_weather()
+    aoi_res = _aoi_res()
+
+    chosen, wthr_indx = _chosen_cells(pettmp_hist, pettmp_fut, aoi_res, None)
+    for site_rec, grid_cell in zip(aoi_res, chosen):
+        expected = _nearest_cell(site_rec, None, pettmp_hist, pettmp_fut)
+        assert (grid_cell or {}) == expected
+
+    # misses were resolved and the arrays used for weather only output include them
+    # ==============================================================================
+    assert len(wthr_indx.extra_cells) > 0
+    assert len(wthr_indx.fut_array(METRICS[0])) == wthr_indx.nkeys + len(wthr_indx.extra_cells)
+    assert len(wthr_indx.hist_empty) == len(wthr_indx.fut_array(METRICS[0]))
+
+def test_lookup_ties_unresolved():
+
+    pettmp_hist, pettmp_fut = _band_weather()
+    wthr_indx = WthrGridIndex(pettmp_hist, pettmp_fut)
+
+    indices = wthr_indx.lookup([53.0, 53.1, 52.6, 55.0], [-2.6, -2.6, -1.5, -1.5])
+    assert indices[0] == -1 and indices[1] >= 0     # midway between rows then within a row
+    assert indices[2] == -1                         # absent from historic dataset
+    assert indices[3] == -1                         # beyond the grid
+
+def test_matches_associate_climate():
+
+    aoi_res = _aoi_res()
+    pettmp_hist, pettmp_fut = _band_weather()
+    climgen = SimpleNamespace(wthr_rsrc = 'CRU', lat_resol = 0.5, lon_resol = 0.5, granularity = GRANULARITY)
+    try:
+        probe = getClimGenFns.associate_climate(aoi_res[0], climgen, pettmp_hist, pettmp_fut)
+    except AttributeError as err:
+        pytest.skip('associate_climate needs climate attributes not set here: ' + str(err))
+    if probe is None:
+        pytest.skip('getClimGenFns is a stand-in')
+
+    chosen, wthr_indx = _chosen_cells(pettmp_hist, pettmp_fut, aoi_res, climgen)
+    for site_rec, grid_cell in zip(aoi_res, chosen):
+        assert (grid_cell or {}) == getClimGenFns.associate_climate(site_rec, climgen, pettmp_hist, pettmp_fut)
@@ -0,0 +1,165 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_cache_fns.py
+# Purpose:     persistent cache of weather extracted from NetCDF datasets
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   weather returned by the climgen fetch functions, e.g. fetch_cru_future_NC_data, is pickled to a cache
+#   directory under a name derived from the weather resource, scenario, year ranges, the paths, sizes and
+#   modification times of the NetCDF datasets, fetch function and grid indices so that studies which share a
+#   scenario, period and AOI skip reading the NetCDF files while a replaced dataset is never matched
+#   the cache is bounded in size - least recently used entries are removed first
+#   should the climgen object lack any attribute of the key the cache is disabled rather than match weather from
+#   another scenario, period or dataset
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'wthr_cache_fns.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+import pickle
+from hashlib import sha1
+from glob import glob
+from os import makedirs, remove, replace, utime, getpid, stat
+from os.path import join, isfile, isdir, getsize, getmtime
+
+CACHE_VERSION = 2
+CACHE_EXTN = '.pkl'
+KEY_ATTRIBS = ('wthr_rsrc', 'wthr_rsrc_key', 'fut_clim_scen', 'hist_start_year', 'hist_end_year', 'sim_start_year',
+               'sim_end_year', 'fut_strt_indx', 'max_num_years', 'mnthly_flag')   # climgen attributes keying weather
+DSET_ATTRIBS = ('hist_precip_fname', 'hist_tas_fname', 'fut_precip_fname', 'fut_tas_fname', 'lta_nc_fname')
+WARN_STR = '*** Warning *** '
+
+def _dset_stamp(nc_fname):
+    """
+    path, size and modification time of a dataset, path alone if it cannot be read
+    """
+    try:
+        fstat = stat(nc_fname)
+    except (OSError, TypeError, ValueError):
+        return (nc_fname, None, None)
+
+    return (nc_fname, fstat.st_size, fstat.st_mtime_ns)
+
+def missing_key_attribs(climgen):
+    """
+    attributes of the key absent from the climgen object
+    """
+    return [attr for attr in KEY_ATTRIBS + DSET_ATTRIBS if not hasattr(climgen, attr)]
+
+def climgen_key_attribs(climgen):
+    """
+    attributes of the climgen object which define the weather resource, scenario and year ranges together with
+    the stamp of each dataset
+    raises AttributeError if any is absent from the climgen object
+    """
+    missing = missing_key_attribs(climgen)
+    if len(missing) > 0:
+        raise AttributeError('climgen object has no attribute ' + ', '.join(missing))
+
+    key_attribs = [(attr, getattr(climgen, attr)) for attr in KEY_ATTRIBS]
+    for attr in DSET_ATTRIBS:
+        nc_fname = getattr(climgen, attr)
+        key_attribs.append((attr, None if nc_fname is None else _dset_stamp(nc_fname)))
+
+    return key_attribs
+
+class PettmpCache(object):
+    """
+    an empty cache_dir disables the cache, in which case fetch functions are called directly
+    """
+    def __init__(self, cache_dir, max_mb):
+
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb*1024*1024)
+        self.nhits = 0
+        self.nmisses = 0
+
+        if cache_dir != '' and not isdir(cache_dir):
+            try:
+                makedirs(cache_dir)
+            except OSError as err:
+                print(WARN_STR + 'could not create weather cache directory {} - cache disabled\n\t{}'
+                                                                                            .format(cache_dir, err))
+                self.cache_dir = ''
+
+    def _cache_fname(self, climgen, fetch_name, aoi_indices, kwargs):
+        """
+        content address of the requested weather
+        """
+        key = repr([CACHE_VERSION, climgen_key_attribs(climgen), fetch_name, aoi_indices, sorted(kwargs.items())])
+
+        return join(self.cache_dir, sha1(key.encode()).hexdigest() + CACHE_EXTN)
+
+    def fetch(self, climgen, fetch_name, aoi_indices, num_band, **kwargs):
+        """
+        return weather from the cache if present otherwise call fetch function of the climgen object and cache result
+        """
+        fetch_func = getattr(climgen, fetch_name)
+        if self.cache_dir != '':
+            missing = missing_key_attribs(climgen)
+            if len(missing) > 0:
+                print(WARN_STR + 'weather cache disabled since the climgen object has no attribute ' +
+                                                                                                ', '.join(missing))
+                self.cache_dir = ''
+
+        if self.cache_dir == '':
+            return fetch_func(aoi_indices, num_band, **kwargs)
+
+        cache_fname = self._cache_fname(climgen, fetch_name, aoi_indices, kwargs)
+        if isfile(cache_fname):
+            try:
+                with open(cache_fname, 'rb') as fcache:
+                    pettmp = pickle.load(fcache)
+                utime(cache_fname)      # mark as recently used
+                self.nhits += 1
+                print('Retrieved weather for band {} from cache'.format(num_band))
+                return pettmp
+
+            except (OSError, EOFError, pickle.UnpicklingError) as err:
+                print(WARN_STR + 'could not read weather cache file {}\n\t{}'.format(cache_fname, err))
+
+        self.nmisses += 1
+        pettmp = fetch_func(aoi_indices, num_band, **kwargs)
+
+        # write to temporary file first so that a concurrent reader never sees a partial file
+        # ====================================================================================
+        tmp_fname = cache_fname + '.{}.tmp'.format(getpid())
+        try:
+            with open(tmp_fname, 'wb') as fcache:
+                pickle.dump(pettmp, fcache, protocol = pickle.HIGHEST_PROTOCOL)
+            replace(tmp_fname, cache_fname)
+        except OSError as err:
+            print(WARN_STR + 'could not write weather cache file {}\n\t{}'.format(cache_fname, err))
+            return pettmp
+
+        self._evict()
+
+        return pettmp
+
+    def _evict(self):
+        """
+        remove least recently used entries until the cache is within its size limit
+        """
+        entries = []
+        for cache_fname in glob(join(self.cache_dir, '*' + CACHE_EXTN)):
+            try:
+                entries.append((getmtime(cache_fname), getsize(cache_fname), cache_fname))
+            except OSError:
+                continue    # removed by another process
+
+        total_bytes = sum(entry[1] for entry in entries)
+        for mtime, nbytes, cache_fname in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                remove(cache_fname)
+                total_bytes -= nbytes
+            except OSError:
+                continue
+
+        return
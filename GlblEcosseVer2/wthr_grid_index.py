@@ -0,0 +1,144 @@
+"""
+#-------------------------------------------------------------------------------
+# Name:        wthr_grid_index.py
+# Purpose:     map many AOI cells to weather grid cells in a single vectorised step
+# Author:      agent
+# Created:     18/10/2026
+# Licence:     <your licence>
+# Description:
+#   weather data returned by the climgen fetch functions is held in dictionaries for each metric keyed by the
+#   granular coordinates of the weather cell centres e.g. '00300_04230' for gran_lat 300 and gran_lon 4230
+#   a dense lookup array is built over these granular coordinates so that the weather cell most proximate to each
+#   AOI cell is found by integer arithmetic rather than one call to associate_climate per cell
+#   cells which the lookup cannot resolve i.e. beyond the grid, equidistant from two weather cells or whose nearest
+#   weather cell is absent from either dataset, are passed to associate_climate so that every AOI cell is given the
+#   weather it would be given by associate_climate alone
+#-------------------------------------------------------------------------------
+#
+"""
+
+__prog__ = 'wthr_grid_index.py'
+__version__ = '0.0.1'
+__author__ = 'agent'
+
+from math import gcd
+from functools import reduce
+import numpy as np
+
+from getClimGenFns import associate_climate
+
+GRANULARITY = 120       # HWSD is on a 30 arc second grid i.e. 120 cells per degree
+METRICS = list(['precipitation', 'temperature'])
+TIE_TOL = 1.0e-6        # AOI cells within this many granular units of the midpoint of two weather cells are ties
+
+def _gran_step(gran_vals):
+    """
+    spacing of weather cells in granular units, defaults to half a degree if there is only one cell
+    """
+    diffs = np.diff(np.unique(gran_vals))
+    if len(diffs) == 0:
+        return GRANULARITY // 2
+    else:
+        return reduce(gcd, [int(diff) for diff in diffs])
+
+class WthrGridIndex(object):
+    """
+    dense lookup from granular lat/lon to weather cells present in both historic and future datasets
+    weather cells resolved by associate_climate are appended to extra_cells and indexed from nkeys onwards
+    """
+    def __init__(self, pettmp_hist, pettmp_fut):
+
+        metric = METRICS[0]
+        self.pettmp_hist = pettmp_hist
+        self.pettmp_fut = pettmp_fut
+        self.keys = [key for key in pettmp_fut[metric] if key in pettmp_hist[metric]]
+        self.nkeys = len(self.keys)
+        self._fut_arrays = {}
+        self.extra_cells = []
+
+        # occasionally data is present in one dataset but not the other
+        # ==============================================================
+        self.hist_empty = np.array([len(pettmp_hist[metric][key]) == 0 for key in self.keys], dtype = bool)
+
+        if self.nkeys == 0:
+            self.lookup_table = np.full((0, 0), -1, dtype = np.int32)
+            self.gran_lat0, self.gran_lon0, self.lat_step, self.lon_step = 0, 0, 1, 1
+            return
+
+        gran_coords = np.array([key.split('_') for key in self.keys], dtype = np.int64)
+        gran_lats = gran_coords[:, 0]
+        gran_lons = gran_coords[:, 1]
+
+        self.gran_lat0 = int(gran_lats.min())
+        self.gran_lon0 = int(gran_lons.min())
+        self.lat_step = _gran_step(gran_lats)
+        self.lon_step = _gran_step(gran_lons)
+
+        irows = (gran_lats - self.gran_lat0) // self.lat_step
+        icols = (gran_lons - self.gran_lon0) // self.lon_step
+
+        self.lookup_table = np.full((irows.max() + 1, icols.max() + 1), -1, dtype = np.int32)
+        self.lookup_table[irows, icols] = np.arange(self.nkeys, dtype = np.int32)
+
+    def lookup(self, lats, lons):
+        """
+        return index of the most proximate weather cell for each lat/lon or -1 where it cannot be resolved
+        """
+        gran_lats = (90.0 - np.asarray(lats, dtype = float))*GRANULARITY
+        gran_lons = (180.0 + np.asarray(lons, dtype = float))*GRANULARITY
+
+        row_offsets = (gran_lats - self.gran_lat0)/self.lat_step
+        col_offsets = (gran_lons - self.gran_lon0)/self.lon_step
+        irows = np.floor(row_offsets + 0.5).astype(np.int64)
+        icols = np.floor(col_offsets + 0.5).astype(np.int64)
+
+        ties = (np.abs(row_offsets - irows + 0.5) < TIE_TOL/self.lat_step) | \
+                                                        (np.abs(col_offsets - icols + 0.5) < TIE_TOL/self.lon_step)
+
+        nrows, ncols = self.lookup_table.shape
+        inside = (irows >= 0) & (irows < nrows) & (icols >= 0) & (icols < ncols) & ~ties
+
+        indices = np.full(len(gran_lats), -1, dtype = np.int32)
+        indices[inside] = self.lookup_table[irows[inside], icols[inside]]
+
+        return indices
+
+    def associate(self, site_recs, climgen):
+        """
+        index of the weather cell for each site record, AOI cells not resolved by lookup are passed to
+        associate_climate, -1 where it too finds no weather
+        """
+        indices = self.lookup([site_rec[2] for site_rec in site_recs], [site_rec[3] for site_rec in site_recs])
+        for site_indx in np.flatnonzero(indices < 0).tolist():
+            pettmp_grid_cell = associate_climate(site_recs[site_indx], climgen, self.pettmp_hist, self.pettmp_fut)
+            if len(pettmp_grid_cell) > 0:
+                indices[site_indx] = self.nkeys + len(self.extra_cells)
+                self.extra_cells.append(pettmp_grid_cell)
+
+        if len(self.extra_cells) > 0:
+            self._fut_arrays = {}
+            self.hist_empty = np.append(self.hist_empty[:self.nkeys],
+                    np.array([len(grid_cell[METRICS[0]][0]) == 0 for grid_cell in self.extra_cells], dtype = bool))
+
+        return indices
+
+    def fut_array(self, metric):
+        """
+        future weather for all cells as a 2-D array of cells by months, dtype is that of the fetched values
+        """
+        if metric not in self._fut_arrays:
+            self._fut_arrays[metric] = np.array([self.pettmp_fut[metric][key] for key in self.keys] +
+                                                        [grid_cell[metric][1] for grid_cell in self.extra_cells])
+
+        return self._fut_arrays[metric]
+
+    def grid_cell(self, indx):
+        """
+        weather for a single cell in the form returned by associate_climate i.e. metric: [historic, future]
+        """
+        if indx >= self.nkeys:
+            return self.extra_cells[indx - self.nkeys]
+
+        key = self.keys[indx]
+
+        return {metric: [self.pettmp_hist[metric][key], self.pettmp_fut[metric][key]] for metric in METRICS}